@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Offline end-to-end throughput benchmark
+
+Drives the real handle_url -> button_callback -> quality_selected ->
+download_video pipeline against FakeYoutubeDL and a local FakeBotAPI.
+
+Usage:
+    python benchmark.py --requests 200 --concurrency 1,8,32
+    python benchmark.py --videos 10 --failure-rate 0.05 --json
+    python benchmark.py --classifier
+    python benchmark.py --updates 500 --concurrency 1,32
+    python benchmark.py --workers 3 --concurrency 8,32
+    python benchmark.py --extract-cpu 0.05 --ydl-processes 4
+    python benchmark.py --requests 4 --batch 10 --concurrency 1,4
+    python benchmark.py --postprocess --ffmpeg-latency 0.1 --ffmpeg-jobs 2
+    python benchmark.py --inline --requests 50 --videos 10 --concurrency 1,16
+    python benchmark.py --failure-rate 1 --failure-kind blocked --platform youtube
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import re
+import signal
+import argparse
+import subprocess
+import resource
+import tempfile
+import statistics
+from functools import partial
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+# yt-dlp error texts for --failure-kind
+FAILURE_MESSAGES = {
+    'transient': "ERROR: fake failure for {url}: Connection reset by peer",
+    'permanent': "ERROR: [youtube] {url}: Private video. Sign in if you've been granted access to this video",
+    'blocked': "ERROR: [youtube] {url}: Sign in to confirm you're not a bot. Use --cookies for the authentication",
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Shorts bot offline benchmark")
+    parser.add_argument('--requests', type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument('--concurrency', default='1,8,32', help="Comma-separated concurrency levels")
+    parser.add_argument('--videos', type=int, default=0,
+                        help="Distinct videos to draw from (0 = every request unique)")
+    parser.add_argument('--platform', default='instagram', choices=['youtube', 'instagram', 'tiktok'])
+    parser.add_argument('--quality', default='720p')
+    parser.add_argument('--think', type=float, default=0.2, help="Seconds between link and quality tap")
+    parser.add_argument('--extract-latency', type=float, default=0.05)
+    parser.add_argument('--extract-cpu', type=float, default=0.0,
+                        help="CPU seconds (GIL held) per extraction, like real page parsing")
+    parser.add_argument('--download-latency', type=float, default=0.2)
+    parser.add_argument('--upload-latency', type=float, default=0.05)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--failure-kind', default='transient', choices=sorted(FAILURE_MESSAGES),
+                        help="What the injected --failure-rate errors look like")
+    parser.add_argument('--size-mb', type=float, default=2.0, help="Size of the largest synthetic format")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    parser.add_argument('--verbose', action='store_true', help="Keep bot logging")
+    parser.add_argument('--short-links', action='store_true',
+                        help="Send TikTok vm. share links (a fresh code per request) via a redirect stand-in")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream progressive formats from a local media server into sendVideo")
+    parser.add_argument('--source-mbps', type=float, default=0,
+                        help="Source throughput in MB/s for downloads and the media server (0 = unthrottled)")
+    parser.add_argument('--postprocess', action='store_true',
+                        help="Run the faststart/thumbnail stage through an ffmpeg stand-in")
+    parser.add_argument('--ffmpeg-latency', type=float, default=0.05, help="Seconds per ffmpeg stand-in run")
+    parser.add_argument('--ffmpeg-jobs', type=int, default=0, help="ffmpeg pool size (0 = CPU count)")
+    parser.add_argument('--batch', type=int, default=0,
+                        help="Links per message (batch mode, delivered as albums)")
+    parser.add_argument('--inline', action='store_true',
+                        help="Inline queries instead of chat requests: cold (placeholder) then warm (file_id) answers")
+    parser.add_argument('--local-api', action='store_true',
+                        help="Talk to the fake Bot API as a local (--local) server and send videos by path")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Run as intake and deliver through this many worker processes (shared job queue)")
+    parser.add_argument('--worker-process', metavar='BASE_URL', help=argparse.SUPPRESS)
+    parser.add_argument('--ydl-processes', type=int, default=0,
+                        help="Run yt-dlp in this many worker processes instead of executor threads")
+    parser.add_argument('--ydl-recycle', type=int, default=50, help="Jobs per yt-dlp worker process")
+    parser.add_argument('--updates', type=int, default=0,
+                        help="Measure update->reply latency for polling vs webhook with this many updates")
+    parser.add_argument('--classifier', action='store_true',
+                        help="Check the URL classifier corpus and micro-benchmark it instead")
+    return parser.parse_args()
+
+
+# ============================================================================
+# MEASUREMENT HELPERS
+# ============================================================================
+
+def current_rss() -> int:
+    """Resident set size in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def directory_size(path: Path) -> int:
+    """Total size of files under path"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def stage_totals(bot, stage: str) -> tuple:
+    """(seconds, count) observed so far for a pipeline stage"""
+    total, count = 0.0, 0
+    for key, (_, seconds, observations) in list(bot.STAGE_SECONDS._values.items()):
+        if key[0] == stage:
+            total += seconds
+            count += observations
+    return total, count
+
+
+def stage_mean(bot, stage: str, before: tuple) -> float:
+    """Mean stage duration since before"""
+    total, count = stage_totals(bot, stage)
+    count -= before[1]
+    return (total - before[0]) / count if count else 0.0
+
+
+class Sampler:
+    """Track peak RSS and download-dir size while a level runs"""
+
+    def __init__(self, directory: Path, interval: float = 0.05):
+        self.directory = directory
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_disk = 0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self.peak_rss = max(self.peak_rss, current_rss())
+            self.peak_disk = max(self.peak_disk, directory_size(self.directory))
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+# ============================================================================
+# URL CLASSIFIER
+# ============================================================================
+
+# (input, expected (platform, is_short, video_id, normalized_url) or None)
+CLASSIFIER_CORPUS = [
+    ("https://youtube.com/shorts/dQw4w9WgXcQ",
+     ('youtube', True, 'dQw4w9WgXcQ', 'https://www.youtube.com/shorts/dQw4w9WgXcQ')),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ?si=abcDEF123&feature=share",
+     ('youtube', True, 'dQw4w9WgXcQ', 'https://www.youtube.com/shorts/dQw4w9WgXcQ')),
+    ("https://m.youtube.com/shorts/dQw4w9WgXcQ",
+     ('youtube', True, 'dQw4w9WgXcQ', 'https://www.youtube.com/shorts/dQw4w9WgXcQ')),
+    ("youtube.com/shorts/dQw4w9WgXcQ",
+     ('youtube', True, 'dQw4w9WgXcQ', 'https://www.youtube.com/shorts/dQw4w9WgXcQ')),
+    ("HTTPS://WWW.YOUTUBE.COM/shorts/dQw4w9WgXcQ",
+     ('youtube', True, 'dQw4w9WgXcQ', 'https://www.youtube.com/shorts/dQw4w9WgXcQ')),
+    ("https://youtu.be/dQw4w9WgXcQ?si=xyz",
+     ('youtube', False, 'dQw4w9WgXcQ', 'https://www.youtube.com/watch?v=dQw4w9WgXcQ')),
+    ("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10s",
+     ('youtube', False, 'dQw4w9WgXcQ', 'https://www.youtube.com/watch?v=dQw4w9WgXcQ')),
+    ("https://www.youtube.com/channel/UC123", None),
+    ("https://www.instagram.com/reel/C1a2B3c4D5e/?igsh=MTc4MmM1YmI2Ng==",
+     ('instagram', True, 'C1a2B3c4D5e', 'https://www.instagram.com/reel/C1a2B3c4D5e/')),
+    ("https://instagram.com/reels/C1a2B3c4D5e/",
+     ('instagram', True, 'C1a2B3c4D5e', 'https://www.instagram.com/reel/C1a2B3c4D5e/')),
+    ("https://www.instagram.com/some.user/reel/C1a2B3c4D5e/",
+     ('instagram', True, 'C1a2B3c4D5e', 'https://www.instagram.com/reel/C1a2B3c4D5e/')),
+    ("https://www.instagram.com/p/C1a2B3c4D5e/?utm_source=ig_web_copy_link",
+     ('instagram', False, 'C1a2B3c4D5e', 'https://www.instagram.com/p/C1a2B3c4D5e/')),
+    ("https://www.instagram.com/some.user/", None),
+    ("https://www.tiktok.com/@some.user/video/7234567890123456789?is_from_webapp=1&sender_device=pc",
+     ('tiktok', True, '7234567890123456789', 'https://www.tiktok.com/@_/video/7234567890123456789')),
+    ("https://m.tiktok.com/v/7234567890123456789.html",
+     ('tiktok', True, '7234567890123456789', 'https://www.tiktok.com/@_/video/7234567890123456789')),
+    ("https://vm.tiktok.com/ZMabcdEF/",
+     ('tiktok', True, None, 'https://vm.tiktok.com/ZMabcdEF/')),
+    ("https://vt.tiktok.com/ZSabcdEF",
+     ('tiktok', True, None, 'https://vt.tiktok.com/ZSabcdEF/')),
+    ("https://www.tiktok.com/t/ZTabcdEF/",
+     ('tiktok', True, None, 'https://www.tiktok.com/t/ZTabcdEF/')),
+    ("Look at this https://www.instagram.com/reel/C1a2B3c4D5e/ lol",
+     ('instagram', True, 'C1a2B3c4D5e', 'https://www.instagram.com/reel/C1a2B3c4D5e/')),
+    ("https://example.com/shorts/dQw4w9WgXcQ", None),
+    ("hello world", None),
+    ("", None),
+]
+
+LEGACY_PATTERNS = {
+    'youtube': r'(youtube\.com/shorts/|youtu\.be/)',
+    'instagram': r'(instagram\.com/reel/|instagram\.com/p/)',
+    'tiktok': r'(tiktok\.com/@[\w\.]+/video/|vm\.tiktok\.com/|vt\.tiktok\.com/)',
+}
+LEGACY_SHORTS = [
+    r'youtube\.com/shorts/', r'instagram\.com/reel/', r'tiktok\.com/@[\w\.]+/video/',
+    r'vm\.tiktok\.com/', r'vt\.tiktok\.com/',
+]
+
+
+def legacy_classify(url: str):
+    """The previous detect_platform + is_shorts_url pair, for comparison"""
+    platform = None
+    for name, pattern in LEGACY_PATTERNS.items():
+        if re.search(pattern, url, re.IGNORECASE):
+            platform = name
+            break
+    is_short = any(re.search(pattern, url, re.IGNORECASE) for pattern in LEGACY_SHORTS)
+    return platform, is_short
+
+
+def run_classifier_benchmark(iterations: int = 20000) -> dict:
+    """Check the corpus, then time classify_url against the legacy pair"""
+    from url_classifier import classify_url
+
+    failures = []
+    for text, expected in CLASSIFIER_CORPUS:
+        result = classify_url(text)
+        got = tuple(result) if result else None
+        if got != expected:
+            failures.append((text, expected, got))
+
+    for text, expected, got in failures:
+        print(f"❌ {text!r}\n   expected {expected}\n   got      {got}")
+
+    inputs = [text for text, _ in CLASSIFIER_CORPUS]
+
+    started = time.perf_counter()
+    for _ in range(iterations // len(inputs)):
+        for text in inputs:
+            classify_url(text)
+    classifier_ns = (time.perf_counter() - started) / iterations * 1e9
+
+    started = time.perf_counter()
+    for _ in range(iterations // len(inputs)):
+        for text in inputs:
+            legacy_classify(text)
+    legacy_ns = (time.perf_counter() - started) / iterations * 1e9
+
+    return {
+        'corpus': len(CLASSIFIER_CORPUS),
+        'failures': len(failures),
+        'classify_url_ns': round(classifier_ns),
+        'legacy_regex_ns': round(legacy_ns),
+    }
+
+
+# ============================================================================
+# FAKE UPDATES
+# ============================================================================
+
+def video_url(platform: str, video_id: str) -> str:
+    """Build a URL the bot accepts for the platform"""
+    if platform == 'youtube':
+        return f"https://youtube.com/shorts/{video_id[:11].ljust(11, '0')}"
+    if platform == 'tiktok':
+        return f"https://www.tiktok.com/@bench/video/{video_id}"
+    return f"https://www.instagram.com/reel/{video_id}/"
+
+
+def message_update(update_id: int, user_id: int, text: str) -> dict:
+    user = {'id': user_id, 'is_bot': False, 'first_name': 'Bench', 'username': f'bench{user_id}'}
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'},
+            'from': user,
+            'text': text,
+        },
+    }
+
+
+def inline_update(update_id: int, user_id: int, text: str) -> dict:
+    user = {'id': user_id, 'is_bot': False, 'first_name': 'Bench', 'username': f'bench{user_id}'}
+    return {
+        'update_id': update_id,
+        'inline_query': {'id': str(update_id), 'from': user, 'query': text, 'offset': ''},
+    }
+
+
+def callback_update(update_id: int, user_id: int, data: str) -> dict:
+    user = {'id': user_id, 'is_bot': False, 'first_name': 'Bench', 'username': f'bench{user_id}'}
+    return {
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': user,
+            'chat_instance': str(user_id),
+            'data': data,
+            'message': {
+                'message_id': update_id,
+                'date': int(time.time()),
+                'chat': {'id': user_id, 'type': 'private'},
+                'text': 'Sifatni tanlang',
+            },
+        },
+    }
+
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def configure_fake_ydl(args) -> dict:
+    """Apply the FakeYoutubeDL knobs, return them for worker processes"""
+    from fake_services import FakeYoutubeDL
+
+    attrs = {
+        'extract_latency': args.extract_latency,
+        'extract_cpu': args.extract_cpu,
+        'download_latency': args.download_latency,
+        'failure_rate': args.failure_rate,
+        'failure_message': FAILURE_MESSAGES[args.failure_kind],
+        'file_size': int(args.size_mb * 1024 * 1024),
+        'bytes_per_second': int(args.source_mbps * 1024 * 1024),
+    }
+    for key, value in attrs.items():
+        setattr(FakeYoutubeDL, key, value)
+    return attrs
+
+
+def configure_postprocess(bot, args):
+    """ffmpeg stand-in for --postprocess; otherwise the stage is off (fake MP4s aren't real videos)"""
+    from fake_services import write_fake_ffmpeg
+
+    if args.postprocess:
+        ffmpeg = write_fake_ffmpeg(os.getcwd(), args.ffmpeg_latency)
+        bot.media_processor = bot.MediaProcessor(ffmpeg, args.ffmpeg_jobs or None)
+    else:
+        bot.media_processor.ffmpeg = None
+
+
+async def run_level(bot, app, api, args, concurrency: int, level_index: int,
+                    short_link_server=None) -> dict:
+    """Run args.requests requests with the given concurrency"""
+    from telegram import Update
+    from telegram.ext import CallbackContext
+
+    semaphore = asyncio.Semaphore(concurrency)
+    e2e_latencies = []
+    tap_latencies = []
+    uploads_before = api.videos_sent
+    uploaded_before = api.uploaded_bytes
+    local_before = api.local_bytes
+    thumbnails_before = api.thumbnails
+    faststart_before = stage_totals(bot, 'faststart')
+    thumbnail_before = stage_totals(bot, 'thumbnail')
+    progress_before = bot.progress_reporter.stats()
+    ydl_calls_before = stage_totals(bot, 'metadata')[1] + stage_totals(bot, 'download')[1]
+    retries_before = sum(bot.RETRIES_TOTAL._values.values())
+    rejected_before = sum(c['rejected'] for c in bot.circuit_breaker.stats().values())
+
+    def link(n: int) -> str:
+        # Numeric ids are valid on every platform (TikTok requires them)
+        if args.videos:
+            video_id = str(7_000_000 + n % args.videos)
+        else:
+            video_id = str(8_000_000 + 100_000 * level_index + n)
+        if short_link_server is None:
+            return video_url(args.platform, video_id)
+        code = f"ZM{level_index}x{n}"
+        short_link_server.links[code] = video_id
+        return f"https://vm.tiktok.com/{code}/"
+
+    async def one_request(i: int):
+        user_id = 1_000_000 * (level_index + 1) + i
+        # --batch: one message carrying several links, one quality tap for all
+        links = args.batch or 1
+        url = '\n'.join(link(i * links + j) for j in range(links))
+        callback = f"{'batch' if args.batch > 1 else 'quality'}_{args.quality}"
+
+        async with semaphore:
+            started = time.perf_counter()
+
+            update = Update.de_json(message_update(2 * i + 1, user_id, url), app.bot)
+            await bot.handle_url(update, CallbackContext.from_update(update, app))
+
+            await asyncio.sleep(args.think)
+
+            tapped = time.perf_counter()
+            delivered = api.expect_reply(user_id, '✅') if args.workers else None
+            update = Update.de_json(callback_update(2 * i + 2, user_id, callback), app.bot)
+            await bot.button_callback(update, CallbackContext.from_update(update, app))
+
+            # Intake only queues the job - wait for a worker's success message
+            if delivered is not None:
+                await asyncio.wait_for(delivered, 120)
+
+            finished = time.perf_counter()
+            e2e_latencies.append(finished - started - args.think)
+            tap_latencies.append(finished - tapped)
+
+    sampler = Sampler(bot.DOWNLOAD_DIR)
+    sampler.start()
+    started = time.perf_counter()
+
+    await asyncio.gather(*(one_request(i) for i in range(args.requests)))
+
+    elapsed = time.perf_counter() - started
+    await sampler.stop()
+
+    delivered = api.videos_sent - uploads_before
+    progress = bot.progress_reporter.stats()
+
+    return {
+        'concurrency': concurrency,
+        'requests': args.requests,
+        'delivered': delivered,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(args.requests / elapsed, 2),
+        'videos_per_s': round(delivered / elapsed, 2),
+        'tap_p50_ms': round(percentile(tap_latencies, 50) * 1000, 1),
+        'tap_p95_ms': round(percentile(tap_latencies, 95) * 1000, 1),
+        'tap_p99_ms': round(percentile(tap_latencies, 99) * 1000, 1),
+        'e2e_p50_ms': round(percentile(e2e_latencies, 50) * 1000, 1),
+        'e2e_p95_ms': round(percentile(e2e_latencies, 95) * 1000, 1),
+        'e2e_p99_ms': round(percentile(e2e_latencies, 99) * 1000, 1),
+        'e2e_mean_ms': round(statistics.mean(e2e_latencies) * 1000, 1),
+        'peak_rss_mb': round(sampler.peak_rss / 1048576, 1),
+        'peak_disk_mb': round(sampler.peak_disk / 1048576, 1),
+        'uploaded_mb': round((api.uploaded_bytes - uploaded_before) / 1048576, 1),
+        'thumbnails': api.thumbnails - thumbnails_before,
+        'faststart_mean_ms': round(stage_mean(bot, 'faststart', faststart_before) * 1000, 1),
+        'thumbnail_mean_ms': round(stage_mean(bot, 'thumbnail', thumbnail_before) * 1000, 1),
+        'sent_by_path_mb': round((api.local_bytes - local_before) / 1048576, 1),
+        'progress_events': progress['published'] - progress_before['published'],
+        'progress_edits': progress['edits'] - progress_before['edits'],
+        'ydl_calls': stage_totals(bot, 'metadata')[1] + stage_totals(bot, 'download')[1] - ydl_calls_before,
+        'retries': sum(bot.RETRIES_TOTAL._values.values()) - retries_before,
+        'circuit_rejected': sum(c['rejected'] for c in bot.circuit_breaker.stats().values()) - rejected_before,
+    }
+
+
+async def run_inline_level(bot, app, api, args, concurrency: int, level_index: int) -> dict:
+    """args.requests inline queries on uncached videos, then the same queries once cached"""
+    from telegram import Update
+    from telegram.ext import CallbackContext
+
+    semaphore = asyncio.Semaphore(concurrency)
+    videos = args.videos or args.requests
+    links = [video_url(args.platform, str(9_000_000 + 100_000 * level_index + n)) for n in range(videos)]
+
+    async def one_query(i: int, latencies: list):
+        user_id = 1_000_000 * (level_index + 1) + i
+        async with semaphore:
+            started = time.perf_counter()
+            update = Update.de_json(inline_update(i + 1, user_id, links[i % videos]), app.bot)
+            await bot.inline_query(update, CallbackContext.from_update(update, app))
+            latencies.append(time.perf_counter() - started)
+
+    async def run_phase() -> tuple:
+        latencies = []
+        answers_before = len(api.inline_answers)
+        await asyncio.gather(*(one_query(i, latencies) for i in range(args.requests)))
+        answers = api.inline_answers[answers_before:]
+        return latencies, sum(1 for _, cached, _ in answers if cached)
+
+    cold, cold_hits = await run_phase()
+
+    # Background fetches fill the file_id index; wait for all of them
+    filled_started = time.perf_counter()
+    while time.perf_counter() - filled_started < 120:
+        cached = await asyncio.gather(*(
+            bot.db.get_file_ids(args.platform, bot.canonical_video_id(link)) for link in links
+        ))
+        if all(cached):
+            break
+        await asyncio.sleep(0.05)
+    fill_s = time.perf_counter() - filled_started
+
+    warm, warm_hits = await run_phase()
+
+    return {
+        'concurrency': concurrency,
+        'queries': args.requests,
+        'videos': videos,
+        'cold_hits': cold_hits,
+        'cold_p50_ms': round(percentile(cold, 50) * 1000, 1),
+        'cold_p99_ms': round(percentile(cold, 99) * 1000, 1),
+        'fill_s': round(fill_s, 3),
+        'warm_hits': warm_hits,
+        'warm_p50_ms': round(percentile(warm, 50) * 1000, 1),
+        'warm_p99_ms': round(percentile(warm, 99) * 1000, 1),
+    }
+
+
+async def run_benchmark(args) -> list:
+    from fake_services import FakeBotAPI, FakeMediaServer, FakeShortLinkServer, FakeYoutubeDL
+
+    fake_ydl_attrs = configure_fake_ydl(args)
+
+    api = FakeBotAPI(upload_latency=args.upload_latency, local_mode=args.local_api)
+    await api.start()
+
+    media_server = None
+    if args.stream:
+        media_server = FakeMediaServer(bytes_per_second=int(args.source_mbps * 1024 * 1024))
+        await media_server.start()
+        FakeYoutubeDL.media_url = fake_ydl_attrs['media_url'] = media_server.base_url
+
+    short_link_server = None
+    if args.short_links:
+        args.platform = 'tiktok'
+        short_link_server = FakeShortLinkServer(latency=0.02)
+        await short_link_server.start()
+
+    workers = []
+    if args.workers:
+        os.environ['ROLE'] = 'intake'
+        env = dict(os.environ, ROLE='worker', WORKER_POLL_SECONDS='0.02', PORT='0')
+        for _ in range(args.workers):
+            workers.append(subprocess.Popen(
+                [sys.executable, str(ROOT / 'benchmark.py')] + sys.argv[1:] + ['--worker-process', api.base_url],
+                env=env,
+            ))
+
+    if args.local_api:
+        os.environ['BOT_API_LOCAL'] = '1'
+
+    # Import after chdir so downloads/ and the database land in the sandbox
+    import bot
+    from telegram.ext import Application
+
+    bot.yt_dlp.YoutubeDL = FakeYoutubeDL
+    configure_postprocess(bot, args)
+    # Benchmark users send far more links than the real limit allows
+    bot.rate_limiter.tiers['regular'] = bot.Tier(burst=10 ** 9, refill_seconds=0)
+    bot.STREAM_UPLOADS = args.stream
+    if args.ydl_processes:
+        bot.ydl_pool = bot.YdlProcessPool(
+            args.ydl_processes, args.ydl_recycle,
+            factory='fake_services:FakeYoutubeDL', factory_attrs=fake_ydl_attrs,
+        )
+    if short_link_server is not None:
+        bot.short_links.upstream = short_link_server.base_url
+
+    app = Application.builder().token('123456:BENCH').base_url(api.base_url).local_mode(args.local_api).build()
+    await app.initialize()
+    await app.start()
+
+    results = []
+    if args.inline:
+        run, header, row = run_inline_level, print_inline_header, print_inline_result
+    else:
+        run, header, row = partial(run_level, short_link_server=short_link_server), print_header, print_result
+    if not args.json:
+        header()
+    try:
+        for index, concurrency in enumerate(int(c) for c in args.concurrency.split(',')):
+            result = await run(bot, app, api, args, concurrency, index)
+            results.append(result)
+            if not args.json:
+                row(result)
+    finally:
+        await app.stop()
+        await app.shutdown()
+        await bot.on_shutdown(app)
+        await api.stop()
+        if short_link_server is not None:
+            await short_link_server.stop()
+        if media_server is not None:
+            await media_server.stop()
+        for worker in workers:
+            worker.send_signal(signal.SIGTERM)
+        for worker in workers:
+            worker.wait(30)
+
+    return results
+
+
+async def run_update_benchmark(args) -> list:
+    """Update-to-reply latency of a plain text message, polling vs webhook"""
+    import httpx
+    from fake_services import FakeBotAPI
+
+    api = FakeBotAPI()
+    await api.start()
+
+    import bot
+
+    results = []
+    for mode in ('polling', 'webhook'):
+        app = bot.build_application(base_url=api.base_url)
+        await app.initialize()
+        await app.start()
+
+        server = client = None
+        if mode == 'polling':
+            await app.updater.start_polling(poll_interval=0, timeout=10)
+
+            async def send(update: dict):
+                api.push_update(update)
+        else:
+            server = bot.build_web_server(app, port=0)
+            await server.start()
+            client = httpx.AsyncClient()
+            url = f"http://127.0.0.1:{server.port}{bot.WEBHOOK_PATH}"
+
+            async def send(update: dict):
+                response = await client.post(
+                    url, json=update, headers={'X-Telegram-Bot-Api-Secret-Token': bot.WEBHOOK_SECRET}
+                )
+                response.raise_for_status()
+
+        try:
+            for index, concurrency in enumerate(int(c) for c in args.concurrency.split(',')):
+                semaphore = asyncio.Semaphore(concurrency)
+                latencies = []
+
+                async def one_update(i: int):
+                    chat_id = 1_000_000 * (index + 1) + i
+                    async with semaphore:
+                        reply = api.expect_reply(chat_id)
+                        sent = time.perf_counter()
+                        await send(message_update(i + 1, chat_id, 'salom'))
+                        latencies.append(await asyncio.wait_for(reply, 30) - sent)
+
+                started = time.perf_counter()
+                await asyncio.gather(*(one_update(i) for i in range(args.updates)))
+                elapsed = time.perf_counter() - started
+
+                result = {
+                    'mode': mode,
+                    'concurrency': concurrency,
+                    'updates': args.updates,
+                    'updates_per_s': round(args.updates / elapsed, 1),
+                    'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                    'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                    'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                }
+                results.append(result)
+                if not args.json:
+                    print(f"{mode:>8} {concurrency:>5} {result['updates_per_s']:>9} "
+                          f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['p99_ms']:>8}")
+        finally:
+            if app.updater.running:
+                await app.updater.stop()
+            await app.stop()
+            await app.shutdown()
+            if server is not None:
+                await server.stop()
+            if client is not None:
+                await client.aclose()
+
+    await bot.on_shutdown(None)
+    await api.stop()
+    return results
+
+
+def run_worker_process(args):
+    """Worker role against the parent's fake Bot API (spawned by --workers)"""
+    from fake_services import FakeYoutubeDL
+
+    configure_fake_ydl(args)
+
+    import bot
+
+    bot.yt_dlp.YoutubeDL = FakeYoutubeDL
+    configure_postprocess(bot, args)
+    asyncio.run(bot.run_worker(bot.build_application(base_url=args.worker_process)))
+
+
+def print_header():
+    print(f"{'conc':>5} {'req/s':>8} {'ok':>5} {'tap p50':>9} {'p95':>8} {'p99':>8} "
+          f"{'e2e p50':>9} {'p95':>8} {'p99':>8} {'rss MB':>7} {'disk MB':>8}")
+
+
+def print_result(result: dict):
+    print(f"{result['concurrency']:>5} {result['requests_per_s']:>8} {result['delivered']:>5} "
+          f"{result['tap_p50_ms']:>9} {result['tap_p95_ms']:>8} {result['tap_p99_ms']:>8} "
+          f"{result['e2e_p50_ms']:>9} {result['e2e_p95_ms']:>8} {result['e2e_p99_ms']:>8} "
+          f"{result['peak_rss_mb']:>7} {result['peak_disk_mb']:>8}")
+
+
+def print_inline_header():
+    print(f"{'conc':>5} {'queries':>8} {'cold hit':>9} {'p50':>7} {'p99':>7} "
+          f"{'fill s':>7} {'warm hit':>9} {'p50':>7} {'p99':>7}")
+
+
+def print_inline_result(result: dict):
+    print(f"{result['concurrency']:>5} {result['queries']:>8} {result['cold_hits']:>9} "
+          f"{result['cold_p50_ms']:>7} {result['cold_p99_ms']:>7} {result['fill_s']:>7} "
+          f"{result['warm_hits']:>9} {result['warm_p50_ms']:>7} {result['warm_p99_ms']:>7}")
+
+
+def main():
+    args = parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL)
+    os.environ.setdefault('BOT_TOKEN', '123456:BENCH')
+
+    sys.path.insert(0, str(ROOT))
+
+    if args.worker_process:
+        run_worker_process(args)
+        return
+
+    if args.classifier:
+        result = run_classifier_benchmark()
+        print(json.dumps(result, indent=2))
+        sys.exit(1 if result['failures'] else 0)
+
+    with tempfile.TemporaryDirectory(prefix='shorts-bench-') as sandbox:
+        os.chdir(sandbox)
+        if args.updates:
+            if not args.json:
+                print(f"{'mode':>8} {'conc':>5} {'upd/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+            results = asyncio.run(run_update_benchmark(args))
+        else:
+            results = asyncio.run(run_benchmark(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
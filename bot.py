@@ -7,20 +7,53 @@ Supports: YouTube Shorts, Instagram Reels, TikTok
 """
 
 import os
+import signal
+import socket
+import hashlib
 import logging
 import re
 import asyncio
+import html
+import time
+import uuid
+from contextlib import ExitStack
+from functools import partial
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Awaitable, Callable, Optional, Tuple
 import yt_dlp
 
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from disk_manager import DiskFullError, DiskManager
+from error_policy import (
+    BLOCKED, PERMANENT, TRANSIENT, RETRY_POLICIES, CircuitBreaker, CircuitOpenError, Failure, classify_error,
+)
+from download_queue import DownloadScheduler, QueueFullError
+from job_queue import open_queue
+from media_processor import MediaProcessor
+from progress_reporter import ProgressReporter
+from metrics import (
+    REGISTRY, STAGE_SECONDS, FILE_SIZE_BYTES, REQUESTS_TOTAL, RETRIES_TOTAL, ERRORS_TOTAL, STREAM_FALLBACKS_TOTAL,
+    OVERSIZE_AVOIDED_TOTAL, INLINE_ANSWERS_TOTAL,
+)
+from rate_limiter import Tier, TokenBucketLimiter
+from short_links import DEAD_LINK, ShortLinkResolver
+from singleflight import SingleFlight
+from stream_upload import StreamError, StreamUploader
+from ttl_cache import TTLCache
+from url_classifier import classify_all, classify_url, canonical_video_id
+from video_cache import VideoCache
+from ydl_pool import YdlProcessPool, compact_info
+from telegram import (
+    Update, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaVideo, Message,
+    InlineQueryResultArticle, InlineQueryResultCachedVideo, InputTextMessageContent,
+)
+from telegram.error import BadRequest, TelegramError
 from telegram.ext import (
     Application,
     CommandHandler,
     MessageHandler,
     CallbackQueryHandler,
+    InlineQueryHandler,
     ContextTypes,
     filters,
 )
@@ -32,6 +65,31 @@ from telegram.ext import (
 BOT_TOKEN = os.getenv('BOT_TOKEN', '8341836427:AAHzwfnI68RJawROjOfHCwgAtkSQjvUg8nk')
 ADMIN_ID = int(os.getenv('ADMIN_ID', '6351892611'))
 
+# Webhook mode when WEBHOOK_URL (public https base URL) is set, polling otherwise
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or hashlib.sha256(BOT_TOKEN.encode()).hexdigest()[:32]
+PORT = int(os.getenv('PORT', '8080'))
+
+# Self-hosted Bot API server, e.g. http://localhost:8081/bot. With BOT_API_LOCAL
+# (server started with --local on the same filesystem) videos are sent by path
+BOT_API_URL = os.getenv('BOT_API_URL', '')
+BOT_API_LOCAL = os.getenv('BOT_API_LOCAL', '0') == '1'
+UPLOAD_LIMIT_MB = int(os.getenv('UPLOAD_LIMIT_MB', '2000' if BOT_API_LOCAL else '50'))
+
+# Process role: 'standalone' does everything; 'intake' takes updates and queues
+# downloads in the job queue, 'worker' processes run them
+ROLE = os.getenv('ROLE', 'standalone')
+# 'sqlite' (one host) or 'module:Class' implementing job_queue.QueueBackend
+JOB_QUEUE_BACKEND = os.getenv('JOB_QUEUE_BACKEND', 'sqlite')
+# Database path for sqlite, connection URL for other backends
+JOB_QUEUE_DB = os.getenv('JOB_QUEUE_DB', 'jobs.db')
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '60'))
+WORKER_JOBS = int(os.getenv('WORKER_JOBS', '4'))
+WORKER_POLL_SECONDS = float(os.getenv('WORKER_POLL_SECONDS', '0.5'))
+# Unique per worker process; a stable name lets a restarted worker keep its video cache
+WORKER_NAME = os.getenv('WORKER_NAME', f"{socket.gethostname()}-{os.getpid()}")
+
 # Logging setup
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -39,16 +97,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Download directory
+# Download directory; each worker owns a private one (cache index, leases and
+# sweeps are per process, so they must not see each other's files)
 DOWNLOAD_DIR = Path("downloads")
-DOWNLOAD_DIR.mkdir(exist_ok=True)
-
-# Platform detection patterns
-PLATFORM_PATTERNS = {
-    'youtube': r'(youtube\.com/shorts/|youtu\.be/)',
-    'instagram': r'(instagram\.com/reel/|instagram\.com/p/)',
-    'tiktok': r'(tiktok\.com/@[\w\.]+/video/|vm\.tiktok\.com/|vt\.tiktok\.com/)',
-}
+if ROLE == 'worker':
+    DOWNLOAD_DIR = DOWNLOAD_DIR / "workers" / WORKER_NAME
+DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 # Quality presets
 QUALITY_PRESETS = {
@@ -59,46 +113,303 @@ QUALITY_PRESETS = {
     '1080p': {'height': 1080, 'label': '1080p (Full HD)'},
 }
 
-# Rate limiting
-user_last_download = {}
-RATE_LIMIT_SECONDS = 12
+# Video cache
+CACHE_DIR = DOWNLOAD_DIR / "cache"
+CACHE_MAX_MB = int(os.getenv('CACHE_MAX_MB', '1024'))
+# How often cache hits (LRU order) are written to the index
+CACHE_FLUSH_SECONDS = int(os.getenv('CACHE_FLUSH_SECONDS', '30'))
+
+# Download workers per platform, e.g. "youtube=2,instagram=3,tiktok=2"
+PLATFORM_WORKERS = {
+    name.strip(): int(count)
+    for name, count in (
+        item.split('=') for item in os.getenv('PLATFORM_WORKERS', 'youtube=2,instagram=3,tiktok=2').split(',') if item
+    )
+}
+DOWNLOAD_QUEUE_MAX = int(os.getenv('DOWNLOAD_QUEUE_MAX', '50'))
+MAX_ACTIVE_JOBS = int(os.getenv('MAX_ACTIVE_JOBS', '6'))
+
+# yt-dlp in worker processes with warm YoutubeDL instances (0 = in-process threads)
+YDL_PROCESSES = int(os.getenv('YDL_PROCESSES', '0'))
+YDL_RECYCLE_JOBS = int(os.getenv('YDL_RECYCLE_JOBS', '50'))
+
+# Circuit breaker: CIRCUIT_FAILURES blocked errors (bot detection, 429) from a platform
+# within CIRCUIT_WINDOW_SECONDS make its requests fail fast for CIRCUIT_COOLDOWN_SECONDS
+CIRCUIT_FAILURES = int(os.getenv('CIRCUIT_FAILURES', '5'))
+CIRCUIT_WINDOW_SECONDS = float(os.getenv('CIRCUIT_WINDOW_SECONDS', '60'))
+CIRCUIT_COOLDOWN_SECONDS = float(os.getenv('CIRCUIT_COOLDOWN_SECONDS', '120'))
+
+# Database maintenance (rollup, retention, compaction)
+DB_MAINTENANCE_HOURS = float(os.getenv('DB_MAINTENANCE_HOURS', '6'))
+DOWNLOAD_RETENTION_DAYS = int(os.getenv('DOWNLOAD_RETENTION_DAYS', '30'))
+ERROR_RETENTION_DAYS = int(os.getenv('ERROR_RETENTION_DAYS', '14'))
+
+# Metadata prefetch (format URLs expire, so keep it short)
+METADATA_TTL_SECONDS = int(os.getenv('METADATA_TTL_SECONDS', '600'))
+METADATA_CACHE_SIZE = 200
+METADATA_ERROR_TTL_SECONDS = 60  # private/removed videos aren't extracted again within this
+
+# TikTok short links (vm./vt./t/) resolved to canonical URLs
+SHORT_LINK_TTL_SECONDS = int(os.getenv('SHORT_LINK_TTL_SECONDS', '86400'))
+SHORT_LINK_NEGATIVE_TTL_SECONDS = int(os.getenv('SHORT_LINK_NEGATIVE_TTL_SECONDS', '600'))
+SHORT_LINK_CACHE_SIZE = 5000
+
+# Stream progressive MP4s from the source into sendVideo, skipping the disk
+STREAM_UPLOADS = os.getenv('STREAM_UPLOADS', '0') == '1'
+STREAM_BUFFER_MB = int(os.getenv('STREAM_BUFFER_MB', '8'))
+STREAM_MEMORY_MB = int(os.getenv('STREAM_MEMORY_MB', '64'))
+
+# ffmpeg post-processing (faststart remux, thumbnails); FFMPEG_JOBS=0 uses the CPU count
+FFMPEG_BIN = os.getenv('FFMPEG_BIN', 'ffmpeg')
+FFMPEG_JOBS = int(os.getenv('FFMPEG_JOBS', '0'))
+FFMPEG_TIMEOUT_SECONDS = int(os.getenv('FFMPEG_TIMEOUT_SECONDS', '120'))
+
+# Disk budget: keep DISK_MIN_FREE_MB free, sweep leftovers of failed jobs
+DISK_MIN_FREE_MB = int(os.getenv('DISK_MIN_FREE_MB', '500'))
+DISK_ADMISSION_WAIT_SECONDS = int(os.getenv('DISK_ADMISSION_WAIT_SECONDS', '30'))
+DISK_ORPHAN_MINUTES = int(os.getenv('DISK_ORPHAN_MINUTES', '30'))
+DISK_SWEEP_MINUTES = int(os.getenv('DISK_SWEEP_MINUTES', '10'))
+# How long a measured download/cache directory size is reused by /metrics and /stats
+DISK_USAGE_TTL_SECONDS = int(os.getenv('DISK_USAGE_TTL_SECONDS', '60'))
+DISK_DEFAULT_RESERVE_MB = 50
+
+# Batch mode: several links in one message, sent back as albums of MEDIA_GROUP_SIZE
+BATCH_MAX_LINKS = int(os.getenv('BATCH_MAX_LINKS', '20'))
+MEDIA_GROUP_SIZE = 10
+
+# Live progress: checked every PROGRESS_INTERVAL_SECONDS, each chat edited at most
+# once per PROGRESS_CHAT_SECONDS, at most PROGRESS_MAX_EDITS edits per check
+PROGRESS_INTERVAL_SECONDS = float(os.getenv('PROGRESS_INTERVAL_SECONDS', '1'))
+PROGRESS_CHAT_SECONDS = float(os.getenv('PROGRESS_CHAT_SECONDS', '3'))
+PROGRESS_MAX_EDITS = int(os.getenv('PROGRESS_MAX_EDITS', '20'))
+
+# Inline mode: answered from stored file_ids within INLINE_BUDGET_SECONDS. A video
+# with none is fetched in the background (INLINE_QUALITY) and uploaded to
+# INLINE_CACHE_CHAT_ID for its file_id; a failed fetch is retried after INLINE_RETRY_SECONDS
+INLINE_BUDGET_SECONDS = float(os.getenv('INLINE_BUDGET_SECONDS', '0.5'))
+INLINE_QUALITY = os.getenv('INLINE_QUALITY', '720p')
+INLINE_CACHE_CHAT_ID = int(os.getenv('INLINE_CACHE_CHAT_ID', str(ADMIN_ID)))
+INLINE_CACHE_SECONDS = 300
+INLINE_RETRY_SECONDS = 300
+
+# Rate limiting: RATE_LIMIT_BURST downloads at once, then one per RATE_LIMIT_SECONDS
+RATE_LIMIT_SECONDS = float(os.getenv('RATE_LIMIT_SECONDS', '12'))
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '3'))
+ADMIN_RATE_LIMIT_SECONDS = float(os.getenv('ADMIN_RATE_LIMIT_SECONDS', '1'))
+ADMIN_RATE_LIMIT_BURST = int(os.getenv('ADMIN_RATE_LIMIT_BURST', '20'))
+RATE_LIMIT_IDLE_SECONDS = 3600
 
 # ============================================================================
 # DATABASE
 # ============================================================================
 
 try:
-    from database import Database
+    from database import AsyncDatabase
 
-    db = Database()
+    db = AsyncDatabase()
     logger.info("✅ Light Database initialized")
 except Exception as e:
     logger.error(f"❌ Database error: {e}")
     db = None
 
+# ============================================================================
+# VIDEO CACHE
+# ============================================================================
+
+video_cache = VideoCache(CACHE_DIR, CACHE_MAX_MB * 1024 * 1024)
+
+# Reservations and orphan sweeps for everything under DOWNLOAD_DIR
+disk_manager = DiskManager(
+    DOWNLOAD_DIR,
+    min_free_bytes=DISK_MIN_FREE_MB * 1024 * 1024,
+    orphan_age=DISK_ORPHAN_MINUTES * 60,
+    admission_wait=DISK_ADMISSION_WAIT_SECONDS,
+    in_use=video_cache.is_leased,
+    size_ttl=DISK_USAGE_TTL_SECONDS,
+)
+
+# Concurrent identical requests share one download and one upload
+download_flights = SingleFlight("download")
+upload_flights = SingleFlight("upload")
+
+# Extracted info dicts, prefetched while the user picks a quality
+metadata_cache = TTLCache(METADATA_CACHE_SIZE, METADATA_TTL_SECONDS)
+metadata_flights = SingleFlight("metadata")
+
+# Background fetches started for inline queries (every keystroke is a new query)
+inline_fetches = TTLCache(1000, INLINE_RETRY_SECONDS)
+
+# Share links resolved once, so every share of a video maps to one id
+short_links = ShortLinkResolver(
+    ttl=SHORT_LINK_TTL_SECONDS,
+    negative_ttl=SHORT_LINK_NEGATIVE_TTL_SECONDS,
+    max_size=SHORT_LINK_CACHE_SIZE,
+)
+
+# Source -> Telegram streaming; STREAM_MEMORY_MB caps all buffers together
+stream_uploader = StreamUploader(
+    buffer_bytes=STREAM_BUFFER_MB * 1024 * 1024,
+    memory_bytes=STREAM_MEMORY_MB * 1024 * 1024,
+)
+
+# Download/upload progress -> throttled edits of the loading messages
+progress_reporter = ProgressReporter(PROGRESS_INTERVAL_SECONDS, PROGRESS_CHAT_SECONDS, PROGRESS_MAX_EDITS)
+
+# Faststart remux and thumbnails between download and upload
+media_processor = MediaProcessor(FFMPEG_BIN, FFMPEG_JOBS or None, FFMPEG_TIMEOUT_SECONDS)
+
+# Blocking yt-dlp work runs on bounded per-platform pools, fair across users
+scheduler = DownloadScheduler(PLATFORM_WORKERS, max_queue=DOWNLOAD_QUEUE_MAX, max_active=MAX_ACTIVE_JOBS)
+
+# Platforms that keep blocking us are not called until a cooldown has passed
+circuit_breaker = CircuitBreaker(CIRCUIT_FAILURES, CIRCUIT_WINDOW_SECONDS, CIRCUIT_COOLDOWN_SECONDS)
+
+# Extraction and downloads off the bot process; intake never runs yt-dlp
+ydl_pool = YdlProcessPool(YDL_PROCESSES, YDL_RECYCLE_JOBS) if YDL_PROCESSES and ROLE != 'intake' else None
+
+# Shared download queue between intake and worker processes
+job_queue = open_queue(JOB_QUEUE_BACKEND, JOB_QUEUE_DB) if ROLE in ('intake', 'worker') else None
+
+# Per-user token buckets; idle users are forgotten
+rate_limiter = TokenBucketLimiter(
+    {
+        'admin': Tier(ADMIN_RATE_LIMIT_BURST, ADMIN_RATE_LIMIT_SECONDS),
+        'regular': Tier(RATE_LIMIT_BURST, RATE_LIMIT_SECONDS),
+    },
+    idle_ttl=RATE_LIMIT_IDLE_SECONDS,
+)
+
+
+def user_tier(user_id: int) -> str:
+    """Rate limit tier of a user"""
+    return 'admin' if user_id == ADMIN_ID else 'regular'
+
+
+# Scrape-time metrics read straight from the components above
+REGISTRY.counter(
+    'shorts_bot_video_cache_events_total', 'Video cache lookups and evictions', ('event',),
+    callback=lambda: {
+        (event,): value for event, value in video_cache.stats().items()
+        if event in ('hits', 'misses', 'evictions')
+    },
+)
+REGISTRY.gauge(
+    'shorts_bot_video_cache_bytes', 'Bytes stored in the video cache',
+    callback=lambda: {(): video_cache.stats()['bytes']},
+)
+REGISTRY.counter(
+    'shorts_bot_flights_shared_total', 'Requests that joined an in-flight job', ('flight',),
+    callback=lambda: {(f.name,): f.shared for f in (download_flights, upload_flights, metadata_flights)},
+)
+REGISTRY.gauge(
+    'shorts_bot_flights_in_progress', 'Distinct jobs currently in flight', ('flight',),
+    callback=lambda: {(f.name,): f.in_flight() for f in (download_flights, upload_flights, metadata_flights)},
+)
+REGISTRY.counter(
+    'shorts_bot_short_links_total', 'Short-link lookups by outcome', ('outcome',),
+    callback=lambda: {
+        (outcome,): value for outcome, value in short_links.stats().items()
+        if outcome in ('hits', 'resolved', 'dead', 'failed')
+    },
+)
+REGISTRY.gauge(
+    'shorts_bot_streams_active', 'Streaming uploads holding a buffer',
+    callback=lambda: {(): stream_uploader.active},
+)
+REGISTRY.counter(
+    'shorts_bot_streamed_bytes_total', 'Bytes piped from source to Telegram without touching disk',
+    callback=lambda: {(): stream_uploader.bytes_streamed},
+)
+REGISTRY.gauge(
+    'shorts_bot_disk_bytes', 'Download disk figures', ('kind',),
+    callback=lambda: {
+        (kind,): usage[f'{kind}_bytes']
+        for usage in (disk_manager.usage(),) for kind in ('free', 'min_free', 'reserved', 'directory')
+    },
+)
+REGISTRY.counter(
+    'shorts_bot_disk_admissions_total', 'Disk reservations by outcome', ('outcome',),
+    callback=lambda: {('admitted',): disk_manager.admitted, ('refused',): disk_manager.refused},
+)
+REGISTRY.counter(
+    'shorts_bot_disk_swept_files_total', 'Orphaned files removed from the download directory',
+    callback=lambda: {(): disk_manager.swept_files},
+)
+REGISTRY.counter(
+    'shorts_bot_progress_total', 'Progress events published and message edits made or failed', ('event',),
+    callback=lambda: {
+        (event,): value for event, value in progress_reporter.stats().items()
+        if event in ('published', 'edits', 'failed')
+    },
+)
+REGISTRY.counter(
+    'shorts_bot_postprocess_total', 'ffmpeg post-processing runs by step and outcome', ('step', 'outcome'),
+    callback=lambda: dict(media_processor.outcomes),
+)
+REGISTRY.gauge(
+    'shorts_bot_postprocess_active', 'ffmpeg processes running',
+    callback=lambda: {(): media_processor.active},
+)
+REGISTRY.gauge(
+    'shorts_bot_rate_limiter_users', 'Users with a live token bucket',
+    callback=lambda: {(): len(rate_limiter)},
+)
+REGISTRY.counter(
+    'shorts_bot_rate_limited_total', 'Links refused by the per-user rate limit',
+    callback=lambda: {(): rate_limiter.limited},
+)
+REGISTRY.gauge(
+    'shorts_bot_shared_jobs', 'Jobs in the shared intake/worker queue by status', ('status',),
+    callback=lambda: {(status,): count for status, count in job_queue.counts().items()} if job_queue else {},
+)
+REGISTRY.counter(
+    'shorts_bot_ydl_process_jobs_total', 'yt-dlp worker process jobs and replacements', ('event',),
+    callback=lambda: {
+        (event,): value for event, value in ydl_pool.stats().items() if event in ('jobs', 'recycled', 'crashed')
+    } if ydl_pool else {},
+)
+REGISTRY.gauge(
+    'shorts_bot_circuit_open', 'Platform circuit state (0 closed, 1 half-open, 2 open)', ('platform',),
+    callback=lambda: {
+        (platform,): ('closed', 'half_open', 'open').index(circuit['state'])
+        for platform, circuit in circuit_breaker.stats().items()
+    },
+)
+REGISTRY.counter(
+    'shorts_bot_db_writes_total', 'Queued database writes by outcome', ('outcome',),
+    callback=lambda: {
+        ('committed',): db.writes, ('failed',): db.write_failures, ('lost',): db.lost_writes,
+    } if db else {},
+)
+REGISTRY.counter(
+    'shorts_bot_db_batch_failures_total', 'Write batches rolled back as a whole',
+    callback=lambda: {(): db.batch_failures} if db else {},
+)
+REGISTRY.counter(
+    'shorts_bot_circuit_rejected_total', 'Requests failed fast by an open circuit', ('platform',),
+    callback=lambda: {(platform,): circuit['rejected'] for platform, circuit in circuit_breaker.stats().items()},
+)
+REGISTRY.gauge(
+    'shorts_bot_queue_jobs', 'Download jobs per platform and state', ('platform', 'state'),
+    callback=lambda: {
+        (platform, state): q[state]
+        for platform, q in scheduler.stats().items() for state in ('active', 'queued')
+    },
+)
+REGISTRY.gauge(
+    'shorts_bot_executor_saturation', 'Busy workers / pool size per platform', ('platform',),
+    callback=lambda: {
+        (platform,): q['active'] / q['workers'] for platform, q in scheduler.stats().items() if q['workers']
+    },
+)
+
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def detect_platform(url: str) -> Optional[str]:
-    """Detect platform from URL"""
-    for platform, pattern in PLATFORM_PATTERNS.items():
-        if re.search(pattern, url, re.IGNORECASE):
-            return platform
-    return None
-
-
-def is_shorts_url(url: str) -> bool:
-    """Check if URL is a short-form video"""
-    shorts_patterns = [
-        r'youtube\.com/shorts/',
-        r'instagram\.com/reel/',
-        r'tiktok\.com/@[\w\.]+/video/',
-        r'vm\.tiktok\.com/',
-        r'vt\.tiktok\.com/',
-    ]
-    return any(re.search(pattern, url, re.IGNORECASE) for pattern in shorts_patterns)
+class FileTooLargeError(Exception):
+    """Every format of the requested quality is over the upload limit"""
 
 
 def format_size(size_bytes: int) -> str:
@@ -110,6 +421,11 @@ def format_size(size_bytes: int) -> str:
     return f"{size_bytes:.1f}TB"
 
 
+def progress_topic(platform: str, url: str, quality: str) -> tuple:
+    """Progress key of a download; identical requests share it like they share the download"""
+    return platform, canonical_video_id(url) or url, quality
+
+
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename"""
     return re.sub(r'[<>:"/\\|?*]', '_', filename)[:100]
@@ -136,6 +452,12 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 2️⃣ Sifatni tanlang
 3️⃣ Videoni yuklab oling!
 
+📦 <b>Bir nechta video:</b>
+Bitta xabarda 10-20 tagacha link yuboring - hammasi albom qilib yuboriladi
+
+💬 <b>Istalgan chatda:</b>
+Bot nomi va linkni yozing (inline rejim) - tayyor videolar darhol chiqadi
+
 ✅ <b>Qo'llab-quvvatlanadigan formatlar:</b>
 • YouTube Shorts
 • Instagram Reels
@@ -194,7 +516,7 @@ async def mystat_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Statistika mavjud emas")
         return
 
-    stats = db.get_user_stats(user_id)
+    stats = await db.get_user_stats(user_id)
 
     stat_text = f"""
 📊 <b>Sizning statistikangiz:</b>
@@ -226,13 +548,14 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Statistika mavjud emas")
         return
 
-    stats = db.get_global_stats()
+    stats = await db.get_global_stats()
 
     stat_text = f"""
 📊 <b>GLOBAL STATISTIKA</b>
 
 👥 Jami foydalanuvchilar: {stats['total_users']}
 📥 Jami yuklashlar: {stats['total_downloads']}
+📦 Jami hajm: {format_size(stats['total_bytes'])}
 
 📊 Platformalar:
 • YouTube: {stats['youtube']}
@@ -247,6 +570,37 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     stat_text += f"\n• Eng yaxshi: {stats['most_used']}\n"
 
+    cache = video_cache.stats()
+    stat_text += (
+        f"\n💾 <b>Kesh:</b> {cache['files']} ta fayl, "
+        f"{format_size(cache['bytes'])} / {format_size(cache['max_bytes'])}\n"
+        f"• Hit: {cache['hits']} | Miss: {cache['misses']} | "
+        f"Evict: {cache['evictions']} ({cache['hit_rate']:.0%})\n"
+    )
+
+    disk = await asyncio.to_thread(disk_manager.usage)
+    stat_text += (
+        f"\n🗄 <b>Disk:</b> {format_size(disk['free_bytes'])} bo'sh, "
+        f"{format_size(disk['reserved_bytes'])} band qilingan, downloads: {format_size(disk['directory_bytes'])}\n"
+        f"• Rad etilgan: {disk['refused']} | Tozalangan: {disk['swept_files']} ta fayl\n"
+    )
+
+    queues = scheduler.stats()
+    if queues:
+        stat_text += "\n⚙️ <b>Navbat:</b>\n"
+        for platform, q in queues.items():
+            stat_text += (
+                f"• {platform}: {q['active']}/{q['workers']} ishlayapti, {q['queued']} kutmoqda, "
+                f"{q['users']} foydalanuvchi, o'rtacha {q['avg_wait']:.1f}s (max {q['max_wait']:.1f}s), "
+                f"rad: {q['rejected']}\n"
+            )
+
+    limits = rate_limiter.stats()
+    stat_text += (
+        f"\n🚦 <b>Limit:</b> {limits['users']} faol foydalanuvchi, "
+        f"{limits['limited']} marta cheklangan\n"
+    )
+
     await update.message.reply_text(stat_text, parse_mode='HTML')
 
 
@@ -262,7 +616,7 @@ async def errors_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ Xatoliklar mavjud emas")
         return
 
-    errors = db.get_recent_errors(limit=10)
+    errors = await db.get_error_signatures(limit=10)
 
     if not errors:
         await update.message.reply_text("✅ Hech qanday xatolik yo'q!")
@@ -271,9 +625,9 @@ async def errors_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     error_text = "❌ <b>OXIRGI XATOLIKLAR:</b>\n\n"
 
     for error in errors:
-        error_text += f"🕐 {error['timestamp']}\n"
-        error_text += f"👤 User: {error['user_id']}\n"
-        error_text += f"⚠️ {error['error_message'][:100]}...\n\n"
+        error_text += f"🔁 {error['count']}x | {error['first_seen']} → {error['last_seen']}\n"
+        error_text += f"👤 User: {error['last_user_id']}\n"
+        error_text += f"⚠️ {html.escape(error['sample'][:100])}...\n\n"
 
     await update.message.reply_text(error_text, parse_mode='HTML')
 
@@ -294,6 +648,11 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await quality_selected(update, context)
         return
 
+    # Quality for a whole batch
+    if data.startswith("batch_"):
+        await batch_selected(update, context)
+        return
+
 # ============================================================================
 # URL HANDLER
 # ============================================================================
@@ -305,10 +664,19 @@ async def handle_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     logger.info(f"📥 User {user_id} sent URL: {url[:50]}...")
 
+    # Several links in one message - download them together
+    links = classify_all(url)
+    if len(links) > 1:
+        await handle_batch(update, context, links)
+        return
+
     # Check if URL is valid
-    platform = detect_platform(url)
+    started = time.perf_counter()
+    classified = classify_url(url)
+    platform = classified.platform if classified else None
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage='classify', platform=platform or 'unknown')
 
-    if not platform:
+    if not classified:
         await update.message.reply_text(
             "❌ Link tanilmadi!\n\n"
             "✅ Qo'llab-quvvatlanadigan:\n"
@@ -319,21 +687,36 @@ async def handle_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Check if it's a shorts URL
-    if not is_shorts_url(url):
+    if not classified.is_short:
         await update.message.reply_text(
             "❌ Faqat qisqa videolar (Shorts/Reels) qo'llab-quvvatlanadi!\n\n"
             "Oddiy uzun YouTube videolar yuklanmaydi."
         )
         return
 
-    logger.info(f"📊 Detected: {platform.upper()} - shorts")
+    # Share links carry no id - follow the redirect before any download work
+    if classified.video_id is None:
+        with STAGE_SECONDS.time(stage='resolve', platform=platform):
+            resolved = await short_links.resolve(classified.normalized_url)
+
+        if resolved:
+            classified = classify_url(resolved)
+        elif resolved == DEAD_LINK:
+            await update.message.reply_text(
+                "❌ Havola ishlamayapti!\n\n"
+                "Video o'chirilgan yoki havola noto'g'ri."
+            )
+            return
+
+    logger.info(f"📊 Detected: {platform.upper()} - shorts ({classified.video_id or 'short link'})")
+
+    url = classified.normalized_url
 
     # Rate limiting
-    now = datetime.now().timestamp()
-    last_time = user_last_download.get(user_id, 0)
+    retry_after = rate_limiter.retry_after(user_id, user_tier(user_id))
 
-    if now - last_time < RATE_LIMIT_SECONDS:
-        wait_time = int(RATE_LIMIT_SECONDS - (now - last_time))
+    if retry_after > 0:
+        wait_time = max(int(retry_after + 0.999), 1)
         await update.message.reply_text(
             f"⏳ Iltimos {wait_time} soniya kuting!"
         )
@@ -343,32 +726,214 @@ async def handle_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
     context.user_data['url'] = url
     context.user_data['platform'] = platform
 
-    # Show quality options
-    keyboard = [
-        [
-            InlineKeyboardButton("144p", callback_data="quality_144p"),
-            InlineKeyboardButton("360p", callback_data="quality_360p"),
-        ],
-        [
-            InlineKeyboardButton("480p (SD)", callback_data="quality_480p"),
-            InlineKeyboardButton("720p (HD)", callback_data="quality_720p"),
-        ],
-        [
-            InlineKeyboardButton("1080p (Full HD)", callback_data="quality_1080p"),
-        ],
-    ]
+    # Start extraction now, while the user is still choosing (workers extract in intake mode)
+    metadata_task = None
+    if ROLE != 'intake':
+        metadata_task = asyncio.create_task(get_metadata(url, platform, user=user_id))
 
-    await update.message.reply_text(
+    message = await update.message.reply_text(
         f"✅ {platform.upper()} video topildi!\n\n"
         "📊 Sifatni tanlang:",
-        reply_markup=InlineKeyboardMarkup(keyboard)
+        reply_markup=build_quality_keyboard()
     )
 
+    if metadata_task:
+        context.application.create_task(refine_quality_keyboard(message, metadata_task))
+
+
+# ============================================================================
+# METADATA PREFETCH
+# ============================================================================
+
+def build_quality_keyboard(options: Optional[list] = None, prefix: str = "quality_") -> InlineKeyboardMarkup:
+    """Build quality keyboard from (quality, size) pairs (None = all presets)"""
+    if options is None:
+        options = [(quality, None) for quality in QUALITY_PRESETS]
+
+    buttons = []
+    for quality, size in options:
+        label = QUALITY_PRESETS[quality]['label']
+        if size:
+            label += f" ~{format_size(size)}"
+        buttons.append(InlineKeyboardButton(label, callback_data=f"{prefix}{quality}"))
+
+    # Two buttons per row
+    keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
+    return InlineKeyboardMarkup(keyboard)
+
+
+def estimate_format_size(fmt: dict, duration: float) -> Optional[int]:
+    """Estimate format size from filesize, filesize_approx or bitrate"""
+    size = fmt.get('filesize') or fmt.get('filesize_approx')
+    if not size and fmt.get('tbr') and duration:
+        size = fmt['tbr'] * 1000 / 8 * duration
+    return int(size) if size else None
+
+
+def select_format(formats: list, max_height: int, max_bytes: Optional[int] = None,
+                  duration: float = 0) -> Optional[dict]:
+    """Mirror 'best[height<=N][ext=mp4]/best[height<=N]' on extracted formats, optionally under max_bytes"""
+    progressive = [
+        f for f in formats
+        if f.get('vcodec') != 'none' and f.get('acodec') != 'none'
+        and f.get('height') and f['height'] <= max_height
+    ]
+    if max_bytes:
+        # Unknown sizes pass; the upload size check after download catches them
+        progressive = [f for f in progressive if (estimate_format_size(f, duration) or 0) <= max_bytes]
+    mp4 = [f for f in progressive if f.get('ext') == 'mp4']
+
+    candidates = mp4 or progressive
+    if not candidates:
+        return None
+    return max(candidates, key=lambda f: (f['height'], f.get('tbr') or 0))
+
+
+def available_qualities(info: dict) -> list:
+    """Quality presets that yield distinct formats, with estimated sizes"""
+    formats = info.get('formats') or [info]
+    duration = info.get('duration') or 0
+
+    options = []
+    seen = set()
+    for quality, preset in QUALITY_PRESETS.items():
+        # Qualities over the upload limit collapse into the best one that fits
+        fmt = select_format(formats, preset['height'], UPLOAD_LIMIT_MB * 1024 * 1024, duration)
+        if fmt is None or fmt.get('format_id') in seen:
+            continue
+        seen.add(fmt.get('format_id'))
+        options.append((quality, estimate_format_size(fmt, duration)))
+
+    return options
+
+
+def plan_format(info: dict, quality: str) -> Tuple[str, Optional[int]]:
+    """
+    yt-dlp format string for quality that stays under the upload limit.
+
+    Returns (format string, lowered height or None); raises
+    FileTooLargeError when every candidate is over the limit.
+    """
+    formats = info.get('formats') or [info]
+    duration = info.get('duration') or 0
+    max_height = QUALITY_PRESETS[quality]['height']
+    limit = UPLOAD_LIMIT_MB * 1024 * 1024
+
+    best = select_format(formats, max_height)
+    if best is None:
+        # Needs merging - yt-dlp filters by size where it knows it
+        return format_selector(max_height, limit), None
+
+    fit = select_format(formats, max_height, limit, duration)
+    if fit is None:
+        raise FileTooLargeError(f"{quality}: every format is over {UPLOAD_LIMIT_MB} MB")
+    if fit['height'] < best['height']:
+        return format_selector(fit['height'], limit), fit['height']
+    return format_selector(max_height, limit), None
+
+
+async def get_metadata(url: str, platform: str,
+                       on_queued: Optional[Callable[[int], Awaitable]] = None, user: Optional[int] = None) -> dict:
+    """Extract info dict without downloading (cached with a TTL)"""
+    info = metadata_cache.get(url)
+    if isinstance(info, Exception):
+        # Failed for good moments ago (usually in the prefetch) - don't ask again
+        raise info
+    if info is not None:
+        return info
+
+    def extract():
+        opts = build_ydl_opts(format_selector(QUALITY_PRESETS['1080p']['height']))
+        with STAGE_SECONDS.time(stage='metadata', platform=platform):
+            if ydl_pool:
+                return ydl_pool.extract(platform, url, opts)
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                return ydl.extract_info(url, download=False)
+
+    async def fetch():
+        try:
+            info = await call_platform(platform, lambda: scheduler.run(platform, extract, on_queued, user=user))
+        except Exception as e:
+            if classify_error(e).kind == PERMANENT:
+                metadata_cache.set(url, e, ttl=METADATA_ERROR_TTL_SECONDS)
+            raise
+        metadata_cache.set(url, info)
+        return info
+
+    return await metadata_flights.do(url, fetch)
+
+
+async def call_platform(platform: str, call: Callable[[], Awaitable]):
+    """Run a yt-dlp call unless the platform's circuit is open, and record how it went"""
+    circuit_breaker.check(platform)
+    try:
+        result = await call()
+    except Exception as e:
+        circuit_breaker.record_failure(platform, classify_error(e))
+        raise
+    circuit_breaker.record_success(platform)
+    return result
+
+
+async def refine_quality_keyboard(message, metadata_task: asyncio.Task):
+    """Replace the default keyboard with the qualities the video really has"""
+    try:
+        info = await metadata_task
+    except Exception as e:
+        logger.warning(f"⚠️ Metadata prefetch failed: {e}")
+        return
+
+    options = available_qualities(info)
+    if not options:
+        return
+
+    try:
+        await message.edit_reply_markup(reply_markup=build_quality_keyboard(options))
+    except BadRequest as e:
+        # Message already gone or keyboard unchanged
+        logger.debug(f"Keyboard not refined: {e}")
+
 
 # ============================================================================
 # QUALITY SELECTION AND DOWNLOAD
 # ============================================================================
 
+async def send_cached_video(query, user_id: int, platform: str, video_id: str, quality: str) -> bool:
+    """Re-send a previously uploaded video by its Telegram file_id"""
+    cached = await db.get_file_id(platform, video_id, quality)
+    if not cached:
+        return False
+
+    width = cached['width']
+    height = cached['height']
+    size_str = format_size(cached['file_size'])
+    caption = f"📹 {cached['title'][:100]}\n📊 {width}x{height} | {size_str}"
+
+    try:
+        await query.message.reply_video(
+            video=cached['file_id'],
+            caption=caption,
+            supports_streaming=True,
+            width=width,
+            height=height,
+            duration=int(cached['duration'])
+        )
+    except BadRequest as e:
+        # Telegram no longer accepts this file_id - fall back to download
+        logger.warning(f"⚠️ Stale file_id for {platform}:{video_id}:{quality}: {e}")
+        db.invalidate_file_id(platform, video_id, quality)
+        return False
+
+    db.add_download(user_id, platform, quality, cached['file_size'])
+
+    await query.message.reply_text(
+        f"✅ {quality} → {width}x{height} | {size_str}"
+    )
+
+    logger.info(f"⚡️ file_id hit: {platform}:{video_id}:{quality}")
+    return True
+
+
 async def quality_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle quality selection"""
     query = update.callback_query
@@ -386,46 +951,187 @@ async def quality_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Answer callback first
     await query.answer(f"⏳ {quality} yuklanmoqda...")
 
+    video_id = canonical_video_id(url)
+
+    # Already uploaded once - send by file_id without downloading
+    if db and video_id:
+        try:
+            if await send_cached_video(query, user_id, platform, video_id, quality):
+                rate_limiter.consume(user_id, user_tier(user_id))
+                REQUESTS_TOTAL.inc(platform=platform, quality=quality, source='file_id')
+                return
+        except Exception as e:
+            logger.warning(f"⚠️ file_id lookup failed: {e}")
+
     # Send loading message (NEW MESSAGE, not edit!)
     loading_msg = await query.message.reply_text(f"⏳ {quality} yuklanmoqda...")
 
     # Update rate limit
-    user_last_download[user_id] = datetime.now().timestamp()
+    rate_limiter.consume(user_id, user_tier(user_id))
+
+    # Multi-instance mode: a worker process downloads and uploads
+    if ROLE == 'intake':
+        await enqueue_download(query, loading_msg, url, platform, user_id, quality)
+        return
+
+    await deliver_video(query, loading_msg, url, platform, user_id, quality, video_id)
+
+
+def failure_reply(platform: str, failure: Failure, error: Exception) -> str:
+    """User-facing (HTML) explanation of a failed download"""
+    if failure.kind == BLOCKED and platform == 'youtube':
+        text = (
+            "⚠️ <b>YouTube Bot Detection</b>\n\n"
+            "❌ YouTube serverlar botni aniqladi va blokladi.\n\n"
+            "🔄 <b>Nima qilish kerak:</b>\n"
+            "1️⃣ Boshqa YouTube Shorts linkini sinab ko'ring\n"
+            "2️⃣ Instagram Reels ishlatish yaxshiroq ✅\n\n"
+            "📝 <b>Sabab:</b> YouTube bot detection juda kuchli.\n"
+            "Ba'zi videolar yuklanadi, ba'zilari bloklangan.\n\n"
+            "💡 <b>Tavsiya:</b> Instagram eng ishonchli!"
+        )
+    elif failure.kind == BLOCKED:
+        text = (
+            f"⚠️ <b>{platform.capitalize()} vaqtincha bloklamoqda</b>\n\n"
+            "❌ Platforma botdan keladigan so'rovlarni cheklab qo'ydi.\n\n"
+            "🔄 Bir necha daqiqadan so'ng qayta urinib ko'ring."
+        )
+    elif failure.kind == PERMANENT and platform == 'tiktok':
+        text = (
+            "⚠️ <b>TikTok Video Mavjud Emas</b>\n\n"
+            "❌ TikTok video yuklab olinmadi.\n\n"
+            "🔍 <b>Ehtimoliy sabablar:</b>\n"
+            "• Video o'chirilgan yoki maxfiy 🔒\n"
+            "• Mamlakat bo'yicha bloklangan 🌍\n"
+            "• TikTok bot detection 🤖\n\n"
+            "🔄 <b>Tavsiya:</b>\n"
+            "1️⃣ Boshqa TikTok video sinab ko'ring\n"
+            "2️⃣ Instagram Reels 100% ishlaydi ✅\n\n"
+            "💡 <b>Eng yaxshisi:</b> Instagram Reels ishlatish!"
+        )
+    elif failure.kind == PERMANENT:
+        text = {
+            'private': "🔒 <b>Video maxfiy</b>\n\nBu video yopiq akkauntda, uni yuklab bo'lmaydi.",
+            'removed': "❌ <b>Video o'chirilgan</b>\n\nBu video endi mavjud emas.",
+            'geo_blocked': "🌍 <b>Video bloklangan</b>\n\nBu video server joylashgan mamlakatda ko'rsatilmaydi.",
+            'unsupported': "❌ <b>Video topilmadi</b>\n\nBu havolada yuklab olinadigan video yo'q.",
+            'unavailable': "❌ <b>Video mavjud emas</b>\n\nPlatforma bu videoni hozir ko'rsatmayapti.",
+            'age_restricted': "🔞 <b>Yosh cheklovi</b>\n\nBu video faqat yoshi tasdiqlangan akkauntlarga ko'rsatiladi.",
+            'members_only': "💳 <b>Faqat a'zolar uchun</b>\n\nBu video kanal a'zolari uchun, bot uni yuklay olmaydi.",
+            'login_required': (
+                "🔐 <b>Akkaunt kerak</b>\n\nBu videoni faqat akkauntga kirib ko'rish mumkin, bot uni yuklay olmaydi."
+            ),
+        }.get(
+            failure.reason,
+            "❌ <b>Video yuklab bo'lmaydi</b>\n\nBu videoni yuklab olish imkoni yo'q."
+        )
+        text += "\n\nBoshqa link yuboring."
+    else:
+        return (
+            f"❌ <b>Xatolik yuz berdi:</b>\n\n"
+            f"<code>{html.escape(str(error)[:250])}</code>\n\n"
+            "Qaytadan urinib ko'ring yoki boshqa link yuboring."
+        )
+
+    if isinstance(error, CircuitOpenError):
+        text += f"\n\n⏳ Taxminan {max(int(error.retry_in // 60) + 1, 1)} daqiqadan so'ng qayta urinib ko'ring."
+    return text
+
+
+async def deliver_video(query, loading_msg, url: str, platform: str, user_id: int, quality: str,
+                        video_id: Optional[str]) -> bool:
+    """Download (or stream) the video, upload it and report the outcome in the chat"""
+
+    async def show_queue_position(position: int):
+        await loading_msg.edit_text(f"⏳ {quality}: siz navbatda #{position}...")
+
+    topic = progress_topic(platform, url, quality)
+    progress_reporter.subscribe(topic, loading_msg, quality)
 
     # Download video
+    video_path = None
     try:
-        video_path, title, height, width, duration = await download_video(
-            url, quality, user_id, platform
-        )
+        # Check sizes before downloading anything Telegram would refuse
+        try:
+            info = await get_metadata(url, platform, on_queued=show_queue_position, user=user_id)
+        except QueueFullError:
+            raise
+        except Exception as e:
+            # Private video, bot detection, open circuit: extracting again won't help
+            if classify_error(e).kind != TRANSIENT:
+                raise
+            # fetch_video retries the extraction and plans again
+            logger.warning(f"⚠️ Size check skipped, metadata failed: {e}")
+            info = None
+
+        if info:
+            _, lowered = plan_format(info, quality)
+            if lowered:
+                logger.info(f"📉 {quality} is over {UPLOAD_LIMIT_MB} MB, sending {lowered}p")
+                OVERSIZE_AVOIDED_TOTAL.inc(platform=platform, outcome='downgraded')
+                await loading_msg.edit_text(
+                    f"⚠️ {quality} {UPLOAD_LIMIT_MB} MB dan katta, {lowered}p yuklanmoqda..."
+                )
+
+        streamed = None
+        if STREAM_UPLOADS and video_id:
+            streamed = await stream_video(query, url, platform, video_id, quality)
+
+        if streamed:
+            sent, title, height, width, duration, file_size = streamed
+            size_str = format_size(file_size)
+            source = 'stream'
+
+            progress_reporter.unsubscribe(topic, loading_msg)
+            await loading_msg.delete()
+        else:
+            video_path, title, height, width, duration = await download_video(
+                url, quality, user_id, platform, on_queued=show_queue_position
+            )
 
-        # Determine orientation
-        is_vertical = height > width
-        orientation = "Vertikal" if is_vertical else "Gorizontal"
+            # Determine orientation
+            is_vertical = height > width
+            orientation = "Vertikal" if is_vertical else "Gorizontal"
 
-        file_size = os.path.getsize(video_path)
-        size_str = format_size(file_size)
+            file_size = os.path.getsize(video_path)
+            size_str = format_size(file_size)
 
-        logger.info(f"📊 {platform.upper()} | {orientation} | {width}x{height} | {size_str} | {duration:.3f}s")
+            logger.info(f"📊 {platform.upper()} | {orientation} | {width}x{height} | {size_str} | {duration:.3f}s")
 
-        # Delete loading message
-        await loading_msg.delete()
+            if file_size > UPLOAD_LIMIT_MB * 1024 * 1024:
+                logger.warning(f"⚠️ {size_str} is over the {UPLOAD_LIMIT_MB} MB upload limit")
+                ERRORS_TOTAL.inc(platform=platform, error_class='too_large')
+                await loading_msg.delete()
+                await query.message.reply_text(
+                    f"⚠️ Video juda katta ({size_str}). Telegram {UPLOAD_LIMIT_MB} MB gacha qabul qiladi, "
+                    "pastroq sifatni tanlang."
+                )
+                return False
 
-        # Send video
-        with open(video_path, 'rb') as video_file:
+            # Send video
             caption = f"📹 {title[:100]}\n📊 {width}x{height} | {size_str}"
+            flight_key = (platform, video_id, quality) if video_id else None
 
-            await query.message.reply_video(
-                video=video_file,
-                caption=caption,
-                supports_streaming=True,
-                width=width,
-                height=height,
-                duration=int(duration)
-            )
+            progress_reporter.publish(topic, phase='upload', total=file_size)
+            with STAGE_SECONDS.time(stage='upload', platform=platform, quality=quality):
+                sent = await upload_video(
+                    query, video_path, flight_key, caption, width, height, duration, platform, quality
+                )
+            source = 'file'
+
+            # Delete loading message
+            progress_reporter.unsubscribe(topic, loading_msg)
+            await loading_msg.delete()
+
+        FILE_SIZE_BYTES.observe(file_size, platform=platform, quality=quality)
+        REQUESTS_TOTAL.inc(platform=platform, quality=quality, source=source)
 
-        # Delete file
-        os.remove(video_path)
-        logger.info(f"🗑 Deleted file: {video_path}")
+        # Remember file_id so the next request skips download and upload
+        if db and video_id and sent.video:
+            db.save_file_id(
+                platform, video_id, quality, sent.video.file_id,
+                title, width, height, duration, file_size
+            )
 
         # Save to database
         if db:
@@ -437,79 +1143,290 @@ async def quality_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
         logger.info(f"✅ {quality} → {width}x{height} | {size_str}")
+        return True
 
+    except QueueFullError as e:
+        logger.warning(f"⚠️ {e}")
+        ERRORS_TOTAL.inc(platform=platform, error_class='queue_full')
 
-    except Exception as e:
-
-        error_msg = str(e)
+        try:
+            await loading_msg.delete()
+        except Exception:
+            pass
 
-        logger.error(f"❌ quality_selected error: {error_msg}")
+        await query.message.reply_text(
+            "⏳ Hozir yuklashlar juda ko'p. Bir necha daqiqadan so'ng qayta urinib ko'ring."
+        )
 
-        # Delete loading message
+    except FileTooLargeError as e:
+        logger.warning(f"⚠️ {e}")
+        OVERSIZE_AVOIDED_TOTAL.inc(platform=platform, outcome='refused')
+        ERRORS_TOTAL.inc(platform=platform, error_class='too_large')
 
         try:
+            await loading_msg.delete()
+        except Exception:
+            pass
 
+        await query.message.reply_text(
+            f"⚠️ Bu video barcha sifatlarda {UPLOAD_LIMIT_MB} MB dan katta, Telegram orqali yuborib bo'lmaydi."
+        )
+
+    except DiskFullError as e:
+        logger.warning(f"⚠️ {e}")
+        ERRORS_TOTAL.inc(platform=platform, error_class='disk_full')
+
+        try:
             await loading_msg.delete()
+        except Exception:
+            pass
 
-        except:
+        await query.message.reply_text(
+            "⏳ Server band, joy yetarli emas. Bir necha daqiqadan so'ng qayta urinib ko'ring."
+        )
+
+    except Exception as e:
+        error_msg = str(e)
+        failure = classify_error(e)
+        logger.error(f"❌ quality_selected error ({failure.kind}/{failure.reason}): {error_msg}")
+        ERRORS_TOTAL.inc(platform=platform, error_class=failure.reason)
 
+        try:
+            await loading_msg.delete()
+        except Exception:
             pass
 
-        if db:
+        # Refusals by an open circuit aren't new errors
+        if db and failure.reason != 'circuit_open':
             db.log_error(user_id, error_msg)
 
-        # YouTube-specific error message
-        if 'youtube' in error_msg.lower() and ('bot' in error_msg.lower() or 'sign in' in error_msg.lower()):
-            await query.message.reply_text(
-                "⚠️ <b>YouTube Bot Detection</b>\n\n"
-                "❌ YouTube serverlar botni aniqladi va blokladi.\n\n"
-                "🔄 <b>Nima qilish kerak:</b>\n"
-                "1️⃣ Boshqa YouTube Shorts linkini sinab ko'ring\n"
-                "2️⃣ Instagram Reels ishlatish yaxshiroq ✅\n\n"
-                "📝 <b>Sabab:</b> YouTube bot detection juda kuchli.\n"
-                "Ba'zi videolar yuklanadi, ba'zilari bloklangan.\n\n"
-                "💡 <b>Tavsiya:</b> Instagram eng ishonchli!",
-                parse_mode='HTML'
-            )
-        # TikTok-specific error message
-        elif 'tiktok' in error_msg.lower() and (
-                'not available' in error_msg.lower() or 'status code 0' in error_msg.lower()):
-            await query.message.reply_text(
-                "⚠️ <b>TikTok Video Mavjud Emas</b>\n\n"
-                "❌ TikTok video yuklab olinmadi.\n\n"
-                "🔍 <b>Ehtimoliy sabablar:</b>\n"
-                "• Video o'chirilgan yoki maxfiy 🔒\n"
-                "• Mamlakat bo'yicha bloklangan 🌍\n"
-                "• TikTok bot detection 🤖\n\n"
-                "🔄 <b>Tavsiya:</b>\n"
-                "1️⃣ Boshqa TikTok video sinab ko'ring\n"
-                "2️⃣ Instagram Reels 100% ishlaydi ✅\n\n"
-                "💡 <b>Eng yaxshisi:</b> Instagram Reels ishlatish!",
-                parse_mode='HTML'
+        await query.message.reply_text(failure_reply(platform, failure, e), parse_mode='HTML')
+
+    finally:
+        progress_reporter.unsubscribe(topic, loading_msg)
+        # Drop our lease; uncached files are deleted once nobody uses them
+        if video_path:
+            video_cache.release(video_path)
+
+    return False
+
+
+async def upload_video(query, video_path: str, flight_key: Optional[tuple], caption: str,
+                       width: int, height: int, duration: float, platform: str, quality: str) -> Message:
+    """Upload video file; concurrent uploads of the same video reuse the first file_id"""
+
+    async def send():
+        return await send_video_file(
+            query.message.reply_video, query.get_bot().local_mode, video_path, caption,
+            width, height, duration, platform, quality
+        )
+
+    return await shared_upload(query, flight_key, send, caption, width, height, duration)
+
+
+async def send_video_file(reply_video: Callable[..., Awaitable[Message]], local_mode: bool, video_path: str,
+                          caption: str, width: int, height: int, duration: float,
+                          platform: str, quality: str) -> Message:
+    """Send a downloaded file through reply_video, with a thumbnail when ffmpeg is available"""
+    options = dict(caption=caption, supports_streaming=True, width=width, height=height, duration=int(duration))
+
+    thumbnail_path = None
+    if media_processor.enabled:
+        with STAGE_SECONDS.time(stage='thumbnail', platform=platform, quality=quality):
+            thumbnail_path = await media_processor.thumbnail(
+                video_path, str(DOWNLOAD_DIR / f"{Path(video_path).stem}_{time.time_ns()}.jpg"), duration
             )
-        else:
-            # Other errors
-            await query.message.reply_text(
-                f"❌ <b>Xatolik yuz berdi:</b>\n\n"
-                f"<code>{error_msg[:250]}</code>\n\n"
-                "Qaytadan urinib ko'ring yoki boshqa link yuboring.",
-                parse_mode='HTML'
+
+    try:
+        if local_mode:
+            # Local Bot API server reads the files itself - no bytes uploaded
+            if thumbnail_path:
+                options['thumbnail'] = Path(thumbnail_path).resolve()
+            return await reply_video(video=Path(video_path).resolve(), **options)
+
+        with open(video_path, 'rb') as video_file:
+            if thumbnail_path:
+                with open(thumbnail_path, 'rb') as thumbnail_file:
+                    return await reply_video(video=video_file, thumbnail=thumbnail_file, **options)
+            return await reply_video(video=video_file, **options)
+    finally:
+        if thumbnail_path:
+            try:
+                os.unlink(thumbnail_path)
+            except OSError:
+                pass
+
+
+async def shared_upload(query, flight_key: Optional[tuple], send: Callable[[], Awaitable[Message]],
+                        caption: str, width: int, height: int, duration: float) -> Message:
+    """Run send() once per flight_key; concurrent callers re-send its file_id"""
+    own = {}
+
+    async def upload():
+        own['leader'] = True
+        own['sent'] = await send()
+        return own['sent'].video.file_id if own['sent'].video else None
+
+    if flight_key is None:
+        await upload()
+        return own['sent']
+
+    try:
+        file_id = await upload_flights.do(flight_key, upload)
+    except Exception:
+        if own.get('leader'):
+            raise
+        # The shared upload failed in another chat - upload our own copy
+        file_id = None
+
+    if 'sent' in own:
+        return own['sent']
+
+    if file_id is None:
+        await upload()
+        return own['sent']
+
+    return await query.message.reply_video(
+        video=file_id,
+        caption=caption,
+        supports_streaming=True,
+        width=width,
+        height=height,
+        duration=int(duration)
+    )
+
+
+async def stream_video(query, url: str, platform: str, video_id: str,
+                       quality: str) -> Optional[Tuple[Message, str, int, int, float, int]]:
+    """
+    Stream a progressive format from its source straight into sendVideo.
+
+    Returns (sent, title, height, width, duration, file_size), or None when
+    the format needs merging, its size is unknown or streaming fails - the
+    caller then downloads to a file as usual.
+    """
+    try:
+        info = await get_metadata(url, platform)
+    except Exception as e:
+        logger.warning(f"⚠️ Stream skipped, metadata failed: {e}")
+        STREAM_FALLBACKS_TOTAL.inc(platform=platform, reason='metadata')
+        return None
+
+    fmt = select_format(
+        info.get('formats') or [info], QUALITY_PRESETS[quality]['height'],
+        UPLOAD_LIMIT_MB * 1024 * 1024, info.get('duration') or 0
+    )
+
+    reason = None
+    if fmt is None:
+        reason = 'needs_merge'
+    elif fmt.get('protocol', 'https') not in ('http', 'https') or not fmt.get('url'):
+        reason = 'protocol'
+    elif not fmt.get('filesize'):
+        reason = 'unknown_size'
+    elif fmt['filesize'] > UPLOAD_LIMIT_MB * 1024 * 1024:
+        reason = 'too_large'
+
+    if reason:
+        STREAM_FALLBACKS_TOTAL.inc(platform=platform, reason=reason)
+        return None
+
+    title = sanitize_filename(info.get('title', 'video'))
+    width = fmt.get('width') or info.get('width') or 0
+    height = fmt.get('height') or info.get('height') or 0
+    duration = info.get('duration') or 0
+    file_size = fmt['filesize']
+
+    caption = f"📹 {title[:100]}\n📊 {width}x{height} | {format_size(file_size)}"
+    bot = query.get_bot()
+    topic = progress_topic(platform, url, quality)
+
+    async def send():
+        # Only the flight leader holds a buffer; waiters re-send its file_id
+        if not stream_uploader.try_acquire():
+            raise StreamError("stream memory ceiling reached")
+        try:
+            result = await stream_uploader.send_video(
+                bot.base_url,
+                {
+                    'chat_id': query.message.chat_id,
+                    'caption': caption,
+                    'supports_streaming': 'true',
+                    'width': width,
+                    'height': height,
+                    'duration': int(duration),
+                },
+                fmt['url'], fmt.get('http_headers'), file_size, f"{video_id}.mp4",
+                on_progress=lambda sent: progress_reporter.publish(
+                    topic, phase='stream', done=sent, total=file_size
+                )
             )
+        finally:
+            stream_uploader.release()
+        return Message.de_json(result, bot)
 
+    try:
+        with STAGE_SECONDS.time(stage='stream', platform=platform, quality=quality):
+            sent = await shared_upload(query, (platform, video_id, quality), send, caption, width, height, duration)
+    except StreamError as e:
+        logger.warning(f"⚠️ Stream failed, falling back to file: {e}")
+        STREAM_FALLBACKS_TOTAL.inc(platform=platform, reason='failed')
+        return None
+
+    logger.info(f"🌊 {platform.upper()} streamed | {width}x{height} | {format_size(file_size)}")
+    return sent, title, height, width, duration, file_size
+
+
+async def download_video(url: str, quality: str, user_id: int, platform: str,
+                         on_queued: Optional[Callable[[int], Awaitable]] = None) -> Tuple[str, str, int, int, float]:
+    """
+    Download video, coalescing identical concurrent requests.
+
+    The returned file is leased to the caller, who must call
+    video_cache.release(path) once it has been uploaded.
+    """
+    url_video_id = canonical_video_id(url)
+
+    if not url_video_id:
+        return await fetch_video(url, quality, user_id, platform, on_queued)
+
+    # fetch_video's lease is the leader's; waiters get one each
+    return await download_flights.do(
+        (platform, url_video_id, quality),
+        lambda: fetch_video(url, quality, user_id, platform, on_queued),
+        on_result=lambda result, participants: video_cache.acquire(result[0], participants - 1),
+        on_abandon=lambda result: video_cache.release(result[0])
+    )
 
-async def download_video(url: str, quality: str, user_id: int, platform: str) -> Tuple[str, str, int, int, float]:
-    """Download video with yt-dlp"""
-    timestamp = int(datetime.now().timestamp())
-    output_template = str(DOWNLOAD_DIR / f"{user_id}_{timestamp}_%(id)s.%(ext)s")
 
-    # Quality format
-    max_height = QUALITY_PRESETS[quality]['height']
-    format_choice = f'best[height<={max_height}][ext=mp4]/best[height<={max_height}]/best'
+def estimate_download_size(info: dict, quality: str) -> int:
+    """Bytes to reserve for a download (merged formats count video and audio)"""
+    formats = info.get('formats') or [info]
+    duration = info.get('duration') or 0
+
+    fmt = select_format(formats, QUALITY_PRESETS[quality]['height'], UPLOAD_LIMIT_MB * 1024 * 1024, duration)
+    if fmt is None:
+        # Needs merging: best video + best audio, written twice during the merge
+        fmt = max(formats, key=lambda f: f.get('tbr') or 0, default=info)
+        size = estimate_format_size(fmt, duration)
+        return 2 * size if size else DISK_DEFAULT_RESERVE_MB * 1024 * 1024
+
+    return estimate_format_size(fmt, duration) or DISK_DEFAULT_RESERVE_MB * 1024 * 1024
+
 
-    # yt-dlp options
+def format_selector(max_height: int, max_bytes: Optional[int] = None) -> str:
+    """yt-dlp format string for a height cap, optionally a size cap too"""
+    if not max_bytes:
+        return f'best[height<={max_height}][ext=mp4]/best[height<={max_height}]/best'
+
+    size = f'[filesize<?{max_bytes}][filesize_approx<?{max_bytes}]'
+    return f'best[height<={max_height}][ext=mp4]{size}/best[height<={max_height}]{size}/best{size}'
+
+
+def build_ydl_opts(format_choice: str, output_template: Optional[str] = None) -> dict:
+    """Build yt-dlp options"""
     ydl_opts = {
         'format': format_choice,
-        'outtmpl': output_template,
 
         # YouTube bot detection bypass
         'extractor_args': {
@@ -536,6 +1453,8 @@ async def download_video(url: str, quality: str, user_id: int, platform: str) ->
         'socket_timeout': 90,
         'retries': 5,
         'fragment_retries': 5,
+        # Keep the download's own mtime: Last-Modified would make it look old to the sweeper
+        'updatetime': False,
         'merge_output_format': 'mp4',
         'prefer_ffmpeg': True,
         'http_chunk_size': 10485760,
@@ -543,10 +1462,50 @@ async def download_video(url: str, quality: str, user_id: int, platform: str) ->
         'age_limit': None,
     }
 
-    def download():
+    if output_template:
+        ydl_opts['outtmpl'] = output_template
+
+    return ydl_opts
+
+
+async def fetch_video(url: str, quality: str, user_id: int, platform: str,
+                      on_queued: Optional[Callable[[int], Awaitable]] = None) -> Tuple[str, str, int, int, float]:
+    """Download video with yt-dlp (served from cache when possible), leased to the caller"""
+    url_video_id = canonical_video_id(url)
+
+    if url_video_id:
+        cached = video_cache.get(platform, url_video_id, quality)
+        if cached:
+            logger.info(f"💾 Cache hit: {platform}:{url_video_id}:{quality}")
+            video_cache.acquire(cached['path'])
+            return cached['path'], cached['title'], cached['height'], cached['width'], cached['duration']
+
+    # Unique per job: batch items of one user start within the same second
+    job_prefix = f"{user_id}_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}_"
+    output_template = str(DOWNLOAD_DIR / f"{job_prefix}%(id)s.%(ext)s")
+    # Called on the pool thread; only stores the latest state
+    progress_hook = progress_reporter.ydl_hook(progress_topic(platform, url, quality))
+
+    def download(info_dict: dict, format_choice: str):
         """Sync download function"""
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
+        with STAGE_SECONDS.time(stage='download', platform=platform, quality=quality):
+            # Reuse the prefetched info - formats are already resolved
+            try:
+                info_dict = yt_dlp.YoutubeDL.sanitize_info(info_dict, True)
+                if ydl_pool:
+                    info = ydl_pool.download(
+                        platform, build_ydl_opts(format_choice), output_template,
+                        compact_info(info_dict, QUALITY_PRESETS[quality]['height']), progress_hook
+                    )
+                else:
+                    ydl_opts = build_ydl_opts(format_choice, output_template)
+                    ydl_opts['progress_hooks'] = [progress_hook]
+                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                        info = ydl.process_ie_result(info_dict, download=True)
+            except Exception:
+                # Drop the partial file and .part fragments of this attempt
+                disk_manager.remove_job_files(job_prefix)
+                raise
 
             # Get video info
             title = sanitize_filename(info.get('title', 'video'))
@@ -554,30 +1513,589 @@ async def download_video(url: str, quality: str, user_id: int, platform: str) ->
             ext = info.get('ext', 'mp4')
 
             # Get actual file path
-            video_path = DOWNLOAD_DIR / f"{user_id}_{timestamp}_{video_id}.{ext}"
+            video_path = DOWNLOAD_DIR / f"{job_prefix}{video_id}.{ext}"
 
             # Get dimensions
             width = info.get('width', 0)
             height = info.get('height', 0)
             duration = info.get('duration', 0)
 
-            return str(video_path), title, height, width, duration
-
-    # Run in executor with retries
-    loop = asyncio.get_event_loop()
-    max_retries = 3
+            return str(video_path), title, height, width, duration, video_id
 
-    for attempt in range(max_retries):
+    # Run on the platform pool; how often a failure is retried depends on its class
+    attempt = 0
+    plan_quality = quality
+    while True:
         try:
-            result = await loop.run_in_executor(None, download)
-            return result
+            info_dict = await get_metadata(url, platform, on_queued if attempt == 0 else None, user=user_id)
+            # Quality format, lowered if the requested one is over the upload limit
+            format_choice, _ = plan_format(info_dict, plan_quality)
+            # The faststart remux writes a second copy next to the download
+            reserve = estimate_download_size(info_dict, quality) * (2 if media_processor.enabled else 1)
+            async with disk_manager.reserve(reserve):
+                video_path, title, height, width, duration, video_id = await call_platform(
+                    platform, lambda: scheduler.run(
+                        platform, lambda: download(info_dict, format_choice), on_queued if attempt == 0 else None,
+                        user=user_id
+                    )
+                )
+
+                # Leased right away, so the sweeper leaves it alone during post-processing
+                video_cache.acquire(video_path)
+                try:
+                    # Index first, so clients start playing before the whole file arrives
+                    with STAGE_SECONDS.time(stage='faststart', platform=platform, quality=quality):
+                        await media_processor.faststart(video_path)
+
+                    # Keep a copy for the next user asking for the same video (the lease moves along)
+                    cached_path = await asyncio.to_thread(
+                        video_cache.put, platform, url_video_id or video_id, quality, video_path,
+                        title, width, height, duration
+                    )
+                except BaseException:
+                    video_cache.release(video_path)
+                    raise
+            return cached_path or video_path, title, height, width, duration
+        except (QueueFullError, DiskFullError, FileTooLargeError, CircuitOpenError):
+            raise
         except Exception as e:
-            logger.error(f"Download error: {e}")
-            if attempt < max_retries - 1:
-                logger.warning(f"Download failed, retry {attempt + 1}/{max_retries}")
-                await asyncio.sleep(2 ** attempt)
-            else:
+            failure = classify_error(e)
+            policy = RETRY_POLICIES[failure.kind]
+            logger.error(f"Download error ({failure.kind}/{failure.reason}): {e}")
+            # Format URLs may have expired - extract again on retry
+            metadata_cache.pop(url)
+            if attempt + 1 >= policy.attempts:
                 raise
+            if failure.reason == 'format_unavailable':
+                # Nothing matched the selector - try the next lower preset
+                height = QUALITY_PRESETS[plan_quality]['height']
+                lower = [q for q, preset in QUALITY_PRESETS.items() if preset['height'] < height]
+                if not lower:
+                    raise
+                plan_quality = max(lower, key=lambda q: QUALITY_PRESETS[q]['height'])
+                logger.info(f"📉 Requested format not available, trying {plan_quality}")
+            logger.warning(f"Download failed, retry {attempt + 1}/{policy.attempts}")
+            RETRIES_TOTAL.inc(platform=platform)
+            await asyncio.sleep(policy.delay(attempt))
+            attempt += 1
+
+
+# ============================================================================
+# BATCH MODE
+# ============================================================================
+
+async def handle_batch(update: Update, context: ContextTypes.DEFAULT_TYPE, links: list):
+    """Several links in one message: resolve, dedupe and ask for one quality"""
+    user_id = update.effective_user.id
+    extra = max(len(links) - BATCH_MAX_LINKS, 0)
+    links = links[:BATCH_MAX_LINKS]
+
+    async def resolve(classified):
+        if classified.video_id is not None:
+            return classified
+        resolved = await short_links.resolve(classified.normalized_url)
+        if resolved:
+            return classify_url(resolved)
+        return None if resolved == DEAD_LINK else classified
+
+    with STAGE_SECONDS.time(stage='resolve', platform='batch'):
+        resolved = await asyncio.gather(*(resolve(classified) for classified in links))
+
+    # Share links and full links of the same video collapse into one
+    items = []
+    seen = set()
+    skipped = 0
+    for classified in resolved:
+        if classified is None or not classified.is_short:
+            skipped += 1
+        elif classified.normalized_url not in seen:
+            seen.add(classified.normalized_url)
+            items.append((classified.normalized_url, classified.platform))
+
+    logger.info(f"📦 User {user_id} sent {len(links)} links: {len(items)} videos, {skipped} skipped")
+
+    if not items:
+        await update.message.reply_text(
+            "❌ Linklar tanilmadi!\n\n"
+            "Faqat qisqa videolar (Shorts/Reels/TikTok) qo'llab-quvvatlanadi."
+        )
+        return
+
+    retry_after = rate_limiter.retry_after(user_id, user_tier(user_id))
+    if retry_after > 0:
+        wait_time = max(int(retry_after + 0.999), 1)
+        await update.message.reply_text(f"⏳ Iltimos {wait_time} soniya kuting!")
+        return
+
+    context.user_data['batch'] = items
+
+    # Extract all of them while the user is choosing
+    if ROLE != 'intake':
+        for url, platform in items:
+            context.application.create_task(prefetch_metadata(url, platform, user_id))
+
+    text = f"📦 {len(items)} ta video topildi!\n"
+    if skipped:
+        text += f"⚠️ {skipped} ta link o'tkazib yuborildi (uzun video yoki ishlamaydigan havola)\n"
+    if extra:
+        text += f"⚠️ Bir vaqtda {BATCH_MAX_LINKS} tagacha link, qolgan {extra} tasi olinmadi\n"
+    text += "\n📊 Hammasi uchun sifatni tanlang:"
+
+    await update.message.reply_text(text, reply_markup=build_quality_keyboard(prefix="batch_"))
+
+
+async def prefetch_metadata(url: str, platform: str, user_id: int):
+    """Warm the metadata cache, ignoring failures (the download retries)"""
+    try:
+        await get_metadata(url, platform, user=user_id)
+    except Exception as e:
+        logger.warning(f"⚠️ Metadata prefetch failed: {e}")
+
+
+async def batch_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Quality chosen for a batch: admit what the quota allows and deliver"""
+    query = update.callback_query
+    user_id = query.from_user.id
+    quality = query.data.replace("batch_", "")
+
+    items = context.user_data.get('batch')
+    if not items:
+        await query.answer("❌ Xatolik: linklar topilmadi")
+        await query.message.reply_text("❌ Xatolik: linklar topilmadi. Qaytadan yuboring.")
+        return
+
+    await query.answer(f"⏳ {quality} yuklanmoqda...")
+
+    # One token per video while the user's quota lasts
+    tier = user_tier(user_id)
+    admitted = []
+    for item in items:
+        if rate_limiter.retry_after(user_id, tier) > 0:
+            break
+        rate_limiter.consume(user_id, tier)
+        admitted.append(item)
+
+    if not admitted:
+        await query.message.reply_text("⏳ Limit tugadi, birozdan so'ng qayta urinib ko'ring.")
+        return
+
+    if len(admitted) < len(items):
+        await query.message.reply_text(
+            f"⏳ Limit sababli {len(admitted)} ta video yuklanadi, qolgan {len(items) - len(admitted)} tasini "
+            "keyinroq yuboring."
+        )
+
+    progress_msg = await query.message.reply_text(f"📦 {quality}: 0/{len(admitted)} tayyor...")
+
+    if ROLE == 'intake':
+        payload = {
+            'query': query.to_dict(),
+            'loading_msg': progress_msg.to_dict(),
+            'links': admitted,
+            'user_id': user_id,
+            'quality': quality,
+        }
+        job_id = await asyncio.to_thread(job_queue.enqueue, 'batch', payload)
+        logger.info(f"📤 Batch job {job_id} queued: {len(admitted)} videos for {user_id}")
+        return
+
+    await deliver_batch(query, progress_msg, admitted, user_id, quality)
+
+
+async def deliver_batch(query, progress_msg, links: list, user_id: int, quality: str) -> bool:
+    """Download links concurrently and send them as albums, with one progress message"""
+    total = len(links)
+    progress = {'done': 0}
+    topic = ('batch', progress_msg.chat_id, progress_msg.message_id)
+    progress_reporter.subscribe(topic, progress_msg, quality)
+
+    async def fetch(url: str, platform: str) -> Optional[dict]:
+        video_id = canonical_video_id(url)
+        try:
+            if db and video_id:
+                cached = await db.get_file_id(platform, video_id, quality)
+                if cached:
+                    return dict(cached, platform=platform, video_id=video_id, source='file_id')
+
+            path, title, height, width, duration = await download_video(url, quality, user_id, platform)
+            item = {
+                'path': path, 'title': title, 'width': width, 'height': height, 'duration': duration,
+                'file_size': os.path.getsize(path), 'platform': platform, 'video_id': video_id, 'source': 'file',
+            }
+            if item['file_size'] > UPLOAD_LIMIT_MB * 1024 * 1024:
+                video_cache.release(path)
+                raise FileTooLargeError(f"{format_size(item['file_size'])} is over {UPLOAD_LIMIT_MB} MB")
+            return item
+        except Exception as e:
+            logger.error(f"❌ Batch item {url} failed: {e}")
+            reason = 'too_large' if isinstance(e, FileTooLargeError) else classify_error(e).reason
+            ERRORS_TOTAL.inc(platform=platform, error_class=reason)
+            if db and reason != 'circuit_open':
+                db.log_error(user_id, str(e))
+            return None
+        finally:
+            progress['done'] += 1
+            progress_reporter.publish(topic, text=f"📦 {quality}: {progress['done']}/{total} tayyor...")
+
+    try:
+        results = await asyncio.gather(*(fetch(url, platform) for url, platform in links))
+    finally:
+        progress_reporter.unsubscribe(topic, progress_msg)
+    ready = [item for item in results if item]
+
+    delivered = 0
+    try:
+        for start in range(0, len(ready), MEDIA_GROUP_SIZE):
+            try:
+                delivered += await send_album(query, ready[start:start + MEDIA_GROUP_SIZE], user_id, quality)
+            except TelegramError as e:
+                logger.error(f"❌ Album upload failed: {e}")
+                ERRORS_TOTAL.inc(platform='batch', error_class='upload')
+    finally:
+        # Drop our leases; uncached files are deleted once nobody uses them
+        for item in ready:
+            if item.get('path'):
+                video_cache.release(item['path'])
+
+    text = f"✅ {quality}: {delivered}/{total} video yuborildi"
+    if delivered < total:
+        text += f"\n❌ {total - delivered} tasini yuklab bo'lmadi"
+    try:
+        await progress_msg.edit_text(text)
+    except TelegramError:
+        await query.message.reply_text(text)
+
+    logger.info(f"📦 Batch for {user_id}: {delivered}/{total} delivered")
+    return delivered > 0
+
+
+def batch_video(item: dict, local_mode: bool, files: ExitStack) -> dict:
+    """reply_video / InputMediaVideo arguments for a downloaded or previously uploaded video"""
+    if item['source'] == 'file_id':
+        video = item['file_id']
+    elif local_mode:
+        video = Path(item['path']).resolve()
+    else:
+        video = files.enter_context(open(item['path'], 'rb'))
+
+    return {
+        'caption': f"📹 {item['title'][:100]}\n📊 {item['width']}x{item['height']} | {format_size(item['file_size'])}",
+        'width': item['width'],
+        'height': item['height'],
+        'duration': int(item['duration']),
+        'supports_streaming': True,
+        'video': video,
+    }
+
+
+async def send_album(query, items: list, user_id: int, quality: str) -> int:
+    """Send up to MEDIA_GROUP_SIZE videos as one album, return how many arrived"""
+    local_mode = query.get_bot().local_mode
+    sent = []
+
+    # Albums need at least two items; a stale file_id fails the whole album
+    if len(items) > 1:
+        try:
+            with ExitStack() as files, STAGE_SECONDS.time(stage='upload', platform='batch', quality=quality):
+                media = []
+                for item in items:
+                    options = batch_video(item, local_mode, files)
+                    media.append(InputMediaVideo(media=options.pop('video'), **options))
+                messages = await query.message.reply_media_group(media=media)
+            sent = list(zip(items, messages))
+        except BadRequest as e:
+            logger.warning(f"⚠️ Album rejected, sending one by one: {e}")
+
+    if not sent:
+        for item in items:
+            try:
+                with ExitStack() as files:
+                    message = await query.message.reply_video(**batch_video(item, local_mode, files))
+                sent.append((item, message))
+            except BadRequest as e:
+                logger.warning(f"⚠️ Batch video not sent: {e}")
+                if item['source'] == 'file_id':
+                    db.invalidate_file_id(item['platform'], item['video_id'], quality)
+
+    for item, message in sent:
+        REQUESTS_TOTAL.inc(platform=item['platform'], quality=quality, source=item['source'])
+        if item['source'] == 'file':
+            FILE_SIZE_BYTES.observe(item['file_size'], platform=item['platform'], quality=quality)
+            # Remember file_id so the next request skips download and upload
+            if db and item['video_id'] and message.video:
+                db.save_file_id(
+                    item['platform'], item['video_id'], quality, message.video.file_id,
+                    item['title'], item['width'], item['height'], item['duration'], item['file_size']
+                )
+        if db:
+            db.add_download(user_id, item['platform'], quality, item['file_size'])
+
+    return len(sent)
+
+
+# ============================================================================
+# INLINE MODE
+# ============================================================================
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Answer "@bot <link>" from stored file_ids within INLINE_BUDGET_SECONDS"""
+    query = update.inline_query
+    started = time.perf_counter()
+
+    def late_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.warning(f"⚠️ Inline lookup failed: {task.exception()}")
+
+    # The lookup outlives the budget, so the next keystroke finds its result
+    lookup = asyncio.create_task(inline_results(context.application, query.query.strip(), query.from_user.id))
+    try:
+        results, complete, platform, outcome = await asyncio.wait_for(asyncio.shield(lookup), INLINE_BUDGET_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️ Inline lookup over the {INLINE_BUDGET_SECONDS:g}s budget: {query.query[:50]}")
+        lookup.add_done_callback(late_failure)
+        results, complete, platform, outcome = [inline_placeholder(query.query)], False, 'unknown', 'timeout'
+
+    if outcome:
+        INLINE_ANSWERS_TOTAL.inc(platform=platform, outcome=outcome)
+
+    try:
+        # Placeholders must not be cached - the video shows up a few seconds later
+        await query.answer(results, cache_time=INLINE_CACHE_SECONDS if complete else 0, is_personal=not complete)
+    except BadRequest as e:
+        # The user kept typing and Telegram dropped this query
+        logger.warning(f"⚠️ Inline answer rejected: {e}")
+
+    STAGE_SECONDS.observe(time.perf_counter() - started, stage='inline', platform=platform)
+
+
+async def inline_results(app: Application, text: str, user_id: int) -> Tuple[list, bool, str, Optional[str]]:
+    """Cached videos for a link: (results, complete, platform, outcome); never downloads"""
+    classified = classify_url(text)
+    if not classified or not classified.is_short or not db:
+        return [], True, 'unknown', None
+
+    platform = classified.platform
+
+    if classified.video_id is None:
+        resolved = await short_links.resolve(classified.normalized_url)
+        if not resolved:
+            # Dead links stay dead; a failed lookup may work on the next keystroke
+            return [], resolved == DEAD_LINK, platform, 'no_video'
+        classified = classify_url(resolved)
+
+    url = classified.normalized_url
+    video_id = canonical_video_id(url)
+    cached = await db.get_file_ids(platform, video_id)
+
+    results = []
+    for quality, preset in QUALITY_PRESETS.items():
+        row = cached.get(quality)
+        if not row:
+            continue
+        size_str = format_size(row['file_size'])
+        results.append(InlineQueryResultCachedVideo(
+            id=quality,
+            video_file_id=row['file_id'],
+            title=f"{preset['label']} | {size_str}",
+            description=row['title'][:100],
+            caption=f"📹 {row['title'][:100]}\n📊 {row['width']}x{row['height']} | {size_str}",
+        ))
+
+    if results:
+        return results, True, platform, 'hit'
+
+    # Nothing uploaded yet - fetch it in the background, never in the answer
+    wait = start_inline_fetch(app, url, platform, video_id, user_id)
+    return [inline_placeholder(url, wait)], False, platform, 'limited' if wait else 'pending'
+
+
+def inline_placeholder(url: str, wait: float = 0) -> InlineQueryResultArticle:
+    """Result shown while the video is not cached yet (sends the bare link if picked)"""
+    if wait:
+        title = f"⏳ Iltimos {max(int(wait + 0.999), 1)} soniya kuting!"
+    else:
+        title = "⏳ Video tayyorlanmoqda..."
+
+    return InlineQueryResultArticle(
+        id='pending',
+        title=title,
+        description="Bir necha soniyadan so'ng qayta urinib ko'ring",
+        input_message_content=InputTextMessageContent(url),
+    )
+
+
+def start_inline_fetch(app: Application, url: str, platform: str, video_id: str, user_id: int) -> float:
+    """Start caching a video for inline answers; returns the rate limit wait (0 = started or running)"""
+    key = (platform, video_id, INLINE_QUALITY)
+    if key in inline_fetches:
+        return 0
+
+    retry_after = rate_limiter.retry_after(user_id, user_tier(user_id))
+    if retry_after > 0:
+        return retry_after
+
+    rate_limiter.consume(user_id, user_tier(user_id))
+    inline_fetches.set(key, True)
+
+    if ROLE == 'intake':
+        app.create_task(enqueue_inline_fetch(url, platform, video_id, user_id))
+    else:
+        app.create_task(cache_inline_video(app.bot, url, platform, video_id, user_id))
+    return 0
+
+
+async def cache_inline_video(bot, url: str, platform: str, video_id: str, user_id: int) -> bool:
+    """Download a video and upload it to the cache chat, storing its file_id"""
+    quality = INLINE_QUALITY
+    video_path = None
+    try:
+        video_path, title, height, width, duration = await download_video(url, quality, user_id, platform)
+
+        file_size = os.path.getsize(video_path)
+        if file_size > UPLOAD_LIMIT_MB * 1024 * 1024:
+            raise FileTooLargeError(f"{format_size(file_size)} is over the {UPLOAD_LIMIT_MB} MB upload limit")
+
+        caption = f"📹 {title[:100]}\n📊 {width}x{height} | {format_size(file_size)}"
+        with STAGE_SECONDS.time(stage='upload', platform=platform, quality=quality):
+            sent = await send_video_file(
+                partial(bot.send_video, INLINE_CACHE_CHAT_ID, disable_notification=True), bot.local_mode,
+                video_path, caption, width, height, duration, platform, quality
+            )
+
+        if sent.video:
+            db.save_file_id(platform, video_id, quality, sent.video.file_id, title, width, height, duration, file_size)
+
+        REQUESTS_TOTAL.inc(platform=platform, quality=quality, source='inline')
+        logger.info(f"📥 Inline cache filled: {platform}:{video_id}:{quality}")
+        return True
+
+    except Exception as e:
+        logger.warning(f"⚠️ Inline fetch failed for {platform}:{video_id}: {e}")
+        ERRORS_TOTAL.inc(platform=platform, error_class='inline_fetch')
+        return False
+
+    finally:
+        if video_path:
+            video_cache.release(video_path)
+
+
+# ============================================================================
+# MULTI-INSTANCE (INTAKE / WORKER)
+# ============================================================================
+
+async def enqueue_download(query, loading_msg, url: str, platform: str, user_id: int, quality: str):
+    """Hand a download to the worker processes through the shared job queue"""
+    payload = {
+        'query': query.to_dict(),
+        'loading_msg': loading_msg.to_dict(),
+        'url': url,
+        'platform': platform,
+        'user_id': user_id,
+        'quality': quality,
+    }
+    job_id = await asyncio.to_thread(job_queue.enqueue, 'download', payload)
+    position = await asyncio.to_thread(job_queue.position, job_id)
+
+    logger.info(f"📤 Job {job_id} queued: {platform}:{quality} for {user_id} (#{position})")
+    if position > 1:
+        await loading_msg.edit_text(f"⏳ {quality}: siz navbatda #{position}...")
+
+
+async def enqueue_inline_fetch(url: str, platform: str, video_id: str, user_id: int):
+    """Hand an inline cache fill to the worker processes"""
+    payload = {'url': url, 'platform': platform, 'video_id': video_id, 'user_id': user_id}
+    job_id = await asyncio.to_thread(job_queue.enqueue, 'inline', payload)
+    logger.info(f"📤 Job {job_id} queued: inline {platform}:{video_id}")
+
+
+async def run_job(bot, job, owner: str):
+    """Deliver one claimed job, heartbeating its lease until done"""
+    payload = job.payload
+
+    if job.kind == 'inline':
+        work = asyncio.create_task(cache_inline_video(
+            bot, payload['url'], payload['platform'], payload['video_id'], payload['user_id']
+        ))
+    elif job.kind == 'batch':
+        query = CallbackQuery.de_json(payload['query'], bot)
+        loading_msg = Message.de_json(payload['loading_msg'], bot)
+        work = asyncio.create_task(deliver_batch(
+            query, loading_msg, [tuple(link) for link in payload['links']], payload['user_id'], payload['quality']
+        ))
+    else:
+        query = CallbackQuery.de_json(payload['query'], bot)
+        loading_msg = Message.de_json(payload['loading_msg'], bot)
+        url = payload['url']
+        work = asyncio.create_task(deliver_video(
+            query, loading_msg, url, payload['platform'], payload['user_id'], payload['quality'],
+            canonical_video_id(url)
+        ))
+
+    while True:
+        done, _ = await asyncio.wait({work}, timeout=JOB_LEASE_SECONDS / 3)
+        if done:
+            break
+        if not await asyncio.to_thread(job_queue.heartbeat, job.id, owner, JOB_LEASE_SECONDS):
+            # Another worker took over - don't deliver twice
+            logger.warning(f"⚠️ Lease on job {job.id} lost, abandoning it")
+            work.cancel()
+            await asyncio.gather(work, return_exceptions=True)
+            return
+
+    try:
+        delivered = work.result()
+    except Exception as e:
+        logger.error(f"❌ Job {job.id} crashed: {e}")
+        await asyncio.to_thread(job_queue.fail, job.id, owner, str(e))
+        return
+
+    if delivered:
+        await asyncio.to_thread(job_queue.complete, job.id, owner)
+    else:
+        # The user has already been told what went wrong
+        await asyncio.to_thread(job_queue.fail, job.id, owner, 'delivery failed')
+
+
+async def run_worker(app: Application):
+    """Claim download jobs from the shared queue until stopped"""
+    owner = WORKER_NAME
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    slots = asyncio.Semaphore(WORKER_JOBS)
+    tasks = set()
+    logger.info(f"👷 Worker {owner} started: {WORKER_JOBS} jobs at a time")
+
+    try:
+        while not stop.is_set():
+            await slots.acquire()
+            job = await asyncio.to_thread(job_queue.claim, owner, JOB_LEASE_SECONDS)
+
+            if job is None:
+                slots.release()
+                try:
+                    await asyncio.wait_for(stop.wait(), WORKER_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(run_job(app.bot, job, owner))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            task.add_done_callback(lambda _: slots.release())
+    finally:
+        # Running jobs keep heartbeating until they finish
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
 
 
 # ============================================================================
@@ -619,21 +2137,109 @@ async def error_handler(update: object, context: ContextTypes.DEFAULT_TYPE):
 # MAIN
 # ============================================================================
 
-def main():
-    """Start the bot"""
-    logger.info("✅ Config loaded. Admin ID: %d", ADMIN_ID)
-    logger.info("🚀 Initializing bot...")
+background_tasks = set()
 
-    # Start health check server
-    try:
-        from healthcheck import start_health_check_server
-        start_health_check_server()
-        logger.info("✅ Health check server started on port 8080")
-    except Exception as e:
-        logger.warning(f"⚠️ Health check server not started: {e}")
 
-    # Create application
-    app = Application.builder().token(BOT_TOKEN).build()
+async def database_maintenance_loop():
+    """Periodically roll up, prune and compact the database"""
+    await asyncio.sleep(60)
+
+    while True:
+        try:
+            await db.run_maintenance(DOWNLOAD_RETENTION_DAYS, ERROR_RETENTION_DAYS)
+            if job_queue:
+                await asyncio.to_thread(job_queue.prune)
+        except Exception as e:
+            logger.error(f"❌ Database maintenance failed: {e}")
+
+        await asyncio.sleep(DB_MAINTENANCE_HOURS * 3600)
+
+
+async def disk_janitor_loop():
+    """Periodically remove files left behind by failed or interrupted jobs"""
+    while True:
+        await asyncio.sleep(DISK_SWEEP_MINUTES * 60)
+
+        try:
+            await asyncio.to_thread(disk_manager.sweep)
+            await asyncio.to_thread(video_cache.sweep_orphans, DISK_ORPHAN_MINUTES * 60)
+        except Exception as e:
+            logger.error(f"❌ Disk sweep failed: {e}")
+
+        if not disk_manager.healthy():
+            logger.warning(f"⚠️ Low disk space: {disk_manager.free_bytes() / 1048576:.0f} MB free")
+
+
+async def cache_flush_loop():
+    """Periodically persist the cache index off the event loop"""
+    while True:
+        await asyncio.sleep(CACHE_FLUSH_SECONDS)
+
+        try:
+            await asyncio.to_thread(video_cache.flush)
+        except Exception as e:
+            logger.error(f"❌ Cache index flush failed: {e}")
+
+
+async def on_startup(app: Application):
+    """Start background jobs"""
+    # Intake never downloads - its (empty) cache must not sweep anything
+    if ROLE != 'intake':
+        # Nothing is in flight yet and the directory is ours - every loose file is from a previous run
+        removed = disk_manager.sweep(max_age=0) + video_cache.sweep_orphans(DISK_ORPHAN_MINUTES * 60)
+        logger.info(f"🧹 Startup sweep removed {removed} files")
+
+        task = asyncio.create_task(disk_janitor_loop())
+        background_tasks.add(task)
+
+        task = asyncio.create_task(cache_flush_loop())
+        background_tasks.add(task)
+
+    if db and ROLE != 'worker':
+        task = asyncio.create_task(database_maintenance_loop())
+        background_tasks.add(task)
+        logger.info("✅ Database maintenance scheduled")
+
+
+async def on_shutdown(app: Application):
+    """Stop background workers and flush pending database writes"""
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    background_tasks.clear()
+
+    await scheduler.shutdown()
+    logger.info("🛑 Download workers stopped")
+
+    await short_links.close()
+    await stream_uploader.close()
+    await progress_reporter.close()
+    await asyncio.to_thread(video_cache.flush)
+
+    if ydl_pool:
+        ydl_pool.close()
+
+    if db:
+        db.close()
+
+    if job_queue:
+        job_queue.close()
+
+
+def build_application(base_url: Optional[str] = None) -> Application:
+    """Create the application and register handlers"""
+    builder = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .post_init(on_startup)
+        .post_shutdown(on_shutdown)
+    )
+    base_url = base_url or BOT_API_URL
+    if base_url:
+        builder = builder.base_url(base_url)
+    if BOT_API_LOCAL:
+        builder = builder.local_mode(True)
+    app = builder.build()
 
     # Add handlers
     app.add_error_handler(error_handler)
@@ -660,14 +2266,112 @@ def main():
     app.add_handler(CallbackQueryHandler(button_callback))
     logger.info("✅ Quality handler registered")
 
+    app.add_handler(InlineQueryHandler(inline_query))
+    logger.info("✅ Inline handler registered")
+
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, echo))
     logger.info("✅ Echo handler registered")
 
+    return app
+
+
+def build_web_server(app: Application, port: int = PORT):
+    """One HTTP server for the webhook, /health and /metrics"""
+    from healthcheck import WebServer
+
+    async def on_update(data: dict):
+        try:
+            update = Update.de_json(data, app.bot)
+        except Exception as e:
+            # Answered with 200 anyway: Telegram would resend the same payload forever
+            logger.warning(f"⚠️ Undecodable webhook update {data.get('update_id')}: {e}")
+            return
+        await app.update_queue.put(update)
+
+    return WebServer(port=port, webhook_path=WEBHOOK_PATH, secret_token=WEBHOOK_SECRET, on_update=on_update)
+
+
+async def run_webhook(app: Application):
+    """Receive updates by webhook; fall back to polling if it can't be set"""
+    server = build_web_server(app)
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+
+    await server.start()
+    await app.start()
+
+    try:
+        try:
+            await app.bot.set_webhook(
+                url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES,
+                drop_pending_updates=True,
+            )
+            logger.info(f"✅ Webhook set: {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+        except TelegramError as e:
+            logger.error(f"❌ Webhook not set, falling back to polling: {e}")
+            await app.updater.start_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=True)
+
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await stop.wait()
+    finally:
+        if app.updater.running:
+            await app.updater.stop()
+        await app.stop()
+        await server.stop()
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+
+def main():
+    """Start the bot"""
+    logger.info("✅ Config loaded. Admin ID: %d", ADMIN_ID)
+    logger.info("🚀 Initializing bot...")
+
+    from healthcheck import register_health_check
+    register_health_check('disk', disk_manager.healthy)
+
+    # Create application
+    app = build_application()
+
     logger.info("🤖 Bot ishga tushdi!")
     logger.info("✅ Error handling enabled")
     logger.info("✅ Auto-retry enabled")
     logger.info("✅ Health check enabled")
 
+    if ROLE not in ('standalone', 'intake', 'worker'):
+        raise ValueError(f"Unknown ROLE: {ROLE}")
+
+    if ROLE == 'worker':
+        # Download capacity: run as many of these as needed
+        try:
+            from healthcheck import start_health_check_server
+            start_health_check_server(PORT)
+        except Exception as e:
+            logger.warning(f"⚠️ Health check server not started: {e}")
+
+        asyncio.run(run_worker(app))
+        return
+
+    if WEBHOOK_URL:
+        # Updates, /health and /metrics share one asyncio server on PORT
+        asyncio.run(run_webhook(app))
+        return
+
+    # Start health check server
+    try:
+        from healthcheck import start_health_check_server
+        start_health_check_server(PORT)
+    except Exception as e:
+        logger.warning(f"⚠️ Health check server not started: {e}")
+
     # Start polling
     app.run_polling(allowed_updates=Update.ALL_TYPES, drop_pending_updates=True)
 
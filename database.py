@@ -6,21 +6,52 @@ Lightweight SQLite database for bot statistics
 """
 
 import sqlite3
+import asyncio
+import atexit
+import hashlib
 import logging
+import queue
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
+
+from metrics import STAGE_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Volatile parts of error messages, replaced before fingerprinting
+ERROR_NORMALIZERS = [
+    (re.compile(r'https?://\S+'), '<url>'),
+    (re.compile(r'\b[0-9a-f]{8,}\b', re.IGNORECASE), '<hex>'),
+    (re.compile(r'\b[\w-]{11}\b(?=:)'), '<id>'),
+    (re.compile(r'\d+'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def error_signature(error_message: str) -> str:
+    """Fingerprint an error message, ignoring URLs, ids and numbers"""
+    normalized = error_message or ''
+    for pattern, replacement in ERROR_NORMALIZERS:
+        normalized = pattern.sub(replacement, normalized)
+    return hashlib.sha1(normalized.strip()[:500].encode('utf-8')).hexdigest()[:16]
+
 
 class Database:
     """Simple database for bot statistics"""
 
-    def __init__(self, db_path: str = "bot_stats.db"):
+    def __init__(self, db_path: str = "bot_stats.db", read_only: bool = False):
         """Initialize database"""
         self.db_path = Path(db_path)
+        self.read_only = read_only
         self.conn = None
-        self._create_tables()
+        self._in_batch = False
+        if not read_only:
+            self._create_tables()
         logger.info(f"✅ Light Database initialized: {db_path}")
 
     def _get_connection(self):
@@ -28,8 +59,40 @@ class Database:
         if self.conn is None:
             self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
             self.conn.row_factory = sqlite3.Row
+
+            # WAL lets the reader run while the writer commits;
+            # NORMAL only fsyncs on checkpoint, which is safe in WAL mode
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.execute('PRAGMA temp_store=MEMORY')
+            self.conn.execute('PRAGMA cache_size=-8000')
+            self.conn.execute('PRAGMA busy_timeout=5000')
+            if self.read_only:
+                self.conn.execute('PRAGMA query_only=ON')
         return self.conn
 
+    def _commit(self):
+        """Commit unless a batch is open"""
+        if not self._in_batch:
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """Group several writes into one transaction"""
+        conn = self._get_connection()
+        # Explicit: sqlite3 opens no transaction before a SAVEPOINT, which would then commit on RELEASE
+        if not conn.in_transaction:
+            conn.execute('BEGIN')
+        self._in_batch = True
+        try:
+            yield
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._in_batch = False
+
     def _create_tables(self):
         """Create database tables"""
         conn = self._get_connection()
@@ -68,7 +131,109 @@ class Database:
             )
         ''')
 
+        # Telegram file_id table (re-send without uploading)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_ids (
+                platform TEXT,
+                video_id TEXT,
+                quality TEXT,
+                file_id TEXT,
+                title TEXT,
+                width INTEGER,
+                height INTEGER,
+                duration REAL,
+                file_size INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (platform, video_id, quality)
+            )
+        ''')
+
+        # Aggregate counters, kept in step with downloads by add_download
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_counters (
+                user_id INTEGER,
+                platform TEXT,
+                quality TEXT,
+                downloads INTEGER DEFAULT 0,
+                bytes INTEGER DEFAULT 0,
+                last_download TIMESTAMP,
+                PRIMARY KEY (user_id, platform, quality)
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS global_counters (
+                platform TEXT,
+                quality TEXT,
+                downloads INTEGER DEFAULT 0,
+                bytes INTEGER DEFAULT 0,
+                last_download TIMESTAMP,
+                PRIMARY KEY (platform, quality)
+            ) WITHOUT ROWID
+        ''')
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER DEFAULT 0
+            )
+        ''')
+
+        # Daily download summaries (raw rows older than retention)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS daily_downloads (
+                day TEXT,
+                platform TEXT,
+                quality TEXT,
+                downloads INTEGER DEFAULT 0,
+                bytes INTEGER DEFAULT 0,
+                PRIMARY KEY (day, platform, quality)
+            ) WITHOUT ROWID
+        ''')
+
+        # Per-user totals of rolled-up rows, so counters can be rebuilt after a rollup
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_rollups (
+                user_id INTEGER,
+                platform TEXT,
+                quality TEXT,
+                downloads INTEGER DEFAULT 0,
+                bytes INTEGER DEFAULT 0,
+                last_download TIMESTAMP,
+                PRIMARY KEY (user_id, platform, quality)
+            ) WITHOUT ROWID
+        ''')
+
+        # Deduplicated errors
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS error_signatures (
+                signature TEXT PRIMARY KEY,
+                sample TEXT,
+                count INTEGER DEFAULT 0,
+                first_seen TIMESTAMP,
+                last_seen TIMESTAMP,
+                last_user_id INTEGER
+            )
+        ''')
+
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_downloads_timestamp ON downloads(timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_errors_timestamp ON errors(timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_error_signatures_last_seen ON error_signatures(last_seen)')
+
         conn.commit()
+
+        # Errors logged before signatures existed - fingerprint once
+        cursor.execute('SELECT 1 FROM error_signatures LIMIT 1')
+        if cursor.fetchone() is None:
+            cursor.execute('SELECT 1 FROM errors LIMIT 1')
+            if cursor.fetchone() is not None:
+                self.rebuild_error_signatures()
+
+        # Existing database from before the counters existed - backfill once
+        cursor.execute("SELECT 1 FROM counters WHERE name = 'users'")
+        if cursor.fetchone() is None:
+            self.rebuild_aggregates()
+
         logger.info("✅ Database tables created")
 
     def add_user(self, user_id: int, username: str):
@@ -79,12 +244,20 @@ class Database:
         cursor.execute('''
             INSERT INTO users (user_id, username, first_seen, last_seen)
             VALUES (?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            ON CONFLICT(user_id) DO UPDATE SET
-                username = excluded.username,
-                last_seen = CURRENT_TIMESTAMP
+            ON CONFLICT(user_id) DO NOTHING
         ''', (user_id, username))
 
-        conn.commit()
+        if cursor.rowcount == 1:
+            cursor.execute('''
+                UPDATE counters SET value = value + 1 WHERE name = 'users'
+            ''')
+        else:
+            cursor.execute('''
+                UPDATE users SET username = ?, last_seen = CURRENT_TIMESTAMP
+                WHERE user_id = ?
+            ''', (username, user_id))
+
+        self._commit()
 
     def add_download(self, user_id: int, platform: str, quality: str, file_size: int):
         """Record a download"""
@@ -102,7 +275,26 @@ class Database:
             WHERE user_id = ?
         ''', (user_id,))
 
-        conn.commit()
+        # Update counters in the same transaction
+        cursor.execute('''
+            INSERT INTO user_counters (user_id, platform, quality, downloads, bytes, last_download)
+            VALUES (?, ?, ?, 1, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id, platform, quality) DO UPDATE SET
+                downloads = downloads + 1,
+                bytes = bytes + excluded.bytes,
+                last_download = excluded.last_download
+        ''', (user_id, platform, quality, file_size or 0))
+
+        cursor.execute('''
+            INSERT INTO global_counters (platform, quality, downloads, bytes, last_download)
+            VALUES (?, ?, 1, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(platform, quality) DO UPDATE SET
+                downloads = downloads + 1,
+                bytes = bytes + excluded.bytes,
+                last_download = excluded.last_download
+        ''', (platform, quality, file_size or 0))
+
+        self._commit()
 
     def log_error(self, user_id: int, error_message: str):
         """Log an error"""
@@ -114,52 +306,132 @@ class Database:
             VALUES (?, ?)
         ''', (user_id, error_message))
 
-        conn.commit()
+        self._upsert_error_signature(cursor, user_id, error_message, None)
 
-    def get_user_stats(self, user_id: int) -> dict:
-        """Get user statistics"""
+        self._commit()
+
+    def _upsert_error_signature(self, cursor, user_id: int, error_message: str, timestamp):
+        """Count an error under its signature"""
+        cursor.execute('''
+            INSERT INTO error_signatures (signature, sample, count, first_seen, last_seen, last_user_id)
+            VALUES (?, ?, 1, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP), ?)
+            ON CONFLICT(signature) DO UPDATE SET
+                sample = excluded.sample,
+                count = count + 1,
+                first_seen = MIN(first_seen, excluded.first_seen),
+                last_seen = MAX(last_seen, excluded.last_seen),
+                last_user_id = excluded.last_user_id
+        ''', (error_signature(error_message), error_message, timestamp, timestamp, user_id))
+
+    def get_file_id(self, platform: str, video_id: str, quality: str):
+        """Get stored Telegram file_id for a video"""
         conn = self._get_connection()
         cursor = conn.cursor()
 
-        # Total downloads
         cursor.execute('''
-            SELECT COUNT(*) as count FROM downloads WHERE user_id = ?
-        ''', (user_id,))
-        total = cursor.fetchone()['count']
+            SELECT file_id, title, width, height, duration, file_size
+            FROM file_ids
+            WHERE platform = ? AND video_id = ? AND quality = ?
+        ''', (platform, video_id, quality))
+        row = cursor.fetchone()
+
+        return dict(row) if row else None
+
+    def get_file_ids(self, platform: str, video_id: str) -> dict:
+        """Get stored Telegram file_ids for every uploaded quality of a video"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
 
-        # Platform breakdown
         cursor.execute('''
-            SELECT platform, COUNT(*) as count
-            FROM downloads
-            WHERE user_id = ?
-            GROUP BY platform
-        ''', (user_id,))
-        platforms = {row['platform']: row['count'] for row in cursor.fetchall()}
+            SELECT quality, file_id, title, width, height, duration, file_size
+            FROM file_ids
+            WHERE platform = ? AND video_id = ?
+        ''', (platform, video_id))
+
+        return {row['quality']: dict(row) for row in cursor.fetchall()}
+
+    def save_file_id(self, platform: str, video_id: str, quality: str, file_id: str,
+                     title: str, width: int, height: int, duration: float, file_size: int):
+        """Store Telegram file_id after a successful upload"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
 
-        # Top qualities
         cursor.execute('''
-            SELECT quality, COUNT(*) as count
-            FROM downloads
-            WHERE user_id = ?
-            GROUP BY quality
-            ORDER BY count DESC
-            LIMIT 5
-        ''', (user_id,))
-        top_qualities = [(row['quality'], row['count']) for row in cursor.fetchall()]
+            INSERT INTO file_ids (platform, video_id, quality, file_id, title,
+                                  width, height, duration, file_size)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(platform, video_id, quality) DO UPDATE SET
+                file_id = excluded.file_id,
+                title = excluded.title,
+                width = excluded.width,
+                height = excluded.height,
+                duration = excluded.duration,
+                file_size = excluded.file_size,
+                created_at = CURRENT_TIMESTAMP
+        ''', (platform, video_id, quality, file_id, title, width, height, duration, file_size))
+
+        self._commit()
+
+    def invalidate_file_id(self, platform: str, video_id: str, quality: str):
+        """Remove a file_id that Telegram rejected"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
 
-        # Last download
         cursor.execute('''
-            SELECT MAX(timestamp) as last_time FROM downloads WHERE user_id = ?
-        ''', (user_id,))
-        last = cursor.fetchone()['last_time']
+            DELETE FROM file_ids
+            WHERE platform = ? AND video_id = ? AND quality = ?
+        ''', (platform, video_id, quality))
+
+        self._commit()
+
+    def _summarize_counters(self, rows) -> dict:
+        """Fold (platform, quality) counter rows into totals"""
+        platforms = {}
+        qualities = {}
+        total = 0
+        total_bytes = 0
+        last = None
+
+        for row in rows:
+            platforms[row['platform']] = platforms.get(row['platform'], 0) + row['downloads']
+            qualities[row['quality']] = qualities.get(row['quality'], 0) + row['downloads']
+            total += row['downloads']
+            total_bytes += row['bytes'] or 0
+            if row['last_download'] and (last is None or row['last_download'] > last):
+                last = row['last_download']
+
+        top_qualities = sorted(qualities.items(), key=lambda item: item[1], reverse=True)[:5]
 
         return {
             'downloads': total,
+            'bytes': total_bytes,
+            'platforms': platforms,
+            'top_qualities': top_qualities,
+            'last_download': last,
+        }
+
+    def get_user_stats(self, user_id: int) -> dict:
+        """Get user statistics"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT platform, quality, downloads, bytes, last_download
+            FROM user_counters
+            WHERE user_id = ?
+        ''', (user_id,))
+        summary = self._summarize_counters(cursor.fetchall())
+        platforms = summary['platforms']
+        top_qualities = summary['top_qualities']
+
+        return {
+            'downloads': summary['downloads'],
+            'bytes': summary['bytes'],
             'youtube': platforms.get('youtube', 0),
             'instagram': platforms.get('instagram', 0),
             'tiktok': platforms.get('tiktok', 0),
             'top_qualities': top_qualities if top_qualities else [('None', 0)],
-            'last_download': last or 'Hech qachon',
+            'last_download': summary['last_download'] or 'Hech qachon',
         }
 
     def get_global_stats(self) -> dict:
@@ -168,37 +440,25 @@ class Database:
         cursor = conn.cursor()
 
         # Total users
-        cursor.execute('SELECT COUNT(*) as count FROM users')
-        total_users = cursor.fetchone()['count']
-
-        # Total downloads
-        cursor.execute('SELECT COUNT(*) as count FROM downloads')
-        total_downloads = cursor.fetchone()['count']
-
-        # Platform breakdown
-        cursor.execute('''
-            SELECT platform, COUNT(*) as count
-            FROM downloads
-            GROUP BY platform
-        ''')
-        platforms = {row['platform']: row['count'] for row in cursor.fetchall()}
+        cursor.execute("SELECT value FROM counters WHERE name = 'users'")
+        row = cursor.fetchone()
+        total_users = row['value'] if row else 0
 
-        # Top qualities
         cursor.execute('''
-            SELECT quality, COUNT(*) as count
-            FROM downloads
-            GROUP BY quality
-            ORDER BY count DESC
-            LIMIT 5
+            SELECT platform, quality, downloads, bytes, last_download
+            FROM global_counters
         ''')
-        top_qualities = [(row['quality'], row['count']) for row in cursor.fetchall()]
+        summary = self._summarize_counters(cursor.fetchall())
+        platforms = summary['platforms']
+        top_qualities = summary['top_qualities']
 
         # Most used quality
         most_used = top_qualities[0][0] if top_qualities else 'None'
 
         return {
             'total_users': total_users,
-            'total_downloads': total_downloads,
+            'total_downloads': summary['downloads'],
+            'total_bytes': summary['bytes'],
             'youtube': platforms.get('youtube', 0),
             'instagram': platforms.get('instagram', 0),
             'tiktok': platforms.get('tiktok', 0),
@@ -206,6 +466,177 @@ class Database:
             'most_used': most_used,
         }
 
+    def get_error_signatures(self, limit: int = 10) -> list:
+        """Get most recently seen deduplicated errors"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            SELECT signature, sample, count, first_seen, last_seen, last_user_id
+            FROM error_signatures
+            ORDER BY last_seen DESC
+            LIMIT ?
+        ''', (limit,))
+
+        return [dict(row) for row in cursor.fetchall()]
+
+    def rebuild_error_signatures(self):
+        """Recompute error signatures from the raw errors table"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('DELETE FROM error_signatures')
+        rows = conn.execute('''
+            SELECT user_id, error_message, timestamp FROM errors ORDER BY id
+        ''').fetchall()
+        for row in rows:
+            self._upsert_error_signature(cursor, row['user_id'], row['error_message'], row['timestamp'])
+
+        self._commit()
+        logger.info(f"✅ Error signatures rebuilt from {len(rows)} errors")
+
+    def rollup_downloads(self, retain_days: int) -> int:
+        """Fold download rows older than retain_days into daily summaries"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        cutoff = f'-{int(retain_days)} days'
+
+        cursor.execute('''
+            INSERT INTO daily_downloads (day, platform, quality, downloads, bytes)
+            SELECT date(timestamp), platform, quality, COUNT(*), COALESCE(SUM(file_size), 0)
+            FROM downloads
+            WHERE timestamp < datetime('now', ?)
+            GROUP BY date(timestamp), platform, quality
+            ON CONFLICT(day, platform, quality) DO UPDATE SET
+                downloads = downloads + excluded.downloads,
+                bytes = bytes + excluded.bytes
+        ''', (cutoff,))
+
+        cursor.execute('''
+            INSERT INTO user_rollups (user_id, platform, quality, downloads, bytes, last_download)
+            SELECT user_id, platform, quality, COUNT(*), COALESCE(SUM(file_size), 0), MAX(timestamp)
+            FROM downloads
+            WHERE timestamp < datetime('now', ?)
+            GROUP BY user_id, platform, quality
+            ON CONFLICT(user_id, platform, quality) DO UPDATE SET
+                downloads = downloads + excluded.downloads,
+                bytes = bytes + excluded.bytes,
+                last_download = MAX(COALESCE(last_download, ''), excluded.last_download)
+        ''', (cutoff,))
+
+        cursor.execute('''
+            DELETE FROM downloads WHERE timestamp < datetime('now', ?)
+        ''', (cutoff,))
+        removed = cursor.rowcount
+
+        self._commit()
+        return removed
+
+    def prune_errors(self, retain_days: int) -> int:
+        """Delete raw errors older than retain_days (signatures keep the counts)"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            DELETE FROM errors WHERE timestamp < datetime('now', ?)
+        ''', (f'-{int(retain_days)} days',))
+        removed = cursor.rowcount
+
+        self._commit()
+        return removed
+
+    def compact(self, pages: int = 1000) -> int:
+        """Return free pages to the filesystem, a bounded number at a time"""
+        conn = self._get_connection()
+        conn.commit()
+
+        # auto_vacuum can only be switched on by a full VACUUM (once)
+        if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+            logger.info("🧹 Enabling incremental auto_vacuum (one-time VACUUM)")
+            conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.execute('VACUUM')
+
+        free_before = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        conn.execute(f'PRAGMA incremental_vacuum({int(pages)})')
+        free_after = conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        conn.execute('PRAGMA optimize')
+
+        return free_before - free_after
+
+    def run_maintenance(self, download_retain_days: int, error_retain_days: int,
+                        vacuum_pages: int = 1000) -> dict:
+        """Roll up downloads, prune errors and compact the file"""
+        result = {
+            'downloads_rolled_up': self.rollup_downloads(download_retain_days),
+            'errors_pruned': self.prune_errors(error_retain_days),
+            'pages_freed': self.compact(vacuum_pages),
+        }
+        logger.info(f"🧹 Database maintenance: {result}")
+        return result
+
+    def rebuild_aggregates(self):
+        """
+        Recompute all counter tables from users, downloads and the rollups.
+
+        Rows rolled up before user_rollups existed have no per-user record;
+        the per-user counters are then left as they are instead of being
+        rebuilt without them.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        daily_total = cursor.execute('SELECT COALESCE(SUM(downloads), 0) FROM daily_downloads').fetchone()[0]
+        user_total = cursor.execute('SELECT COALESCE(SUM(downloads), 0) FROM user_rollups').fetchone()[0]
+
+        if daily_total == user_total:
+            cursor.execute('DELETE FROM user_counters')
+            cursor.execute('''
+                INSERT INTO user_counters (user_id, platform, quality, downloads, bytes, last_download)
+                SELECT user_id, platform, quality, SUM(downloads), SUM(bytes), MAX(last_download)
+                FROM (
+                    SELECT user_id, platform, quality, COUNT(*) AS downloads,
+                           COALESCE(SUM(file_size), 0) AS bytes, MAX(timestamp) AS last_download
+                    FROM downloads
+                    GROUP BY user_id, platform, quality
+                    UNION ALL
+                    SELECT user_id, platform, quality, downloads, bytes, last_download
+                    FROM user_rollups
+                )
+                GROUP BY user_id, platform, quality
+            ''')
+        else:
+            logger.warning(
+                f"⚠️ {daily_total - user_total} rolled-up downloads have no per-user totals, "
+                "keeping user counters as they are"
+            )
+
+        cursor.execute('DELETE FROM global_counters')
+        cursor.execute('''
+            INSERT INTO global_counters (platform, quality, downloads, bytes, last_download)
+            SELECT platform, quality, SUM(downloads), SUM(bytes), MAX(last_download)
+            FROM (
+                SELECT platform, quality, COUNT(*) AS downloads,
+                       COALESCE(SUM(file_size), 0) AS bytes, MAX(timestamp) AS last_download
+                FROM downloads
+                GROUP BY platform, quality
+                UNION ALL
+                SELECT platform, quality, downloads, bytes, day
+                FROM daily_downloads
+            )
+            GROUP BY platform, quality
+        ''')
+
+        cursor.execute('''
+            INSERT INTO counters (name, value)
+            VALUES ('users', (SELECT COUNT(*) FROM users))
+            ON CONFLICT(name) DO UPDATE SET value = excluded.value
+        ''')
+
+        self._commit()
+        logger.info("✅ Aggregate counters rebuilt")
+
     def get_recent_errors(self, limit: int = 10) -> list:
         """Get recent errors"""
         conn = self._get_connection()
@@ -231,4 +662,257 @@ class Database:
         """Close database connection"""
         if self.conn:
             self.conn.close()
-            self.conn = None
\ No newline at end of file
+            self.conn = None
+
+
+class AsyncDatabase:
+    """
+    Non-blocking facade over Database for the asyncio event loop.
+
+    Writes are queued and applied by one writer thread in grouped
+    transactions; reads run on a separate connection in a single
+    reader thread. close() flushes every queued write.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db_path: str = "bot_stats.db", batch_size: int = 200, linger: float = 0.05):
+        """Initialize connections and start writer thread"""
+        self._writer = Database(db_path)
+        self._reader = Database(db_path, read_only=True)
+        self.batch_size = batch_size
+        self.linger = linger
+
+        self._queue = queue.Queue()
+        self._read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-read")
+        self._thread = threading.Thread(target=self._write_loop, name="db-write", daemon=True)
+        self._thread.start()
+        self._closed = False
+
+        self.writes = 0
+        self.batches = 0
+        self.write_failures = 0
+        self.batch_failures = 0
+        self.lost_writes = 0
+
+        atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _write_loop(self):
+        """Apply queued writes in batches until stopped"""
+        stop = False
+
+        while not stop:
+            batch = [self._queue.get()]
+
+            # Collect whatever else arrives shortly after
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=self.linger))
+                except queue.Empty:
+                    break
+
+            # Plain writes share a transaction; exclusive calls run between them
+            pending = []
+            for item in batch:
+                if item is self._STOP:
+                    stop = True
+                    continue
+
+                method, args, future = item
+                if future is None:
+                    pending.append((method, args))
+                    continue
+
+                self._commit_writes(pending)
+                pending = []
+                self._run_exclusive(method, args, future)
+
+            self._commit_writes(pending)
+
+    def _commit_writes(self, writes: list):
+        """Apply writes in one transaction"""
+        if not writes:
+            return
+
+        applied = self.writes
+        try:
+            with STAGE_SECONDS.time(stage='db_write'), self._writer.batch():
+                for method, args in writes:
+                    self._apply(method, args)
+            self.batches += 1
+        except Exception as e:
+            # The whole batch was rolled back
+            self.writes = applied
+            self.batch_failures += 1
+            self.lost_writes += len(writes)
+            logger.error(f"❌ Database batch failed, {len(writes)} writes lost: {e}")
+
+    def _run_exclusive(self, method: Optional[str], args: tuple, future: Future):
+        """Run a call outside any batch and report its result"""
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            result = getattr(self._writer, method)(*args) if method else None
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _apply(self, method: str, args: tuple):
+        """Run one write inside the current batch, all or nothing"""
+        conn = self._writer._get_connection()
+        conn.execute('SAVEPOINT write')
+        try:
+            getattr(self._writer, method)(*args)
+            self.writes += 1
+        except Exception as e:
+            # Undo the statements of this write only, the batch goes on
+            conn.execute('ROLLBACK TO write')
+            self.write_failures += 1
+            logger.error(f"❌ Database write {method} failed: {e}")
+        finally:
+            conn.execute('RELEASE write')
+
+    def _enqueue(self, method: str, *args):
+        """Queue a write (never blocks)"""
+        if self._closed:
+            logger.warning(f"⚠️ Database closed, dropped {method}")
+            return
+        self._queue.put((method, args, None))
+
+    async def _call_writer(self, method: Optional[str], *args):
+        """Run a call on the writer thread after all queued writes"""
+        if self._closed:
+            raise RuntimeError(f"Database closed, can't run {method or 'flush'}")
+        future = Future()
+        self._queue.put((method, args, future))
+        return await asyncio.wrap_future(future)
+
+    async def _read(self, method: str, *args):
+        """Run a read on the reader thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_executor, getattr(self._reader, method), *args)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add_user(self, user_id: int, username: str):
+        """Add or update user"""
+        self._enqueue('add_user', user_id, username)
+
+    def add_download(self, user_id: int, platform: str, quality: str, file_size: int):
+        """Record a download"""
+        self._enqueue('add_download', user_id, platform, quality, file_size)
+
+    def log_error(self, user_id: int, error_message: str):
+        """Log an error"""
+        self._enqueue('log_error', user_id, error_message)
+
+    def save_file_id(self, platform: str, video_id: str, quality: str, file_id: str,
+                     title: str, width: int, height: int, duration: float, file_size: int):
+        """Store Telegram file_id after a successful upload"""
+        self._enqueue('save_file_id', platform, video_id, quality, file_id,
+                      title, width, height, duration, file_size)
+
+    def invalidate_file_id(self, platform: str, video_id: str, quality: str):
+        """Remove a file_id that Telegram rejected"""
+        self._enqueue('invalidate_file_id', platform, video_id, quality)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    async def get_file_id(self, platform: str, video_id: str, quality: str):
+        """Get stored Telegram file_id for a video"""
+        return await self._read('get_file_id', platform, video_id, quality)
+
+    async def get_file_ids(self, platform: str, video_id: str) -> dict:
+        """Get stored Telegram file_ids for every uploaded quality of a video"""
+        return await self._read('get_file_ids', platform, video_id)
+
+    async def get_user_stats(self, user_id: int) -> dict:
+        """Get user statistics"""
+        return await self._read('get_user_stats', user_id)
+
+    async def get_global_stats(self) -> dict:
+        """Get global statistics"""
+        return await self._read('get_global_stats')
+
+    async def get_recent_errors(self, limit: int = 10) -> list:
+        """Get recent errors"""
+        return await self._read('get_recent_errors', limit)
+
+    async def get_error_signatures(self, limit: int = 10) -> list:
+        """Get most recently seen deduplicated errors"""
+        return await self._read('get_error_signatures', limit)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    async def run_maintenance(self, download_retain_days: int, error_retain_days: int,
+                              vacuum_pages: int = 1000) -> dict:
+        """Run retention, rollup and compaction on the writer thread"""
+        return await self._call_writer('run_maintenance', download_retain_days,
+                                       error_retain_days, vacuum_pages)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def flush(self):
+        """Wait until every write queued so far is committed"""
+        await self._call_writer(None)
+
+    def close(self):
+        """Flush queued writes and close connections"""
+        if self._closed:
+            return
+        self._closed = True
+
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._read_executor.shutdown(wait=True)
+
+        # Calls that raced past the closed check would wait forever
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP and item[2] is not None and item[2].set_running_or_notify_cancel():
+                item[2].set_exception(RuntimeError("Database closed"))
+
+        self._writer.close()
+        self._reader.close()
+        logger.info(f"✅ Database closed ({self.writes} writes in {self.batches} batches)")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+
+    parser = argparse.ArgumentParser(description="Bot database maintenance")
+    parser.add_argument('command', choices=['rebuild-stats', 'maintenance'])
+    parser.add_argument('--db', default='bot_stats.db', help="Database file")
+    parser.add_argument('--download-days', type=int, default=30, help="Raw download rows to keep")
+    parser.add_argument('--error-days', type=int, default=14, help="Raw error rows to keep")
+    args = parser.parse_args()
+
+    database = Database(args.db)
+
+    if args.command == 'rebuild-stats':
+        database.rebuild_aggregates()
+    elif args.command == 'maintenance':
+        database.run_maintenance(args.download_days, args.error_days)
+
+    database.close()
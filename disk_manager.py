@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Disk budget for the download directory: reservations, admission control, orphan sweeps
+"""
+
+import os
+import time
+import shutil
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DiskFullError(Exception):
+    """Not enough free disk space to admit a download"""
+
+
+class DiskManager:
+    """
+    Keep min_free_bytes free in the download directory.
+
+    Every download reserves its estimated size first. A reservation that
+    would push free space below the threshold waits up to admission_wait
+    seconds for other jobs to finish, then is refused with DiskFullError.
+    The directory size in usage() is measured at most every size_ttl
+    seconds: walking a large cache on every metrics scrape is expensive.
+    """
+
+    def __init__(self, directory: Path, min_free_bytes: int, orphan_age: float = 1800,
+                 admission_wait: float = 30, in_use: Optional[Callable[[str], bool]] = None,
+                 size_ttl: float = 60):
+        """Initialize manager"""
+        self.directory = Path(directory)
+        self.min_free_bytes = min_free_bytes
+        self.orphan_age = orphan_age
+        self.admission_wait = admission_wait
+        self.in_use = in_use or (lambda path: False)
+        self.size_ttl = size_ttl
+
+        self._directory_bytes = 0
+        self._measured_at = None
+
+        self.reserved = 0
+        self.active = 0
+        self.waiting = 0
+        self._condition = None
+
+        self.admitted = 0
+        self.refused = 0
+        self.swept_files = 0
+        self.swept_bytes = 0
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def free_bytes(self) -> int:
+        """Free space on the download directory's filesystem"""
+        return shutil.disk_usage(self.directory).free
+
+    def available_bytes(self) -> int:
+        """Free space left for new jobs (free - reserved - threshold)"""
+        return self.free_bytes() - self.reserved - self.min_free_bytes
+
+    @asynccontextmanager
+    async def reserve(self, size: int):
+        """Hold size bytes of disk for the duration of the block"""
+        condition = self._get_condition()
+        deadline = time.monotonic() + self.admission_wait
+
+        async with condition:
+            self.waiting += 1
+            try:
+                while self.available_bytes() < size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.refused += 1
+                        raise DiskFullError(
+                            f"Low disk space: {self.free_bytes() / 1048576:.0f} MB free, "
+                            f"{self.reserved / 1048576:.0f} MB reserved, {size / 1048576:.0f} MB needed"
+                        )
+                    try:
+                        await asyncio.wait_for(condition.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self.waiting -= 1
+
+            self.reserved += size
+            self.active += 1
+            self.admitted += 1
+
+        try:
+            yield
+        finally:
+            async with condition:
+                self.reserved -= size
+                self.active -= 1
+                condition.notify_all()
+
+    def remove_job_files(self, prefix: str) -> int:
+        """Delete everything a job left in the download directory"""
+        removed = 0
+        for path in self.directory.glob(f"{prefix}*"):
+            if path.is_file() and not self.in_use(str(path)):
+                removed += self._remove(path)
+        return removed
+
+    def sweep(self, max_age: Optional[float] = None) -> int:
+        """Delete downloads and .part fragments older than max_age seconds that nobody uses"""
+        max_age = self.orphan_age if max_age is None else max_age
+        cutoff = time.time() - max_age
+        removed = 0
+
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError as e:
+            logger.warning(f"⚠️ Download directory not swept: {e}")
+            return 0
+
+        for entry in entries:
+            # Subdirectories (the video cache) manage themselves
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                if entry.stat().st_mtime > cutoff or self.in_use(entry.path):
+                    continue
+            except OSError:
+                continue
+            removed += self._remove(Path(entry.path))
+
+        if removed:
+            logger.info(f"🧹 Swept {removed} orphaned files from {self.directory}")
+        return removed
+
+    def _remove(self, path: Path) -> int:
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return 0
+        self.swept_files += 1
+        self.swept_bytes += size
+        return 1
+
+    def directory_bytes(self, max_age: Optional[float] = None) -> int:
+        """Bytes under the directory (cache included), measured at most max_age seconds ago"""
+        max_age = self.size_ttl if max_age is None else max_age
+        now = time.monotonic()
+        if self._measured_at is not None and now - self._measured_at < max_age:
+            return self._directory_bytes
+
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+
+        self._directory_bytes = total
+        self._measured_at = now
+        return total
+
+    def usage(self) -> dict:
+        """Current disk figures (directory size may be up to size_ttl seconds old)"""
+        return {
+            'free_bytes': self.free_bytes(),
+            'min_free_bytes': self.min_free_bytes,
+            'reserved_bytes': self.reserved,
+            'directory_bytes': self.directory_bytes(),
+            'active': self.active,
+            'waiting': self.waiting,
+            'admitted': self.admitted,
+            'refused': self.refused,
+            'swept_files': self.swept_files,
+            'swept_bytes': self.swept_bytes,
+        }
+
+    def healthy(self) -> bool:
+        """Enough free space left"""
+        return self.free_bytes() >= self.min_free_bytes
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Download job scheduler with bounded per-platform worker pools
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when a platform queue cannot accept more jobs"""
+
+
+class FairQueue:
+    """Bounded queue with one FIFO per user, served round-robin"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._queues = OrderedDict()
+        self._size = 0
+        self._ready = asyncio.Event()
+
+    def put_nowait(self, user: Hashable, item):
+        """Append item to user's FIFO; raise asyncio.QueueFull when full"""
+        if self.maxsize and self._size >= self.maxsize:
+            raise asyncio.QueueFull
+        queue = self._queues.get(user)
+        if queue is None:
+            queue = self._queues[user] = deque()
+        queue.append(item)
+        self._size += 1
+        self._ready.set()
+
+    async def get(self):
+        """Next item of the next user in turn"""
+        while not self._size:
+            self._ready.clear()
+            await self._ready.wait()
+
+        # Oldest user in rotation goes first, then moves to the back
+        user, queue = self._queues.popitem(last=False)
+        item = queue.popleft()
+        if queue:
+            self._queues[user] = queue
+        self._size -= 1
+        return item
+
+    def ahead_of(self, user: Hashable) -> int:
+        """Jobs that would run before a new job of user"""
+        mine = len(self._queues.get(user, ()))
+        # Every other user gets at most one turn per turn of ours
+        return mine + sum(min(len(q), mine + 1) for u, q in self._queues.items() if u != user)
+
+    def users(self) -> int:
+        return len(self._queues)
+
+    def qsize(self) -> int:
+        return self._size
+
+
+class _PlatformPool:
+    """Queue, executor and counters of one platform"""
+
+    def __init__(self, platform: str, workers: int, max_queue: int):
+        self.platform = platform
+        self.workers = workers
+        self.queue = FairQueue(max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"dl-{platform}")
+        self.tasks = []
+
+        self.active = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class DownloadScheduler:
+    """
+    Fair queue per platform feeding a fixed number of worker tasks.
+
+    Jobs are queued per user and served round-robin, so one user's backlog
+    can't starve the others. max_active caps running jobs across all
+    platforms (0 = only the per-platform worker counts).
+    """
+
+    def __init__(self, concurrency: dict, default_workers: int = 2, max_queue: int = 50, max_active: int = 0):
+        """Initialize scheduler (workers start on first submit)"""
+        self.concurrency = concurrency
+        self.default_workers = default_workers
+        self.max_queue = max_queue
+        self.max_active = max_active
+        self._slots = None
+        self._pools = {}
+
+    def _pool(self, platform: str) -> _PlatformPool:
+        """Get or create platform pool and its workers"""
+        pool = self._pools.get(platform)
+        if pool is None:
+            workers = self.concurrency.get(platform, self.default_workers)
+            pool = _PlatformPool(platform, workers, self.max_queue)
+            pool.tasks = [
+                asyncio.create_task(self._worker(pool), name=f"dl-{platform}-{i}")
+                for i in range(workers)
+            ]
+            self._pools[platform] = pool
+            logger.info(f"✅ {platform} download pool started: {workers} workers")
+        return pool
+
+    def position(self, platform: str, user: Hashable = None) -> int:
+        """Queue position a new job would get (0 = starts immediately)"""
+        pool = self._pools.get(platform)
+        if pool is None:
+            return 0
+        idle = pool.workers - pool.active
+        ahead = pool.queue.ahead_of(user)
+        return ahead - idle + 1 if ahead >= idle else 0
+
+    def active(self) -> int:
+        """Running jobs across all platforms"""
+        return sum(pool.active for pool in self._pools.values())
+
+    async def run(self, platform: str, func: Callable, on_queued: Optional[Callable[[int], Awaitable]] = None,
+                  user: Hashable = None):
+        """Run blocking func on the platform pool and return its result"""
+        pool = self._pool(platform)
+        position = self.position(platform, user)
+        future = asyncio.get_running_loop().create_future()
+
+        try:
+            pool.queue.put_nowait(user, (func, future, time.monotonic()))
+        except asyncio.QueueFull:
+            pool.rejected += 1
+            raise QueueFullError(f"{platform} queue is full ({self.max_queue} jobs)") from None
+
+        pool.submitted += 1
+
+        if position and on_queued:
+            try:
+                await on_queued(position)
+            except Exception as e:
+                logger.warning(f"⚠️ Queue notification failed: {e}")
+
+        return await future
+
+    async def _worker(self, pool: _PlatformPool):
+        """Take jobs from the platform queue forever"""
+        loop = asyncio.get_running_loop()
+        if self.max_active and self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_active)
+
+        while True:
+            func, future, enqueued_at = await pool.queue.get()
+
+            if self._slots is not None:
+                await self._slots.acquire()
+
+            if future.cancelled():
+                if self._slots is not None:
+                    self._slots.release()
+                continue
+
+            wait = time.monotonic() - enqueued_at
+            pool.total_wait += wait
+            pool.max_wait = max(pool.max_wait, wait)
+
+            pool.active += 1
+            try:
+                result = await loop.run_in_executor(pool.executor, func)
+            except Exception as e:
+                pool.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                pool.completed += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                pool.active -= 1
+                if self._slots is not None:
+                    self._slots.release()
+
+    def stats(self) -> dict:
+        """Get queue depth, wait time and job counters per platform"""
+        result = {}
+        for platform, pool in self._pools.items():
+            started = pool.completed + pool.failed + pool.active
+            result[platform] = {
+                'workers': pool.workers,
+                'active': pool.active,
+                'queued': pool.queue.qsize(),
+                'users': pool.queue.users(),
+                'submitted': pool.submitted,
+                'completed': pool.completed,
+                'failed': pool.failed,
+                'rejected': pool.rejected,
+                'avg_wait': pool.total_wait / started if started else 0.0,
+                'max_wait': pool.max_wait,
+            }
+        return result
+
+    async def shutdown(self):
+        """Stop workers and executors"""
+        for pool in self._pools.values():
+            for task in pool.tasks:
+                task.cancel()
+            await asyncio.gather(*pool.tasks, return_exceptions=True)
+            pool.executor.shutdown(wait=False, cancel_futures=True)
+        self._pools.clear()
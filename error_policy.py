@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Download error classes, per-class retry policies and a per-platform circuit breaker
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import NamedTuple
+
+from disk_manager import DiskFullError
+from download_queue import QueueFullError
+from singleflight import LeaderCancelled
+from ydl_pool import WorkerError
+
+logger = logging.getLogger(__name__)
+
+# Error kinds
+PERMANENT = 'permanent'  # the video itself can't be fetched: retrying never helps
+TRANSIENT = 'transient'  # network hiccup, busy server: worth another try
+BLOCKED = 'blocked'      # the platform refuses us (bot detection, rate limit)
+
+# (substring of the lowercased message, kind, reason), first match wins.
+# Blocking markers go first: YouTube's bot check also says "sign in" and "cookies".
+ERROR_PATTERNS = (
+    ("not a bot", BLOCKED, 'bot_detection'),
+    ("http error 429", BLOCKED, 'rate_limited'),
+    ("too many requests", BLOCKED, 'rate_limited'),
+    ("rate-limit reached", BLOCKED, 'rate_limited'),
+    ("ip address is blocked", BLOCKED, 'ip_blocked'),
+
+    ("private", PERMANENT, 'private'),
+    ("confirm your age", PERMANENT, 'age_restricted'),
+    ("age-restricted", PERMANENT, 'age_restricted'),
+    ("members-only", PERMANENT, 'members_only'),
+    ("in your country", PERMANENT, 'geo_blocked'),
+    ("geo restriction", PERMANENT, 'geo_blocked'),
+    ("has been removed", PERMANENT, 'removed'),
+    ("been deleted", PERMANENT, 'removed'),
+    ("does not exist", PERMANENT, 'removed'),
+    ("http error 404", PERMANENT, 'removed'),
+    ("http error 410", PERMANENT, 'removed'),
+    ("video unavailable", PERMANENT, 'unavailable'),
+    # yt-dlp's selector error, not the video's: another format may exist
+    ("requested format is not available", TRANSIENT, 'format_unavailable'),
+    ("not available", PERMANENT, 'unavailable'),
+    ("login required", PERMANENT, 'login_required'),
+    ("sign in", PERMANENT, 'login_required'),
+    ("log in", PERMANENT, 'login_required'),
+    ("unsupported url", PERMANENT, 'unsupported'),
+    ("no video formats found", PERMANENT, 'unsupported'),
+
+    ("timed out", TRANSIENT, 'network'),
+    ("connection", TRANSIENT, 'network'),
+    ("temporary failure", TRANSIENT, 'network'),
+    ("http error 5", TRANSIENT, 'server_error'),
+)
+
+
+class Failure(NamedTuple):
+    """Result of classify_error"""
+    kind: str
+    reason: str
+
+
+class RetryPolicy(NamedTuple):
+    """How often an error kind is tried and how long to wait in between"""
+    attempts: int
+    backoff: float  # first delay in seconds, doubled for every retry
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait after failed attempt number attempt (0-based)"""
+        return self.backoff * 2 ** attempt
+
+
+RETRY_POLICIES = {
+    PERMANENT: RetryPolicy(attempts=1, backoff=0),
+    # Retrying feeds the detector; the circuit breaker decides when to try again
+    BLOCKED: RetryPolicy(attempts=1, backoff=0),
+    TRANSIENT: RetryPolicy(attempts=3, backoff=1),
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a platform that is blocking us"""
+
+    def __init__(self, platform: str, retry_in: float):
+        super().__init__(f"{platform} circuit open, retry in {retry_in:.0f}s")
+        self.platform = platform
+        self.retry_in = retry_in
+
+
+def classify_error(error: BaseException) -> Failure:
+    """Sort an exception into PERMANENT, TRANSIENT or BLOCKED with a short reason"""
+    if isinstance(error, CircuitOpenError):
+        return Failure(BLOCKED, 'circuit_open')
+    if isinstance(error, QueueFullError):
+        return Failure(TRANSIENT, 'queue_full')
+    if isinstance(error, DiskFullError):
+        return Failure(TRANSIENT, 'disk_full')
+    if isinstance(error, WorkerError):
+        return Failure(TRANSIENT, 'worker')
+    if isinstance(error, LeaderCancelled):
+        return Failure(TRANSIENT, 'cancelled')
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return Failure(TRANSIENT, 'network')
+
+    message = str(error).lower()
+    for marker, kind, reason in ERROR_PATTERNS:
+        if marker in message:
+            return Failure(kind, reason)
+
+    return Failure(TRANSIENT, 'other')
+
+
+class _Circuit:
+    """Breaker state of one platform"""
+
+    __slots__ = ('failures', 'opened_at', 'probe_at', 'rejected', 'opened')
+
+    def __init__(self):
+        self.failures = deque()
+        self.opened_at = None
+        self.probe_at = None
+        self.rejected = 0
+        self.opened = 0
+
+
+class CircuitBreaker:
+    """
+    Per-platform breaker on BLOCKED failures.
+
+    threshold blocked failures within window seconds open a platform's
+    circuit: check() then raises CircuitOpenError for cooldown seconds.
+    After that a single request goes through as a probe - success closes
+    the circuit, another blocked failure opens it for a new cooldown.
+    Permanent and transient failures say nothing about blocking and
+    don't count. Call from the event loop only.
+    """
+
+    def __init__(self, threshold: int = 5, window: float = 60, cooldown: float = 120):
+        """Initialize breaker"""
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self._circuits = {}
+
+    def state(self, platform: str) -> str:
+        """'closed', 'open' or 'half_open'"""
+        circuit = self._circuits.get(platform)
+        if circuit is None or circuit.opened_at is None:
+            return 'closed'
+        if time.monotonic() - circuit.opened_at < self.cooldown:
+            return 'open'
+        return 'half_open'
+
+    def check(self, platform: str):
+        """Raise CircuitOpenError unless platform may be called now"""
+        circuit = self._circuits.get(platform)
+        if circuit is None or circuit.opened_at is None:
+            return
+
+        now = time.monotonic()
+        wait = circuit.opened_at + self.cooldown - now
+        if wait <= 0:
+            # Half-open: one probe at a time (a lost probe expires after cooldown)
+            if circuit.probe_at is None or now - circuit.probe_at >= self.cooldown:
+                circuit.probe_at = now
+                logger.info(f"🔌 {platform} circuit half-open, probing")
+                return
+            wait = circuit.probe_at + self.cooldown - now
+
+        circuit.rejected += 1
+        raise CircuitOpenError(platform, wait)
+
+    def record_success(self, platform: str):
+        """A call reached the platform and got through"""
+        circuit = self._circuits.get(platform)
+        if circuit is None or circuit.opened_at is None:
+            return
+
+        circuit.opened_at = circuit.probe_at = None
+        circuit.failures.clear()
+        logger.info(f"✅ {platform} circuit closed")
+
+    def record_failure(self, platform: str, failure: Failure):
+        """Count a failed call; BLOCKED failures may open the circuit"""
+        if failure.kind == PERMANENT:
+            # The platform answered - only this video is unavailable
+            self.record_success(platform)
+            return
+        if failure.kind != BLOCKED or failure.reason == 'circuit_open':
+            circuit = self._circuits.get(platform)
+            if circuit is not None:
+                # Inconclusive probe - let the next request try
+                circuit.probe_at = None
+            return
+
+        circuit = self._circuits.setdefault(platform, _Circuit())
+        now = time.monotonic()
+
+        if circuit.opened_at is not None:
+            # Probe (or a call started before opening) still blocked
+            circuit.opened_at = now
+            circuit.probe_at = None
+            return
+
+        circuit.failures.append(now)
+        while circuit.failures and circuit.failures[0] < now - self.window:
+            circuit.failures.popleft()
+
+        if len(circuit.failures) >= self.threshold:
+            circuit.opened_at = now
+            circuit.opened += 1
+            circuit.failures.clear()
+            logger.warning(
+                f"⚠️ {platform} circuit open: {self.threshold} blocked failures in {self.window:g}s, "
+                f"failing fast for {self.cooldown:g}s"
+            )
+
+    def stats(self) -> dict:
+        """State and counters per platform"""
+        return {
+            platform: {
+                'state': self.state(platform),
+                'failures': len(circuit.failures),
+                'rejected': circuit.rejected,
+                'opened': circuit.opened,
+            }
+            for platform, circuit in self._circuits.items()
+        }
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Offline stand-ins for yt-dlp and the Telegram Bot API (benchmarks only)
+"""
+
+import os
+import sys
+import json
+import stat
+import struct
+import time
+import random
+import asyncio
+import logging
+import itertools
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import yt_dlp
+
+logger = logging.getLogger(__name__)
+
+# Smallest valid-looking MP4 header; the rest of the file is padding
+MP4_HEADER = bytes.fromhex('0000001866747970') + b'mp42' + bytes(4) + b'mp42isom'
+
+
+# ============================================================================
+# FAKE YT-DLP
+# ============================================================================
+
+class FakeYoutubeDL:
+    """
+    Drop-in replacement for yt_dlp.YoutubeDL that writes synthetic MP4s.
+
+    Behaviour is configured on the class so the bot's own code paths
+    (build_ydl_opts, process_ie_result, ...) run unchanged.
+    """
+
+    extract_latency = 0.05
+    extract_cpu = 0.0  # Seconds of pure-Python work per extraction (page/JSON parsing)
+    download_latency = 0.2
+    failure_rate = 0.0
+    failure_message = "ERROR: fake failure for {url}"
+    file_size = 2 * 1024 * 1024
+    heights = (360, 720, 1080)
+    bytes_per_second = 0  # Source throughput for downloads (0 = only download_latency)
+    media_url = None  # FakeMediaServer.base_url, for streamable format URLs
+    progress_steps = 10  # Progress hook calls per download
+
+    def __init__(self, params: dict = None):
+        self.params = params or {}
+        self._progress_hooks = list(self.params.get('progress_hooks') or [])
+
+    def add_progress_hook(self, hook):
+        self._progress_hooks.append(hook)
+
+    def _report(self, **event):
+        for hook in self._progress_hooks:
+            hook(event)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @classmethod
+    def _maybe_fail(cls, url: str):
+        if cls.failure_rate and random.random() < cls.failure_rate:
+            raise yt_dlp.utils.DownloadError(cls.failure_message.format(url=url))
+
+    @staticmethod
+    def _burn_cpu(seconds: float):
+        """Hold the GIL like a real extractor parsing a page"""
+        deadline = time.thread_time() + seconds
+        while time.thread_time() < deadline:
+            sum(range(1000))
+
+    @classmethod
+    def _video_id(cls, url: str) -> str:
+        return urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1] or 'video'
+
+    def extract_info(self, url: str, download: bool = True, **kwargs) -> dict:
+        time.sleep(self.extract_latency)
+        self._burn_cpu(self.extract_cpu)
+        self._maybe_fail(url)
+
+        duration = 30
+        media_url = self.media_url or 'https://fake.invalid'
+        formats = []
+        for height in self.heights:
+            size = int(self.file_size * height / max(self.heights))
+            formats.append({
+                'format_id': f'{height}p',
+                'url': f'{media_url}/{size}.mp4',
+                'ext': 'mp4',
+                'width': height * 9 // 16,
+                'height': height,
+                'vcodec': 'avc1',
+                'acodec': 'mp4a',
+                'protocol': 'https',
+                'http_headers': {'User-Agent': 'FakeYoutubeDL'},
+                'filesize': size,
+                'tbr': size * 8 / 1000 / duration,
+            })
+
+        info = {
+            'id': self._video_id(url),
+            'title': f'Fake video {self._video_id(url)}',
+            'webpage_url': url,
+            'duration': duration,
+            'formats': formats,
+        }
+        info.update(formats[-1])
+
+        if download:
+            return self.process_ie_result(info, download=True)
+        return info
+
+    @staticmethod
+    def sanitize_info(info: dict, remove_private_keys: bool = False) -> dict:
+        return json.loads(json.dumps(info))
+
+    def process_ie_result(self, info: dict, download: bool = True, **kwargs) -> dict:
+        max_height = max(self.heights)
+        spec = self.params.get('format', '')
+        if 'height<=' in spec:
+            max_height = int(spec.split('height<=')[1].split(']')[0])
+
+        candidates = [f for f in info['formats'] if f['height'] <= max_height] or info['formats'][:1]
+        selected = dict(info, **candidates[-1])
+
+        if download:
+            size = selected['filesize']
+            seconds = self.download_latency + (size / self.bytes_per_second if self.bytes_per_second else 0)
+            for step in range(1, self.progress_steps + 1):
+                time.sleep(seconds / self.progress_steps)
+                elapsed = seconds * step / self.progress_steps
+                self._report(
+                    status='downloading', downloaded_bytes=size * step // self.progress_steps, total_bytes=size,
+                    speed=size * step / self.progress_steps / elapsed if elapsed else None,
+                    eta=seconds - elapsed, elapsed=elapsed,
+                )
+            self._maybe_fail(info['webpage_url'])
+
+            outtmpl = self.params.get('outtmpl', '%(id)s.%(ext)s')
+            if isinstance(outtmpl, dict):
+                outtmpl = outtmpl.get('default', '%(id)s.%(ext)s')
+            path = outtmpl % {'id': selected['id'], 'ext': selected['ext']}
+
+            with open(path, 'wb') as f:
+                # ftyp, mdat, moov: the index at the end, like most muxers leave it
+                payload = max(selected['filesize'] - len(MP4_HEADER) - 16, 0)
+                f.write(MP4_HEADER)
+                f.write(struct.pack('>I', payload + 8) + b'mdat')
+                f.write(bytes(payload))
+                f.write(struct.pack('>I', 8) + b'moov')
+
+            selected['requested_downloads'] = [{'filepath': path}]
+            self._report(status='finished', downloaded_bytes=size, total_bytes=size, filename=path)
+
+        return selected
+
+
+# ============================================================================
+# FAKE TELEGRAM BOT API
+# ============================================================================
+
+class FakeAPIError(Exception):
+    """Bot API error answer (ok: false)"""
+
+    def __init__(self, code: int, description: str):
+        super().__init__(description)
+        self.code = code
+
+
+class FakeBotAPI:
+    """
+    Minimal HTTP/1.1 server answering Bot API methods the bot uses.
+
+    Uploads are read in full (like Telegram would) and answered with a
+    fresh file_id; 'upload_latency' adds a fixed delay per upload. With
+    local_mode it behaves like telegram-bot-api --local: file:// paths are
+    read from disk and the upload limit is 2000 MB instead of 50 MB.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, upload_latency: float = 0.0,
+                 local_mode: bool = False):
+        self.host = host
+        self.port = port
+        self.upload_latency = upload_latency
+        self.local_mode = local_mode
+        self.upload_limit = (2000 if local_mode else 50) * 1024 * 1024
+        self.calls = {}
+        self.uploaded_bytes = 0
+        self.local_bytes = 0
+        self.thumbnails = 0
+        self.videos_sent = 0
+        # (results, cached video results, cache_time) per answerInlineQuery
+        self.inline_answers = []
+        self.updates = asyncio.Queue()
+        self._message_ids = itertools.count(1000)
+        self._update_ids = itertools.count(1)
+        self._reply_waiters = {}
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"✅ Fake Bot API on {self.base_url}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def push_update(self, update: dict):
+        """Queue an update for getUpdates"""
+        update.setdefault('update_id', next(self._update_ids))
+        self.updates.put_nowait(update)
+
+    def expect_reply(self, chat_id: int, prefix: str = '') -> asyncio.Future:
+        """Future resolved with perf_counter() when a message to chat_id is sent or edited to start with prefix"""
+        future = asyncio.get_running_loop().create_future()
+        self._reply_waiters[chat_id] = (prefix, future)
+        return future
+
+    # ------------------------------------------------------------------
+    # HTTP plumbing
+    # ------------------------------------------------------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                _, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                method = path.rstrip('/').rsplit('/', 1)[-1]
+                params = self._parse_body(headers.get('content-type', ''), body)
+
+                try:
+                    result = await self._dispatch(method, params, len(body))
+                    status, payload = 200, {'ok': True, 'result': result}
+                except FakeAPIError as e:
+                    status, payload = e.code, {'ok': False, 'error_code': e.code, 'description': str(e)}
+                payload = json.dumps(payload).encode()
+
+                writer.write(
+                    f'HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n'.encode()
+                    + f'Content-Length: {len(payload)}\r\n\r\n'.encode() + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_body(content_type: str, body: bytes) -> dict:
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser(policy=HTTP).parsebytes(
+                f'Content-Type: {content_type}\r\n\r\n'.encode() + body
+            )
+            params = {}
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                if part.get_filename():
+                    params[name] = {'filename': part.get_filename(), 'size': len(part.get_payload(decode=True))}
+                else:
+                    params[name] = part.get_content()
+            return params
+        if content_type.startswith('application/json'):
+            return json.loads(body or b'{}')
+        return dict(parse_qsl(body.decode()))
+
+    # ------------------------------------------------------------------
+    # Bot API methods
+    # ------------------------------------------------------------------
+
+    def _message(self, params: dict, **extra) -> dict:
+        chat_id = int(params.get('chat_id', 1))
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+        }
+        message.update(extra)
+        return message
+
+    async def _dispatch(self, method: str, params: dict, body_size: int):
+        self.calls[method] = self.calls.get(method, 0) + 1
+
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'FakeBot', 'username': 'fake_bot',
+                    'can_join_groups': True, 'can_read_all_group_messages': False,
+                    'supports_inline_queries': True}
+
+        if method == 'getUpdates':
+            timeout = float(params.get('timeout', 0) or 0)
+            updates = []
+            try:
+                updates.append(await asyncio.wait_for(self.updates.get(), timeout or 0.01))
+                while not self.updates.empty():
+                    updates.append(self.updates.get_nowait())
+            except asyncio.TimeoutError:
+                pass
+            return updates
+
+        if method in ('sendVideo', 'sendMediaGroup'):
+            size = body_size
+            if str(params.get('video', '')).startswith('file://'):
+                if not self.local_mode:
+                    raise FakeAPIError(400, "Bad Request: wrong HTTP URL specified")
+                path = unquote(urlsplit(params['video']).path)
+                if not os.path.isfile(path):
+                    raise FakeAPIError(400, "Bad Request: file not found")
+                size = os.path.getsize(path)
+                self.local_bytes += size
+            else:
+                self.uploaded_bytes += body_size
+
+            if size > self.upload_limit:
+                raise FakeAPIError(413, "Request Entity Too Large")
+            if params.get('thumbnail'):
+                self.thumbnails += 1
+            if self.upload_latency:
+                await asyncio.sleep(self.upload_latency)
+
+            def video(field):
+                return {
+                    'file_id': f"fake-{field}-{next(self._message_ids)}",
+                    'file_unique_id': f"u{next(self._message_ids)}",
+                    'width': int(params.get('width', 0) or 0),
+                    'height': int(params.get('height', 0) or 0),
+                    'duration': int(params.get('duration', 0) or 0),
+                }
+
+            if method == 'sendMediaGroup':
+                media = json.loads(params.get('media', '[]'))
+                self.videos_sent += len(media)
+                return [self._message(params, video=video(i)) for i, _ in enumerate(media)]
+
+            self.videos_sent += 1
+            return self._message(params, video=video('video'), caption=params.get('caption'))
+
+        if method in ('sendMessage', 'editMessageText'):
+            chat_id = int(params.get('chat_id', 0))
+            prefix, waiter = self._reply_waiters.get(chat_id, ('', None))
+            if waiter is not None and params.get('text', '').startswith(prefix):
+                del self._reply_waiters[chat_id]
+                if not waiter.done():
+                    waiter.set_result(time.perf_counter())
+            return self._message(params, text=params.get('text', ''))
+
+        if method == 'answerInlineQuery':
+            results = params.get('results', [])
+            if isinstance(results, str):
+                results = json.loads(results)
+            cached = sum(1 for result in results if result.get('type') == 'video')
+            self.inline_answers.append((len(results), cached, int(params.get('cache_time', 300) or 0)))
+            return True
+
+        if method == 'editMessageReplyMarkup':
+            return self._message(params, text='')
+
+        # answerCallbackQuery, deleteMessage, setWebhook, deleteWebhook, ...
+        return True
+
+
+# ============================================================================
+# FAKE SHORT-LINK REDIRECTOR
+# ============================================================================
+
+class FakeShortLinkServer:
+    """
+    Answers vm./vt.tiktok.com style short links with redirects.
+
+    links maps a short code to a video id; codes starting with 'dead'
+    get a 404, unknown codes redirect to the home page like TikTok does.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, links: dict = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.links = dict(links or {})
+        self.requests = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"✅ Fake short-link server on {self.base_url}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _response(self, code: str) -> bytes:
+        if code.startswith('dead'):
+            return b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n'
+
+        video_id = self.links.get(code)
+        if video_id is None:
+            location = 'https://www.tiktok.com/'
+        else:
+            location = f'https://www.tiktok.com/@bench/video/{video_id}?_r=1&_t=share'
+        return (f'HTTP/1.1 301 Moved Permanently\r\nLocation: {location}\r\n'
+                'Content-Length: 0\r\n\r\n').encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                _, path, _ = request_line.decode('latin-1').split(' ', 2)
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+
+                code = urlsplit(path).path.strip('/').rsplit('/', 1)[-1]
+                writer.write(self._response(code))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+# ============================================================================
+# FAKE FFMPEG
+# ============================================================================
+
+FAKE_FFMPEG = '''#!{python}
+import sys, time, struct
+
+time.sleep({latency})
+args = sys.argv[1:]
+source, target = args[args.index('-i') + 1], args[-1]
+
+if '-movflags' in args:
+    # Faststart: same boxes, moov moved in front of mdat
+    with open(source, 'rb') as f:
+        data = f.read()
+    boxes, offset = [], 0
+    while offset + 8 <= len(data):
+        size = struct.unpack('>I', data[offset:offset + 4])[0] or len(data) - offset
+        boxes.append(data[offset:offset + size])
+        offset += size
+    order = {{b'ftyp': 0, b'moov': 1}}
+    boxes.sort(key=lambda box: order.get(box[4:8], 2))
+    with open(target, 'wb') as f:
+        f.write(b''.join(boxes))
+else:
+    with open(target, 'wb') as f:
+        f.write(b'\\xff\\xd8\\xff\\xe0' + bytes(2000) + b'\\xff\\xd9')
+'''
+
+
+def write_fake_ffmpeg(directory: str, latency: float = 0.0) -> str:
+    """Write an executable ffmpeg stand-in (faststart and thumbnail calls only), return its path"""
+    path = os.path.join(directory, 'fake-ffmpeg')
+    with open(path, 'w') as f:
+        f.write(FAKE_FFMPEG.format(python=sys.executable, latency=latency))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+# ============================================================================
+# FAKE MEDIA SOURCE
+# ============================================================================
+
+class FakeMediaServer:
+    """
+    Serves /<size>.mp4 as a synthetic MP4 of that many bytes.
+
+    'bytes_per_second' throttles the body so streaming has something
+    to overlap with; 0 sends as fast as the socket allows.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, bytes_per_second: int = 0,
+                 chunk_size: int = 64 * 1024):
+        self.host = host
+        self.port = port
+        self.bytes_per_second = bytes_per_second
+        self.chunk_size = chunk_size
+        self.requests = 0
+        self.sent_bytes = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"✅ Fake media server on {self.base_url}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                _, path, _ = request_line.decode('latin-1').split(' ', 2)
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+
+                self.requests += 1
+                name = urlsplit(path).path.strip('/').split('.', 1)[0]
+                if not name.isdigit():
+                    writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n')
+                    await writer.drain()
+                    continue
+
+                size = int(name)
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nContent-Type: video/mp4\r\n'
+                    + f'Content-Length: {size}\r\n\r\n'.encode() + MP4_HEADER[:size]
+                )
+                remaining = size - min(size, len(MP4_HEADER))
+                zeros = bytes(self.chunk_size)
+                while remaining:
+                    chunk = zeros[:min(remaining, self.chunk_size)]
+                    writer.write(chunk)
+                    await writer.drain()
+                    remaining -= len(chunk)
+                    self.sent_bytes += len(chunk)
+                    if self.bytes_per_second:
+                        await asyncio.sleep(len(chunk) / self.bytes_per_second)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
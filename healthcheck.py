@@ -5,26 +5,71 @@
 Health check HTTP server for Render
 """
 
+import hmac
+import json
+import asyncio
 import logging
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import threading
 
 logger = logging.getLogger(__name__)
 
+# name -> callable returning True while healthy
+HEALTH_CHECKS = {}
+
+# Telegram updates are small; anything bigger is not from Telegram
+MAX_WEBHOOK_BODY = 1024 * 1024
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found',
+               405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+def register_health_check(name, check):
+    """Add a check reported by /health"""
+    HEALTH_CHECKS[name] = check
+
+
+def run_health_checks():
+    """Return (all_ok, report lines)"""
+    ok = True
+    lines = []
+    for name, check in list(HEALTH_CHECKS.items()):
+        try:
+            passed = bool(check())
+        except Exception as e:
+            logger.warning(f"⚠️ Health check {name} failed: {e}")
+            passed = False
+        ok = ok and passed
+        lines.append(f"{name}: {'ok' if passed else 'FAIL'}")
+    return ok, lines
+
+
+def render_get(path):
+    """Return (status, content type, body) for /, /health and /metrics"""
+    if path == '/' or path == '/health':
+        ok, lines = run_health_checks()
+        body = '\n'.join(['OK' if ok else 'UNHEALTHY'] + lines).encode('utf-8')
+        return (200 if ok else 503), 'text/plain', body
+
+    if path == '/metrics':
+        from metrics import REGISTRY
+
+        return 200, 'text/plain; version=0.0.4; charset=utf-8', REGISTRY.render().encode('utf-8')
+
+    return 404, 'text/plain', b''
+
 
 class HealthCheckHandler(BaseHTTPRequestHandler):
     """Simple health check handler"""
 
     def do_GET(self):
         """Handle GET requests"""
-        if self.path == '/' or self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'OK')
-        else:
-            self.send_response(404)
-            self.end_headers()
+        status, content_type, body = render_get(self.path)
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
     def log_message(self, format, *args):
         """Suppress default logging"""
@@ -38,4 +83,102 @@ def start_health_check_server(port=8080):
     thread = threading.Thread(target=server.serve_forever, daemon=True)
     thread.start()
 
-    logger.info(f"✅ Health check server started on port {port}")
\ No newline at end of file
+    logger.info(f"✅ Health check server started on port {port}")
+
+
+class WebServer:
+    """
+    asyncio HTTP/1.1 server for /health, /metrics and the Telegram webhook.
+
+    POSTs to webhook_path must carry the X-Telegram-Bot-Api-Secret-Token
+    header; the decoded update is handed to on_update and answered with
+    200 right away, processing happens in the application.
+    """
+
+    def __init__(self, host='0.0.0.0', port=8080, webhook_path=None, secret_token=None, on_update=None):
+        self.host = host
+        self.port = port
+        self.webhook_path = webhook_path
+        self.secret_token = secret_token
+        self.on_update = on_update
+        self._server = None
+
+        self.updates = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"✅ Web server started on port {self.port}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_WEBHOOK_BODY:
+                    self._respond(writer, 413, 'text/plain', b'', close=True)
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                if method == 'GET':
+                    status, content_type, payload = await asyncio.to_thread(render_get, path.split('?', 1)[0])
+                elif method == 'POST' and self.webhook_path and path == self.webhook_path:
+                    status, content_type, payload = await self._webhook(headers, body)
+                else:
+                    status, content_type, payload = 405 if method != 'GET' else 404, 'text/plain', b''
+
+                self._respond(writer, status, content_type, payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _webhook(self, headers, body):
+        """Verify and enqueue one Telegram update"""
+        token = headers.get('x-telegram-bot-api-secret-token', '')
+        # Headers are decoded as latin-1, so this round-trips any byte the client sent
+        if self.secret_token and not hmac.compare_digest(token.encode('latin-1'), self.secret_token.encode()):
+            self.rejected += 1
+            logger.warning("⚠️ Webhook request with a wrong secret token")
+            return 403, 'text/plain', b''
+
+        try:
+            data = json.loads(body)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            self.rejected += 1
+            return 400, 'text/plain', b''
+
+        self.updates += 1
+        await self.on_update(data)
+        return 200, 'text/plain', b''
+
+    @staticmethod
+    def _respond(writer, status, content_type, body, close=False):
+        writer.write(
+            f'HTTP/1.1 {status} {STATUS_TEXT.get(status, "OK")}\r\n'
+            f'Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+            f'{"Connection: close" if close else "Connection: keep-alive"}\r\n\r\n'.encode() + body
+        )
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Durable job queue shared by processes: leases, heartbeats and retries on expiry
+"""
+
+import json
+import time
+import sqlite3
+import logging
+import importlib
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Job(NamedTuple):
+    """Claimed job"""
+    id: int
+    kind: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+
+
+class QueueBackend:
+    """
+    What intake and workers need from a shared queue.
+
+    A worker claims a job for lease_seconds and must heartbeat before the
+    lease runs out. A job whose lease expired (worker died) is handed to
+    the next claimant until max_attempts claims were used up. Backends for
+    workers on several hosts implement these methods and are selected
+    with open_queue().
+    """
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = 3) -> int:
+        """Add a job, return its id"""
+        raise NotImplementedError
+
+    def position(self, job_id: int) -> int:
+        """Queued jobs ahead of job_id, plus one"""
+        raise NotImplementedError
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Job]:
+        """Lease the oldest available job, or None"""
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: int, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease; False if it was lost to another worker"""
+        raise NotImplementedError
+
+    def complete(self, job_id: int, owner: str) -> bool:
+        """Mark a leased job done"""
+        raise NotImplementedError
+
+    def fail(self, job_id: int, owner: str, error: str, retry_in: Optional[float] = None) -> bool:
+        """Mark a leased job failed, or put it back after retry_in seconds"""
+        raise NotImplementedError
+
+    def prune(self, days: int = 7) -> int:
+        """Delete finished jobs older than days"""
+        return 0
+
+    def counts(self) -> dict:
+        """Jobs per status"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release connections"""
+
+
+class JobQueue(QueueBackend):
+    """
+    SQLite queue for intake and worker processes on one host.
+
+    The database runs in WAL mode, whose shared-memory index doesn't work
+    over network filesystems: don't put it on shared storage. Workers on
+    other hosts need a networked backend behind QueueBackend.
+    """
+
+    def __init__(self, db_path: str = "jobs.db"):
+        """Initialize queue and create the table"""
+        self.db_path = Path(db_path)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA busy_timeout=5000')
+        self._lock = threading.Lock()
+
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                available_at REAL NOT NULL,
+                lease_owner TEXT,
+                lease_expires REAL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute(
+            'CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs(status, available_at)'
+        )
+        logger.info(f"✅ Job queue ready: {db_path}")
+
+    def enqueue(self, kind: str, payload: dict, max_attempts: int = 3) -> int:
+        """Add a job, return its id"""
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                'INSERT INTO jobs (kind, payload, max_attempts, available_at, created_at, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, json.dumps(payload), max_attempts, now, now, now)
+            )
+        return cursor.lastrowid
+
+    def position(self, job_id: int) -> int:
+        """Queued jobs ahead of job_id, plus one"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (job_id,)
+            ).fetchone()
+        return row[0] + 1
+
+    def claim(self, owner: str, lease_seconds: float) -> Optional[Job]:
+        """Lease the oldest available job (queued, or leased by a dead worker)"""
+        now = time.time()
+        with self._lock:
+            self.conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._expire(now)
+                row = self.conn.execute(
+                    '''
+                    UPDATE jobs
+                    SET status = 'leased', attempts = attempts + 1, lease_owner = ?,
+                        lease_expires = ?, updated_at = ?
+                    WHERE id = (
+                        SELECT id FROM jobs
+                        WHERE (status = 'queued' AND available_at <= ?)
+                           OR (status = 'leased' AND lease_expires < ?)
+                        ORDER BY id LIMIT 1
+                    )
+                    RETURNING id, kind, payload, attempts, max_attempts
+                    ''',
+                    (owner, now + lease_seconds, now, now, now)
+                ).fetchone()
+                self.conn.execute('COMMIT')
+            except Exception:
+                self.conn.execute('ROLLBACK')
+                raise
+
+        if row is None:
+            return None
+
+        if row['attempts'] > 1:
+            logger.warning(f"🔁 Job {row['id']} re-leased to {owner} (attempt {row['attempts']})")
+        return Job(row['id'], row['kind'], json.loads(row['payload']), row['attempts'], row['max_attempts'])
+
+    def _expire(self, now: float):
+        """Fail expired leases that used up their attempts (caller holds lock and transaction)"""
+        self.conn.execute(
+            '''
+            UPDATE jobs SET status = 'failed', error = 'lease expired', lease_owner = NULL, updated_at = ?
+            WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts
+            ''',
+            (now, now)
+        )
+
+    def heartbeat(self, job_id: int, owner: str, lease_seconds: float) -> bool:
+        """Extend the lease; False if it was lost to another worker"""
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + lease_seconds, now, job_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, owner: str) -> bool:
+        """Mark a leased job done"""
+        return self._finish(job_id, owner, 'done', None)
+
+    def fail(self, job_id: int, owner: str, error: str, retry_in: Optional[float] = None) -> bool:
+        """Mark a leased job failed, or put it back after retry_in seconds"""
+        if retry_in is None:
+            return self._finish(job_id, owner, 'failed', error)
+
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END, "
+                "available_at = ?, lease_owner = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + retry_in, error, now, job_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def _finish(self, job_id: int, owner: str, status: str, error: Optional[str]) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (status, error, now, job_id, owner)
+            )
+        return cursor.rowcount == 1
+
+    def prune(self, days: int = 7) -> int:
+        """Delete finished jobs older than days"""
+        cutoff = time.time() - days * 86400
+        with self._lock:
+            cursor = self.conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+    def counts(self) -> dict:
+        """Jobs per status"""
+        with self._lock:
+            rows = self.conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        return {status: count for status, count in rows}
+
+    def close(self):
+        """Close connection"""
+        with self._lock:
+            self.conn.close()
+
+
+# Built-in backends by name; others are given as 'module:Class'
+BACKENDS = {
+    'sqlite': JobQueue,
+}
+
+
+def open_queue(backend: str, target: str) -> QueueBackend:
+    """Create the queue backend named backend, connected to target (a path or URL)"""
+    cls = BACKENDS.get(backend)
+    if cls is None:
+        module_name, _, class_name = backend.partition(':')
+        if not class_name:
+            raise ValueError(f"Unknown job queue backend: {backend}")
+        cls = getattr(importlib.import_module(module_name), class_name)
+    return cls(target)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Bounded ffmpeg pool: faststart remux (no re-encode) and JPEG thumbnails
+"""
+
+import os
+import struct
+import shutil
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Containers whose index (moov atom) can be moved to the front
+MP4_EXTENSIONS = ('.mp4', '.m4v', '.mov')
+
+# Telegram thumbnails: JPEG, at most 320px per side and 200 kB
+THUMBNAIL_SIZE = 320
+
+
+def is_faststart(path: str) -> bool:
+    """True unless the top-level mdat atom comes before moov"""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            offset = 0
+            while offset + 8 <= size:
+                f.seek(offset)
+                box_size, box_type = struct.unpack('>I4s', f.read(8))
+                if box_type == b'moov':
+                    return True
+                if box_type == b'mdat':
+                    return False
+                if box_size == 1:
+                    box_size = struct.unpack('>Q', f.read(8))[0]
+                elif box_size == 0:
+                    break
+                if box_size < 8:
+                    break
+                offset += box_size
+    except (OSError, struct.error):
+        pass
+
+    # Not an MP4 we understand - nothing to fix
+    return True
+
+
+class ProcessError(Exception):
+    """ffmpeg failed or timed out"""
+
+
+class MediaProcessor:
+    """
+    Runs at most concurrency ffmpeg processes at once (default: CPU count).
+
+    Both steps only copy streams or decode a single frame, so they are cheap
+    next to the download; a run over timeout seconds is killed. Failures
+    never fail a delivery - the original file is sent without them.
+    """
+
+    def __init__(self, ffmpeg: str = 'ffmpeg', concurrency: Optional[int] = None, timeout: float = 120):
+        """Initialize processor (disabled when ffmpeg is not installed)"""
+        self.ffmpeg = shutil.which(ffmpeg)
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.timeout = timeout
+        self._semaphore = None
+
+        self.active = 0
+        # (step, outcome) -> count
+        self.outcomes = {}
+
+        if not self.ffmpeg:
+            logger.warning(f"⚠️ {ffmpeg} not found, faststart remux and thumbnails disabled")
+
+    @property
+    def enabled(self) -> bool:
+        return self.ffmpeg is not None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def _count(self, step: str, outcome: str):
+        self.outcomes[(step, outcome)] = self.outcomes.get((step, outcome), 0) + 1
+
+    async def _run(self, *args: str):
+        """Run ffmpeg with args inside the pool"""
+        async with self._get_semaphore():
+            self.active += 1
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.ffmpeg, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', *args,
+                    stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+                )
+                try:
+                    _, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+                except (asyncio.TimeoutError, asyncio.CancelledError):
+                    process.kill()
+                    await process.wait()
+                    raise
+            finally:
+                self.active -= 1
+
+        if process.returncode != 0:
+            raise ProcessError(stderr.decode(errors='replace').strip()[-300:] or f"exit {process.returncode}")
+
+    async def faststart(self, path: str) -> str:
+        """Move the moov atom to the front in place; returns the outcome"""
+        if not self.enabled or not path.lower().endswith(MP4_EXTENSIONS) or is_faststart(path):
+            self._count('faststart', 'skipped')
+            return 'skipped'
+
+        temp_path = f"{path}.faststart{Path(path).suffix}"
+        try:
+            await self._run('-i', path, '-map', '0', '-c', 'copy', '-movflags', '+faststart', temp_path)
+            os.replace(temp_path, path)
+            outcome = 'ok'
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Faststart timed out after {self.timeout:g}s: {path}")
+            outcome = 'timeout'
+        except (ProcessError, OSError) as e:
+            logger.warning(f"⚠️ Faststart failed: {e}")
+            outcome = 'failed'
+        finally:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+        self._count('faststart', outcome)
+        return outcome
+
+    async def thumbnail(self, path: str, output_path: str, duration: float = 0) -> Optional[str]:
+        """Write a JPEG thumbnail of path to output_path; None when it couldn't"""
+        if not self.enabled:
+            return None
+
+        # A frame a little into the video, not the (often black) first one
+        seek = min(1.0, duration / 2) if duration else 0
+        scale = (f"scale='min({THUMBNAIL_SIZE},iw)':'min({THUMBNAIL_SIZE},ih)'"
+                 ":force_original_aspect_ratio=decrease")
+        try:
+            await self._run(
+                '-ss', f'{seek:.2f}', '-i', path, '-frames:v', '1', '-vf', scale, '-q:v', '5', output_path
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Thumbnail timed out after {self.timeout:g}s: {path}")
+            self._count('thumbnail', 'timeout')
+            return None
+        except (ProcessError, OSError) as e:
+            logger.warning(f"⚠️ Thumbnail failed: {e}")
+            self._count('thumbnail', 'failed')
+            return None
+
+        if not os.path.exists(output_path):
+            self._count('thumbnail', 'failed')
+            return None
+
+        self._count('thumbnail', 'ok')
+        return output_path
+
+    def stats(self) -> dict:
+        """Pool size, running jobs and outcomes per step"""
+        return {
+            'concurrency': self.concurrency,
+            'active': self.active,
+            'outcomes': dict(self.outcomes),
+        }
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Minimal Prometheus metrics (counters, gauges, histograms) without dependencies
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterable, Optional
+
+# Stage latencies: 1ms .. 5min
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# File sizes: 256KB .. 2GB
+SIZE_BUCKETS = tuple(256 * 1024 * 2 ** i for i in range(14))
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = '') -> str:
+    """Render {name="value",...}"""
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _escape(value: str) -> str:
+    """Escape label value"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    """Render sample value"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class: name, help text and label names"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, '') for name in self.labelnames)
+
+    def samples(self) -> list:
+        """Return (suffix, label_string, value) tuples"""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self.samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing value, or one read from a callback"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], dict]] = None):
+        """callback returns {label_values_tuple: value} at scrape time"""
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._callback = callback
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            items = dict(self._values)
+        if self._callback is not None:
+            items.update(self._callback())
+        return [('', _format_labels(self.labelnames, key), value) for key, value in items.items()]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is read from a callback"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 callback: Optional[Callable[[], dict]] = None):
+        """callback returns {label_values_tuple: value} at scrape time"""
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._callback = callback
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            items = dict(self._values)
+        if self._callback is not None:
+            items.update(self._callback())
+        return [('', _format_labels(self.labelnames, key), value) for key, value in items.items()]
+
+
+class Histogram(_Metric):
+    """Bucketed observations with sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket (non-cumulative) counts, sum, count
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list:
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+
+        result = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{_format_value(bound)}"'
+                result.append(('_bucket', _format_labels(self.labelnames, key, le), cumulative))
+            labels = _format_labels(self.labelnames, key)
+            result.append(('_sum', labels, total))
+            result.append(('_count', labels, count))
+        return result
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                callback: Optional[Callable[[], dict]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+              callback: Optional[Callable[[], dict]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+REGISTRY = Registry()
+
+# ============================================================================
+# BOT METRICS
+# ============================================================================
+
+STAGE_SECONDS = REGISTRY.histogram(
+    'shorts_bot_stage_duration_seconds',
+    'Time spent in each pipeline stage',
+    ('stage', 'platform', 'quality'),
+)
+
+FILE_SIZE_BYTES = REGISTRY.histogram(
+    'shorts_bot_file_size_bytes',
+    'Size of delivered video files',
+    ('platform', 'quality'),
+    buckets=SIZE_BUCKETS,
+)
+
+REQUESTS_TOTAL = REGISTRY.counter(
+    'shorts_bot_requests_total',
+    'Quality requests by how they were served',
+    ('platform', 'quality', 'source'),
+)
+
+RETRIES_TOTAL = REGISTRY.counter(
+    'shorts_bot_download_retries_total',
+    'Download attempts that were retried',
+    ('platform',),
+)
+
+ERRORS_TOTAL = REGISTRY.counter(
+    'shorts_bot_errors_total',
+    'Failed requests by error class',
+    ('platform', 'error_class'),
+)
+
+STREAM_FALLBACKS_TOTAL = REGISTRY.counter(
+    'shorts_bot_stream_fallbacks_total',
+    'Streaming uploads that fell back to the download-to-file path',
+    ('platform', 'reason'),
+)
+
+OVERSIZE_AVOIDED_TOTAL = REGISTRY.counter(
+    'shorts_bot_oversize_avoided_total',
+    'Downloads over the upload limit avoided by a lower quality or refused up front',
+    ('platform', 'outcome'),
+)
+
+INLINE_ANSWERS_TOTAL = REGISTRY.counter(
+    'shorts_bot_inline_answers_total',
+    'Inline query answers by outcome (hit, pending, limited, timeout, no_video)',
+    ('platform', 'outcome'),
+)
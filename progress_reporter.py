@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Live progress messages: download/upload progress -> throttled edit_text
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from typing import Callable, Hashable
+
+from telegram.error import RetryAfter, TelegramError
+
+logger = logging.getLogger(__name__)
+
+
+def _size(size_bytes: float) -> str:
+    return f"{size_bytes / (1024 * 1024):.1f} MB"
+
+
+def render_progress(label: str, state: dict) -> str:
+    """Message text for the latest state of a job"""
+    if 'text' in state:
+        return state['text']
+
+    done = state.get('done') or 0
+    total = state.get('total') or 0
+    phase = state.get('phase', 'download')
+
+    if phase == 'upload' and not done:
+        return f"📤 {label}: Telegramga yuborilmoqda ({_size(total)})..."
+
+    head = {'download': '⏳', 'upload': '📤', 'stream': '🌊'}.get(phase, '⏳')
+    if total:
+        lines = [f"{head} {label}: {min(done / total, 1):.0%} yuklandi", f"📦 {_size(done)} / {_size(total)}"]
+    else:
+        lines = [f"{head} {label} yuklanmoqda...", f"📦 {_size(done)}"]
+
+    speed = state.get('speed')
+    eta = state.get('eta')
+    if speed:
+        lines.append(f"🚀 {_size(speed)}/s" + (f" | ⏱ ~{int(eta)} s qoldi" if eta is not None else ""))
+
+    return "\n".join(lines)
+
+
+class _Subscriber:
+    """One message showing a topic"""
+
+    __slots__ = ('message', 'label', 'version', 'text')
+
+    def __init__(self, message, label: str):
+        self.message = message
+        self.label = label
+        self.version = 0
+        self.text = None
+
+
+class ProgressReporter:
+    """
+    Coalesces progress of many jobs into few message edits.
+
+    Producers (yt-dlp hooks on pool threads, upload loops) only overwrite
+    the latest state of a topic under a lock - no coroutine and no loop
+    call per event. One flusher task, running while anything is
+    subscribed, wakes every interval seconds and edits messages whose
+    topic changed: at most once per chat_interval per chat and max_edits
+    per tick overall, so a burst of events costs a single edit.
+    """
+
+    def __init__(self, interval: float = 1.0, chat_interval: float = 3.0, max_edits: int = 20):
+        """Initialize reporter"""
+        self.interval = interval
+        self.chat_interval = chat_interval
+        self.max_edits = max_edits
+
+        self._lock = threading.Lock()
+        # topic -> (version, state)
+        self._states = {}
+        # topic -> {id(message): _Subscriber}; changed on the loop only
+        self._subscribers = {}
+        # chat_id -> monotonic time before which the chat gets no edit
+        self._next_edit = {}
+        self._flusher = None
+
+        self.published = 0
+        self.edits = 0
+        self.failed = 0
+
+    def publish(self, topic: Hashable, **state):
+        """Record the latest state of a topic (thread-safe, never blocks on the loop)"""
+        with self._lock:
+            if topic not in self._subscribers:
+                # Nobody is watching (e.g. a background fetch)
+                return
+            version = self._states[topic][0] + 1 if topic in self._states else 1
+            self._states[topic] = (version, state)
+            self.published += 1
+
+    def subscribe(self, topic: Hashable, message, label: str):
+        """Show topic progress in message (call on the loop)"""
+        with self._lock:
+            self._subscribers.setdefault(topic, {})[id(message)] = _Subscriber(message, label)
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    def unsubscribe(self, topic: Hashable, message):
+        """Stop editing message; the topic is dropped with its last subscriber"""
+        subscribers = self._subscribers.get(topic)
+        if subscribers is None:
+            return
+
+        subscribers.pop(id(message), None)
+        if not subscribers:
+            with self._lock:
+                del self._subscribers[topic]
+                self._states.pop(topic, None)
+
+    def ydl_hook(self, topic: Hashable) -> Callable[[dict], None]:
+        """yt-dlp progress hook publishing to topic"""
+
+        def hook(event: dict):
+            if event.get('status') != 'downloading':
+                return
+            self.publish(
+                topic,
+                phase='download',
+                done=event.get('downloaded_bytes') or 0,
+                total=event.get('total_bytes') or event.get('total_bytes_estimate') or 0,
+                speed=event.get('speed'),
+                eta=event.get('eta'),
+            )
+
+        return hook
+
+    async def _flush_loop(self):
+        while self._subscribers:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"❌ Progress flush failed: {e}")
+
+    async def flush(self):
+        """Edit messages whose topic changed, within the per-chat and per-tick limits"""
+        with self._lock:
+            states = dict(self._states)
+
+        now = time.monotonic()
+        edits = []
+        for topic, subscribers in list(self._subscribers.items()):
+            if len(edits) >= self.max_edits:
+                break
+            if topic not in states:
+                continue
+            version, state = states[topic]
+
+            for subscriber in list(subscribers.values()):
+                if subscriber.version == version:
+                    continue
+                chat_id = subscriber.message.chat_id
+                if self._next_edit.get(chat_id, 0) > now:
+                    continue
+                if len(edits) >= self.max_edits:
+                    break
+
+                subscriber.version = version
+                text = render_progress(subscriber.label, state)
+                if text == subscriber.text:
+                    continue
+                subscriber.text = text
+                self._next_edit[chat_id] = now + self.chat_interval
+                edits.append(self._edit(subscriber, text))
+
+        if edits:
+            await asyncio.gather(*edits)
+
+        # Forget chats whose throttle window has passed
+        self._next_edit = {chat_id: at for chat_id, at in self._next_edit.items() if at > now}
+
+    async def _edit(self, subscriber: _Subscriber, text: str):
+        try:
+            await subscriber.message.edit_text(text)
+            self.edits += 1
+        except RetryAfter as e:
+            self.failed += 1
+            retry_after = float(getattr(e.retry_after, 'total_seconds', lambda: e.retry_after)())
+            self._next_edit[subscriber.message.chat_id] = time.monotonic() + retry_after
+            logger.warning(f"⚠️ Progress edits paused for chat {subscriber.message.chat_id}: {retry_after:g}s")
+        except TelegramError as e:
+            # Deleted message, unchanged text, ...
+            self.failed += 1
+            logger.debug(f"Progress not updated: {e}")
+
+    def stats(self) -> dict:
+        """Counters and live topics"""
+        return {
+            'topics': len(self._subscribers),
+            'published': self.published,
+            'edits': self.edits,
+            'failed': self.failed,
+        }
+
+    async def close(self):
+        """Stop the flusher"""
+        self._subscribers.clear()
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
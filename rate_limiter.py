@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Per-user token buckets with tiers and idle eviction
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, NamedTuple
+
+
+class Tier(NamedTuple):
+    """Bucket size and refill speed"""
+    burst: float
+    refill_seconds: float  # seconds to earn one token back
+
+
+class TokenBucketLimiter:
+    """
+    One token per download, refilled continuously up to the tier's burst.
+
+    Buckets live in an LRU dict. A bucket idle long enough to be full again
+    carries no information, so it is dropped once it is older than idle_ttl;
+    max_users is a hard cap on top of that. All operations are O(1)
+    amortized.
+    """
+
+    def __init__(self, tiers: Dict[str, Tier], idle_ttl: float = 3600, max_users: int = 100_000):
+        """Initialize limiter"""
+        self.tiers = tiers
+        # A bucket in full debt needs 2 * burst refills before it is full again
+        self.idle_ttl = max(idle_ttl, max(2 * t.burst * t.refill_seconds for t in tiers.values()))
+        self.max_users = max_users
+
+        # user -> [tokens, last update]
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.allowed = 0
+        self.limited = 0
+        self.evicted = 0
+
+    def _bucket(self, user: Hashable, tier: Tier, now: float) -> list:
+        """Refilled bucket of user (caller holds lock)"""
+        bucket = self._buckets.get(user)
+        if bucket is None:
+            bucket = self._buckets[user] = [tier.burst, now]
+        else:
+            if tier.refill_seconds > 0:
+                bucket[0] = min(tier.burst, bucket[0] + (now - bucket[1]) / tier.refill_seconds)
+            else:
+                bucket[0] = tier.burst
+            bucket[1] = now
+            self._buckets.move_to_end(user)
+
+        self._evict(now)
+        return bucket
+
+    def _evict(self, now: float):
+        """Drop idle buckets from the LRU end (caller holds lock)"""
+        while self._buckets:
+            user, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < self.idle_ttl and len(self._buckets) <= self.max_users:
+                break
+            del self._buckets[user]
+            self.evicted += 1
+
+    def retry_after(self, user: Hashable, tier: str = 'regular') -> float:
+        """Seconds until user may start a download (0 = now), without using a token"""
+        spec = self.tiers[tier]
+        with self._lock:
+            tokens = self._bucket(user, spec, time.monotonic())[0]
+
+        if tokens >= 1:
+            self.allowed += 1
+            return 0.0
+
+        self.limited += 1
+        return (1 - tokens) * spec.refill_seconds
+
+    def consume(self, user: Hashable, tier: str = 'regular'):
+        """Take a token for a started download (may go into debt, down to -burst)"""
+        spec = self.tiers[tier]
+        with self._lock:
+            bucket = self._bucket(user, spec, time.monotonic())
+            bucket[0] = max(bucket[0] - 1, -spec.burst)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def stats(self) -> dict:
+        """Tracked users and decisions"""
+        return {
+            'users': len(self._buckets),
+            'allowed': self.allowed,
+            'limited': self.limited,
+            'evicted': self.evicted,
+        }
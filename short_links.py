@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Resolve TikTok short links (vm./vt./t/) to canonical video URLs
+"""
+
+import logging
+from typing import Optional
+from urllib.parse import urljoin, urlsplit
+
+import httpx
+
+from singleflight import SingleFlight
+from ttl_cache import TTLCache
+from url_classifier import classify_url
+
+logger = logging.getLogger(__name__)
+
+# Cached value for links that lead nowhere
+DEAD_LINK = ''
+
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# The link itself is gone; anything else (403, 429, 5xx) may be us being refused
+DEAD_CODES = (404, 410)
+
+USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0 Safari/537.36'
+)
+
+
+class ShortLinkResolver:
+    """
+    Follow short-link redirects until a URL with a video id shows up.
+
+    Resolved links are cached for ttl seconds, dead links (404, 410,
+    redirect to a page without an id) for negative_ttl. Network errors
+    and other error statuses (403, 429, 5xx) are not cached - the caller
+    falls back to the original URL. 'upstream' sends every request to
+    that base URL instead of the short-link host (for the local stand-in).
+    """
+
+    def __init__(self, ttl: float = 86400, negative_ttl: float = 600, max_size: int = 5000,
+                 timeout: float = 5.0, max_redirects: int = 5, upstream: Optional[str] = None):
+        """Initialize resolver"""
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self.upstream = upstream.rstrip('/') if upstream else None
+
+        self._cache = TTLCache(max_size, ttl)
+        self._flights = SingleFlight("short_link")
+        self._client = None
+
+        self.resolved = 0
+        self.dead = 0
+        self.failed = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=False,
+                headers={'User-Agent': USER_AGENT},
+            )
+        return self._client
+
+    def _request_url(self, url: str) -> tuple:
+        """URL to connect to and Host header to send"""
+        parts = urlsplit(url)
+        if not self.upstream:
+            return url, None
+        target = self.upstream + (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        return target, parts.netloc
+
+    async def resolve(self, url: str) -> Optional[str]:
+        """Canonical video URL, DEAD_LINK for dead links, None if unreachable"""
+        cached = self._cache.get(url)
+        if cached is not None:
+            return cached
+
+        return await self._flights.do(url, lambda: self._resolve(url))
+
+    async def _resolve(self, url: str) -> Optional[str]:
+        client = self._get_client()
+        current = url
+        try:
+            for _ in range(self.max_redirects + 1):
+                target, host = self._request_url(current)
+                headers = {'Host': host} if host else None
+
+                # Only the status line and Location matter - skip the body
+                response = await client.send(client.build_request('GET', target, headers=headers), stream=True)
+                await response.aclose()
+
+                if response.status_code in REDIRECT_CODES and 'location' in response.headers:
+                    current = urljoin(current, response.headers['location'])
+                    classified = classify_url(current)
+                    if classified and classified.video_id:
+                        return self._remember(url, classified.normalized_url)
+                    if classified and classified.platform == 'tiktok' and classified.is_short:
+                        # Another short link - keep following
+                        continue
+                    # Redirected to the home page or elsewhere
+                    break
+
+                if response.status_code in DEAD_CODES:
+                    break
+
+                if not 200 <= response.status_code < 300:
+                    # Blocked, rate limited or broken upstream - says nothing about the link
+                    raise httpx.HTTPStatusError(
+                        f"{response.status_code} from {current}", request=response.request, response=response
+                    )
+
+                # 200 on the final page - a video page or somewhere else
+                classified = classify_url(current)
+                if classified and classified.video_id:
+                    return self._remember(url, classified.normalized_url)
+                break
+
+            return self._remember(url, DEAD_LINK)
+
+        except httpx.HTTPError as e:
+            self.failed += 1
+            logger.warning(f"⚠️ Short link not resolved ({url}): {e}")
+            return None
+
+    def _remember(self, url: str, resolved: str) -> str:
+        if resolved:
+            self.resolved += 1
+            self._cache.set(url, resolved)
+            logger.info(f"🔗 Short link {url} -> {resolved}")
+            return resolved
+
+        self.dead += 1
+        self._cache.set(url, DEAD_LINK, ttl=self.negative_ttl)
+        logger.info(f"💀 Dead short link: {url}")
+        return DEAD_LINK
+
+    def stats(self) -> dict:
+        """Cache and outcome counters"""
+        return {
+            'cached': len(self._cache),
+            'hits': self._cache.hits,
+            'misses': self._cache.misses,
+            'resolved': self.resolved,
+            'dead': self.dead,
+            'failed': self.failed,
+            'shared': self._flights.shared,
+        }
+
+    async def close(self):
+        """Close the HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
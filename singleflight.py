@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Single-flight registry: concurrent identical jobs share one execution
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderCancelled(Exception):
+    """The job a waiter joined was cancelled before it finished"""
+
+
+class _Call:
+    """In-flight job shared by a leader and its waiters"""
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution"""
+
+    def __init__(self, name: str = "flight"):
+        """Initialize registry"""
+        self.name = name
+        self._calls = {}
+        self.started = 0
+        self.shared = 0
+
+    def in_flight(self) -> int:
+        """Number of jobs currently running"""
+        return len(self._calls)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]],
+                 on_result: Optional[Callable[[Any, int], None]] = None,
+                 on_abandon: Optional[Callable[[Any], None]] = None) -> Any:
+        """
+        Run func() once per key; later callers await the same result.
+
+        on_result(result, participants) runs once, before any participant
+        resumes, so per-participant resources (e.g. file leases) can be
+        taken for everyone who will use the result. A waiter cancelled
+        after that hands its share back through on_abandon(result).
+        Waiters of a cancelled leader get LeaderCancelled.
+        """
+        call = self._calls.get(key)
+
+        if call is not None:
+            call.waiters += 1
+            self.shared += 1
+            logger.info(f"🔗 {self.name} joined in-flight job: {key}")
+            try:
+                return await asyncio.shield(call.future)
+            except asyncio.CancelledError:
+                if not call.future.done():
+                    # Waiter gone before the result arrived - don't count it
+                    call.waiters -= 1
+                elif not call.future.cancelled() and call.future.exception() is None:
+                    # Counted by on_result but never resumed
+                    if on_abandon is not None:
+                        on_abandon(call.future.result())
+                raise
+
+        call = _Call(asyncio.get_running_loop().create_future())
+        self._calls[key] = call
+        self.started += 1
+
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            self._calls.pop(key, None)
+            # A plain cancel() would look to waiters as if they were cancelled themselves
+            call.future.set_exception(LeaderCancelled(f"{self.name} job cancelled: {key}"))
+            call.future.exception()
+            raise
+        except BaseException as e:
+            self._calls.pop(key, None)
+            call.future.set_exception(e)
+            # Mark retrieved so an unshared failure doesn't warn on GC
+            call.future.exception()
+            raise
+
+        self._calls.pop(key, None)
+
+        try:
+            if on_result is not None:
+                on_result(result, call.waiters + 1)
+        finally:
+            call.future.set_result(result)
+
+        return result
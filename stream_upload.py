@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Stream a progressive video from its source URL straight into sendVideo
+"""
+
+import uuid
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class StreamError(Exception):
+    """Streaming upload failed; the caller should use the file path instead"""
+
+
+class ByteBuffer:
+    """Chunk queue holding at most max_bytes; put() waits while it is full"""
+
+    def __init__(self, max_bytes: int):
+        """Initialize buffer"""
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.peak = 0
+        self._chunks = deque()
+        self._condition = asyncio.Condition()
+        self._closed = False
+        self._error = None
+
+    async def put(self, chunk: bytes):
+        """Add a chunk, waiting for the consumer if the buffer is full"""
+        async with self._condition:
+            # Always admit one chunk into an empty buffer, whatever its size
+            await self._condition.wait_for(lambda: self._closed or not self._chunks or self.size < self.max_bytes)
+            if self._closed:
+                raise StreamError("consumer went away")
+            self._chunks.append(chunk)
+            self.size += len(chunk)
+            self.peak = max(self.peak, self.size)
+            self._condition.notify_all()
+
+    async def close(self, error: Optional[BaseException] = None):
+        """End of stream (or abort with error)"""
+        async with self._condition:
+            self._closed = True
+            self._error = self._error or error
+            self._condition.notify_all()
+
+    async def __aiter__(self):
+        while True:
+            async with self._condition:
+                await self._condition.wait_for(lambda: self._chunks or self._closed)
+                if self._error is not None:
+                    raise StreamError(f"source failed: {self._error}")
+                if not self._chunks:
+                    return
+                chunk = self._chunks.popleft()
+                self.size -= len(chunk)
+                self._condition.notify_all()
+            yield chunk
+
+
+class StreamUploader:
+    """
+    Pipe media bytes into a multipart sendVideo request through a bounded buffer.
+
+    Each stream holds at most buffer_bytes in memory; the number of
+    concurrent streams is capped so the total stays under memory_bytes.
+    The source size must be known up front (Content-Length of the upload).
+    """
+
+    def __init__(self, buffer_bytes: int = 8 * 1024 * 1024, memory_bytes: int = 64 * 1024 * 1024,
+                 chunk_size: int = 256 * 1024, timeout: float = 90):
+        """Initialize uploader"""
+        self.buffer_bytes = buffer_bytes
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.slots = max(1, memory_bytes // buffer_bytes)
+        self.active = 0
+        self._client = None
+
+        self.completed = 0
+        self.failed = 0
+        self.bytes_streamed = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=httpx.Timeout(self.timeout, connect=10))
+        return self._client
+
+    def try_acquire(self) -> bool:
+        """Reserve a stream slot without waiting"""
+        if self.active >= self.slots:
+            return False
+        self.active += 1
+        return True
+
+    def release(self):
+        """Free a stream slot"""
+        self.active -= 1
+
+    async def _pump(self, media_url: str, headers: dict, size: int, buffer: ByteBuffer):
+        """Producer: source response body -> buffer"""
+        received = 0
+        try:
+            async with self._get_client().stream('GET', media_url, headers=headers,
+                                                 follow_redirects=True) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(self.chunk_size):
+                    received += len(chunk)
+                    if received > size:
+                        raise StreamError(f"source sent more than {size} bytes")
+                    await buffer.put(chunk)
+
+            if received != size:
+                raise StreamError(f"source sent {received} of {size} bytes")
+            await buffer.close()
+        except BaseException as e:
+            await buffer.close(e)
+            raise
+
+    async def send_video(self, api_url: str, fields: dict, media_url: str, media_headers: dict,
+                         size: int, filename: str = 'video.mp4',
+                         on_progress: Optional[Callable[[int], None]] = None) -> dict:
+        """
+        POST sendVideo with the media body streamed from media_url; return the Message dict.
+
+        on_progress(bytes_sent) is called as chunks go out to Telegram.
+        """
+        boundary = uuid.uuid4().hex
+        preamble = b''.join(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+            for name, value in fields.items() if value is not None
+        ) + (
+            f'--{boundary}\r\nContent-Disposition: form-data; name="video"; filename="{filename}"\r\n'
+            'Content-Type: video/mp4\r\n\r\n'
+        ).encode()
+        epilogue = f'\r\n--{boundary}--\r\n'.encode()
+
+        buffer = ByteBuffer(self.buffer_bytes)
+
+        async def body():
+            yield preamble
+            sent = 0
+            async for chunk in buffer:
+                yield chunk
+                sent += len(chunk)
+                if on_progress:
+                    on_progress(sent)
+            yield epilogue
+
+        pump = asyncio.create_task(self._pump(media_url, media_headers or {}, size, buffer))
+        try:
+            response = await self._get_client().post(
+                f'{api_url}/sendVideo',
+                content=body(),
+                headers={
+                    'Content-Type': f'multipart/form-data; boundary={boundary}',
+                    'Content-Length': str(len(preamble) + size + len(epilogue)),
+                },
+            )
+            await pump
+        except BaseException as e:
+            self.failed += 1
+            await buffer.close(e)
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)
+            if isinstance(e, (httpx.HTTPError, StreamError)):
+                raise StreamError(str(e)) from e
+            raise
+
+        data = response.json()
+        if not data.get('ok'):
+            self.failed += 1
+            raise StreamError(data.get('description', f'HTTP {response.status_code}'))
+
+        self.completed += 1
+        self.bytes_streamed += size
+        logger.info(f"🌊 Streamed {size} bytes (peak buffer {buffer.peak})")
+        return data['result']
+
+    def stats(self) -> dict:
+        """Stream counters"""
+        return {
+            'slots': self.slots,
+            'active': self.active,
+            'completed': self.completed,
+            'failed': self.failed,
+            'bytes': self.bytes_streamed,
+        }
+
+    async def close(self):
+        """Close the HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+One-pass URL classifier: platform, short-form flag and canonical video id
+"""
+
+import re
+from typing import List, NamedTuple, Optional
+from urllib.parse import urlsplit, parse_qs
+
+# First URL-looking token in a message
+URL_IN_TEXT = re.compile(r'(?:https?://)?(?:[\w-]+\.)*(?:youtube\.com|youtu\.be|instagram\.com|tiktok\.com)/\S*',
+                         re.IGNORECASE)
+
+# Host -> platform (after stripping www./m./mobile. prefixes)
+HOSTS = {
+    'youtube.com': 'youtube',
+    'youtu.be': 'youtube',
+    'instagram.com': 'instagram',
+    'tiktok.com': 'tiktok',
+    'vm.tiktok.com': 'tiktok',
+    'vt.tiktok.com': 'tiktok',
+}
+
+HOST_PREFIXES = ('www.', 'm.', 'mobile.')
+
+# Path patterns per platform: (regex, is_short, id group or None)
+YOUTUBE_ID = r'([\w-]{11})'
+PATH_PATTERNS = {
+    'youtube': [
+        (re.compile(r'^/shorts/' + YOUTUBE_ID + r'(?:/|$)'), True),
+        (re.compile(r'^/(?:watch|embed/|v/|live/)' + YOUTUBE_ID + r'?(?:/|$)'), False),
+    ],
+    'instagram': [
+        (re.compile(r'^/(?:[\w.]+/)?reels?/([\w-]+)(?:/|$)'), True),
+        (re.compile(r'^/(?:[\w.]+/)?(?:p|tv)/([\w-]+)(?:/|$)'), False),
+    ],
+    'tiktok': [
+        (re.compile(r'^/@[\w.-]+/video/(\d+)(?:/|$)'), True),
+        (re.compile(r'^/v/(\d+)(?:\.html)?(?:/|$)'), True),
+    ],
+}
+
+# Short-link hosts/paths whose id is only known after following a redirect
+TIKTOK_SHORT_HOSTS = ('vm.tiktok.com', 'vt.tiktok.com')
+TIKTOK_SHORT_PATH = re.compile(r'^/t/([\w-]+)(?:/|$)')
+
+
+class ClassifiedUrl(NamedTuple):
+    """Result of classify_url"""
+    platform: str
+    is_short: bool
+    video_id: Optional[str]
+    normalized_url: str
+
+
+def _canonical_url(platform: str, video_id: str, is_short: bool) -> str:
+    """Build canonical URL for a known video id"""
+    if platform == 'youtube':
+        if is_short:
+            return f"https://www.youtube.com/shorts/{video_id}"
+        return f"https://www.youtube.com/watch?v={video_id}"
+    if platform == 'instagram':
+        return f"https://www.instagram.com/{'reel' if is_short else 'p'}/{video_id}/"
+    return f"https://www.tiktok.com/@_/video/{video_id}"
+
+
+def classify_url(text: str) -> Optional[ClassifiedUrl]:
+    """
+    Parse a message or URL once.
+
+    Tracking query params are dropped, www./m. hosts folded, youtu.be and
+    watch?v= links mapped to their id. TikTok short links (vm./vt./t/)
+    are recognised but carry no id until resolved.
+    """
+    text = text.strip()
+    if not text:
+        return None
+
+    match = URL_IN_TEXT.search(text)
+    if not match:
+        return None
+
+    return _classify(match.group(0))
+
+
+def classify_all(text: str) -> List[ClassifiedUrl]:
+    """Every supported link in a message, in order, without duplicates"""
+    results = []
+    seen = set()
+    for match in URL_IN_TEXT.finditer(text):
+        classified = _classify(match.group(0))
+        if classified and classified.normalized_url not in seen:
+            seen.add(classified.normalized_url)
+            results.append(classified)
+    return results
+
+
+def _classify(url: str) -> Optional[ClassifiedUrl]:
+    """Classify one URL token"""
+    if '://' not in url:
+        url = 'https://' + url
+
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+
+    platform = HOSTS.get(host)
+    if platform is None and host.endswith('.tiktok.com'):
+        platform = 'tiktok'
+    if platform is None:
+        return None
+
+    path = parts.path or '/'
+
+    # youtu.be/<id> - a share link; can't tell whether it is a Short
+    if host == 'youtu.be':
+        match = re.match(r'^/' + YOUTUBE_ID + r'(?:/|$)', path)
+        if not match:
+            return None
+        return ClassifiedUrl(platform, False, match.group(1), _canonical_url(platform, match.group(1), False))
+
+    # TikTok short links
+    if host in TIKTOK_SHORT_HOSTS or TIKTOK_SHORT_PATH.match(path):
+        code = path.strip('/').split('/')[-1]
+        if not code:
+            return None
+        short_host = host if host in TIKTOK_SHORT_HOSTS else 'www.tiktok.com/t'
+        return ClassifiedUrl(platform, True, None, f"https://{short_host}/{code}/")
+
+    for pattern, is_short in PATH_PATTERNS[platform]:
+        match = pattern.match(path)
+        if not match:
+            continue
+
+        video_id = match.group(1)
+        if video_id is None and platform == 'youtube':
+            video_id = (parse_qs(parts.query).get('v') or [None])[0]
+            if not video_id or not re.fullmatch(YOUTUBE_ID, video_id):
+                return None
+
+        return ClassifiedUrl(platform, is_short, video_id, _canonical_url(platform, video_id, is_short))
+
+    return None
+
+
+def canonical_video_id(url: str) -> Optional[str]:
+    """Canonical video id of a URL, if it has one"""
+    classified = classify_url(url)
+    return classified.video_id if classified else None
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persistent on-disk video cache keyed by (platform, video id, quality)
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class VideoCache:
+    """LRU video cache with a disk-size budget and a persistent index"""
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, directory: Path, max_bytes: int):
+        """Initialize cache and load index from disk"""
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index_path = self.directory / self.INDEX_FILE
+
+        self._entries = OrderedDict()
+        self._leases = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # Access times changed since the index was last written
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_index()
+        logger.info(
+            f"✅ Video cache ready: {len(self._entries)} files, "
+            f"{self._total_bytes / 1048576:.1f}/{max_bytes / 1048576:.0f} MB"
+        )
+
+    @staticmethod
+    def make_key(platform: str, video_id: str, quality: str) -> str:
+        """Build cache key"""
+        return f"{platform}:{video_id}:{quality}"
+
+    def _file_name(self, key: str, ext: str) -> str:
+        """Build file name for a cache key"""
+        safe_key = "".join(c if c.isalnum() or c in "-_" else "_" for c in key)
+        return f"{safe_key}{ext}"
+
+    def _load_index(self):
+        """Load index, dropping entries whose files are gone"""
+        if not self.index_path.exists():
+            return
+
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Cache index unreadable, starting empty: {e}")
+            return
+
+        # Stored oldest first, so insertion order is LRU order
+        for entry in sorted(data.get('entries', []), key=lambda e: e.get('last_access', 0)):
+            path = self.directory / entry['file']
+            try:
+                entry['size'] = path.stat().st_size
+            except OSError:
+                continue
+            self._entries[entry['key']] = entry
+            self._total_bytes += entry['size']
+
+    def _save_index(self):
+        """Write index atomically (caller holds lock)"""
+        tmp_path = self.index_path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'entries': list(self._entries.values())}, f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logger.warning(f"⚠️ Cache index not saved: {e}")
+        else:
+            self._dirty = False
+
+    def flush(self):
+        """Write the index if hits changed access times since the last write"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def get(self, platform: str, video_id: str, quality: str) -> Optional[dict]:
+        """Return cached entry (with absolute 'path') or None"""
+        key = self.make_key(platform, video_id, quality)
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and not (self.directory / entry['file']).exists():
+                self._total_bytes -= entry['size']
+                del self._entries[key]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            entry['last_access'] = datetime.now().timestamp()
+            self._entries.move_to_end(key)
+            # Hits are frequent and on the event loop - the index is written by flush()
+            self._dirty = True
+
+            return dict(entry, path=str(self.directory / entry['file']))
+
+    def put(self, platform: str, video_id: str, quality: str, source_path: str,
+            title: str, width: int, height: int, duration: float) -> Optional[str]:
+        """Move a downloaded file into the cache, return its new path (leases move along)"""
+        key = self.make_key(platform, video_id, quality)
+        size = os.path.getsize(source_path)
+
+        if size > self.max_bytes:
+            return None
+
+        file_name = self._file_name(key, Path(source_path).suffix)
+        target = self.directory / file_name
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= old['size']
+
+            os.replace(source_path, target)
+
+            leases = self._leases.pop(str(source_path), 0)
+            if leases:
+                self._leases[str(target)] = self._leases.get(str(target), 0) + leases
+
+            self._entries[key] = {
+                'key': key,
+                'file': file_name,
+                'size': size,
+                'title': title,
+                'width': width,
+                'height': height,
+                'duration': duration,
+                'last_access': datetime.now().timestamp(),
+            }
+            self._total_bytes += size
+
+            self._evict()
+            self._save_index()
+
+        return str(target)
+
+    def _evict(self):
+        """Drop least recently used entries until within budget (caller holds lock)"""
+        # Newest entry and files still being uploaded are never evicted
+        candidates = [
+            key for key, entry in list(self._entries.items())[:-1]
+            if str(self.directory / entry['file']) not in self._leases
+        ]
+
+        for key in candidates:
+            if self._total_bytes <= self.max_bytes:
+                break
+
+            entry = self._entries.pop(key)
+            self._total_bytes -= entry['size']
+            self.evictions += 1
+
+            try:
+                os.remove(self.directory / entry['file'])
+            except OSError:
+                pass
+
+            logger.info(f"🗑 Cache evicted: {key}")
+
+    def acquire(self, path: str, count: int = 1):
+        """Keep a file alive until release() was called count times"""
+        if count <= 0:
+            return
+        path = self._lease_key(path)
+        with self._lock:
+            self._leases[path] = self._leases.get(path, 0) + count
+
+    def release(self, path: str):
+        """Drop one lease; delete the file if it isn't cached and unused"""
+        key = self._lease_key(path)
+        with self._lock:
+            remaining = self._leases.get(key, 0) - 1
+            if remaining > 0:
+                self._leases[key] = remaining
+                return
+            self._leases.pop(key, None)
+
+        if not self.contains_path(path):
+            try:
+                os.remove(path)
+                logger.info(f"🗑 Deleted file: {path}")
+            except OSError:
+                pass
+
+    def _lease_key(self, path: str) -> str:
+        """Normalize path used as lease key"""
+        path = Path(path)
+        if self.contains_path(str(path)):
+            return str(self.directory / path.name)
+        return str(path)
+
+    def is_leased(self, path: str) -> bool:
+        """Check whether a file is still held by someone"""
+        key = self._lease_key(path)
+        with self._lock:
+            return key in self._leases
+
+    def sweep_orphans(self, min_age: float = 1800) -> int:
+        """Delete files in the cache directory that the index doesn't know, once older than min_age seconds"""
+        removed = 0
+        cutoff = time.time() - min_age
+
+        with self._lock:
+            known = {entry['file'] for entry in self._entries.values()}
+            known.add(self.INDEX_FILE)
+
+            for path in self.directory.iterdir():
+                if not path.is_file() or path.name in known or str(path) in self._leases:
+                    continue
+                try:
+                    if path.stat().st_mtime > cutoff:
+                        continue
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+
+        if removed:
+            logger.info(f"🧹 Removed {removed} unindexed cache files")
+        return removed
+
+    def contains_path(self, path: str) -> bool:
+        """Check whether a path is owned by the cache"""
+        return Path(path).resolve().parent == self.directory.resolve()
+
+    def stats(self) -> dict:
+        """Get cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'files': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
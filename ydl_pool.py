@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pool of long-lived yt-dlp worker processes with warm YoutubeDL instances
+
+The parent talks to each worker over its stdin/stdout, one JSON line per
+message. Run directly, this module is the worker.
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import select
+import logging
+import argparse
+import importlib
+import threading
+import subprocess
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Progress hook fields forwarded to the parent, at most every PROGRESS_INTERVAL seconds
+PROGRESS_KEYS = ('status', 'downloaded_bytes', 'total_bytes', 'total_bytes_estimate', 'speed', 'eta')
+PROGRESS_INTERVAL = 0.5
+
+# Info dict keys the bot never reads and yt-dlp doesn't need to download
+HEAVY_KEYS = (
+    'thumbnails', 'automatic_captions', 'subtitles', 'requested_subtitles',
+    'heatmap', 'chapters', 'description', 'comments', 'tags', 'categories',
+)
+
+
+class WorkerError(Exception):
+    """A worker process died or stopped answering"""
+
+
+def compact_info(info: dict, max_height: Optional[int] = None) -> dict:
+    """Drop heavy keys, and formats above max_height (if any format fits)"""
+    info = {key: value for key, value in info.items() if key not in HEAVY_KEYS}
+
+    formats = info.get('formats')
+    if formats and max_height:
+        fitting = [f for f in formats if not f.get('height') or f['height'] <= max_height]
+        if any(f.get('height') for f in fitting):
+            info['formats'] = fitting
+
+    return info
+
+
+# ============================================================================
+# WORKER PROCESS
+# ============================================================================
+
+class _WorkerState:
+    """YoutubeDL instances kept alive between jobs"""
+
+    def __init__(self, factory, on_progress: Optional[Callable[[dict], None]] = None):
+        self.factory = factory
+        self.instances = {}
+        self.on_progress = on_progress
+        self.reporting = False
+        self._reported = 0.0
+
+    def ydl(self, platform: str, opts: dict):
+        """Warm instance for a platform and format profile"""
+        key = (platform, opts.get('format'))
+        ydl = self.instances.get(key)
+        if ydl is None:
+            ydl = self.instances[key] = self.factory(dict(opts))
+            ydl.add_progress_hook(self._progress_hook)
+        return ydl
+
+    def _progress_hook(self, event: dict):
+        """Forward download progress of the current job, throttled"""
+        if not self.reporting or not self.on_progress:
+            return
+        now = time.monotonic()
+        if event.get('status') == 'downloading' and now - self._reported < PROGRESS_INTERVAL:
+            return
+        self._reported = now
+        self.on_progress({key: event.get(key) for key in PROGRESS_KEYS})
+
+    def extract(self, platform: str, url: str, opts: dict) -> dict:
+        ydl = self.ydl(platform, opts)
+        info = ydl.extract_info(url, download=False)
+        return compact_info(ydl.sanitize_info(info))
+
+    def download(self, platform: str, opts: dict, outtmpl: str, info: dict, progress: bool = False) -> dict:
+        ydl = self.ydl(platform, opts)
+        ydl.params['outtmpl'] = {'default': outtmpl}
+        self.reporting = progress
+        try:
+            result = ydl.process_ie_result(info, download=True)
+        finally:
+            self.reporting = False
+        return {
+            key: result.get(key)
+            for key in ('id', 'title', 'ext', 'width', 'height', 'duration')
+        }
+
+
+def _load_factory(path: str, attrs: dict):
+    """Import 'module:Class' and apply class attributes"""
+    module_name, _, name = path.partition(':')
+    factory = getattr(importlib.import_module(module_name), name)
+    for key, value in attrs.items():
+        setattr(factory, key, value)
+    return factory
+
+
+def worker_main():
+    """Serve jobs from stdin until it closes"""
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--factory', default='yt_dlp:YoutubeDL')
+    parser.add_argument('--attrs', default='{}')
+    args = parser.parse_args()
+
+    # Keep stdout for the protocol; anything printed goes to stderr
+    channel = os.fdopen(os.dup(1), 'w', encoding='utf-8')
+    os.dup2(2, 1)
+
+    def send(reply: dict):
+        channel.write(json.dumps(reply, separators=(',', ':')) + '\n')
+        channel.flush()
+
+    state = _WorkerState(
+        _load_factory(args.factory, json.loads(args.attrs)),
+        on_progress=lambda event: send({'progress': event}),
+    )
+
+    for line in sys.stdin:
+        message = json.loads(line)
+        try:
+            if message['op'] == 'extract':
+                result = state.extract(message['platform'], message['url'], message['opts'])
+            elif message['op'] == 'download':
+                result = state.download(
+                    message['platform'], message['opts'], message['outtmpl'], message['info'],
+                    message.get('progress', False)
+                )
+            else:
+                raise ValueError(f"unknown op {message['op']}")
+            reply = {'ok': True, 'result': result}
+        except Exception as e:
+            reply = {'ok': False, 'type': type(e).__name__, 'error': str(e)}
+
+        send(reply)
+
+
+# ============================================================================
+# PARENT SIDE
+# ============================================================================
+
+class _Worker:
+    """One worker process and its pipes"""
+
+    def __init__(self, command: list):
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0
+        )
+        self.jobs = 0
+        self._buffer = b''
+
+    def call(self, message: dict, timeout: float,
+             on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        self.process.stdin.write(json.dumps(message, separators=(',', ':')).encode() + b'\n')
+        self.jobs += 1
+
+        deadline = time.monotonic() + timeout
+        while True:
+            reply = json.loads(self._read_line(deadline, timeout))
+            if 'progress' not in reply:
+                return reply
+            if on_progress:
+                on_progress(reply['progress'])
+
+    def _read_line(self, deadline: float, timeout: float) -> bytes:
+        fd = self.process.stdout.fileno()
+
+        while b'\n' not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerError(f"worker {self.process.pid} timed out after {timeout:.0f}s")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if ready:
+                chunk = os.read(fd, 65536)
+                if not chunk:
+                    raise WorkerError(f"worker {self.process.pid} exited ({self.process.poll()})")
+                self._buffer += chunk
+
+        line, _, self._buffer = self._buffer.partition(b'\n')
+        return line
+
+    def stop(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(5)
+        except Exception:
+            self.kill()
+
+    def kill(self):
+        """Kill the process and reap it"""
+        try:
+            self.process.kill()
+            self.process.wait(5)
+        except Exception as e:
+            logger.warning(f"⚠️ yt-dlp worker {self.process.pid} not reaped: {e}")
+
+
+class YdlProcessPool:
+    """
+    Fixed number of worker processes, each serving one job at a time.
+
+    Calls block the calling thread (a scheduler pool thread) until a worker
+    is free and has answered. A worker is replaced after recycle_after jobs,
+    or when it dies or exceeds timeout. A slot whose replacement couldn't
+    be started holds None and is started again by the next call.
+    """
+
+    def __init__(self, workers: int, recycle_after: int = 50, timeout: float = 600,
+                 factory: str = 'yt_dlp:YoutubeDL', factory_attrs: Optional[dict] = None):
+        """Start worker processes"""
+        self.size = workers
+        self.recycle_after = recycle_after
+        self.timeout = timeout
+        self.command = [
+            sys.executable, str(Path(__file__).resolve()),
+            '--factory', factory, '--attrs', json.dumps(factory_attrs or {}),
+        ]
+
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self.jobs = 0
+        self.recycled = 0
+        self.crashed = 0
+
+        for _ in range(workers):
+            self._idle.put(_Worker(self.command))
+        logger.info(f"✅ yt-dlp process pool started: {workers} workers, recycled every {recycle_after} jobs")
+
+    def _spawn(self) -> Optional[_Worker]:
+        """New worker, or None if the process can't be started right now"""
+        try:
+            return _Worker(self.command)
+        except Exception as e:
+            logger.error(f"❌ yt-dlp worker not started: {e}")
+            return None
+
+    def _call(self, message: dict, on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        worker = self._idle.get()
+        if worker is None:
+            worker = self._spawn()
+            if worker is None:
+                # Keep the slot - the next call tries again
+                self._idle.put(None)
+                raise WorkerError("no yt-dlp worker process available")
+
+        try:
+            reply = worker.call(message, self.timeout, on_progress)
+        except (WorkerError, OSError, ValueError) as e:
+            with self._lock:
+                self.crashed += 1
+            worker.kill()
+            self._idle.put(self._spawn())
+            raise WorkerError(str(e)) from None
+
+        with self._lock:
+            self.jobs += 1
+        if worker.jobs >= self.recycle_after and not self._closed:
+            # Cap memory growth: replace the process between jobs
+            worker.stop()
+            worker = self._spawn()
+            with self._lock:
+                self.recycled += 1
+        self._idle.put(worker)
+
+        if not reply['ok']:
+            raise self._error(reply)
+        return reply['result']
+
+    @staticmethod
+    def _error(reply: dict) -> Exception:
+        """Rebuild a worker-side exception"""
+        if reply['type'] in ('DownloadError', 'ExtractorError'):
+            import yt_dlp
+            return yt_dlp.utils.DownloadError(reply['error'])
+        return RuntimeError(f"{reply['type']}: {reply['error']}")
+
+    def extract(self, platform: str, url: str, opts: dict) -> dict:
+        """Compact, sanitized info dict of url"""
+        return self._call({'op': 'extract', 'platform': platform, 'url': url, 'opts': opts})
+
+    def download(self, platform: str, opts: dict, outtmpl: str, info: dict,
+                 on_progress: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        Download a prefetched info dict; returns id, title, ext, width, height, duration.
+
+        on_progress gets yt-dlp progress hook events (PROGRESS_KEYS only) on
+        the calling thread.
+        """
+        return self._call(
+            {'op': 'download', 'platform': platform, 'opts': opts, 'outtmpl': outtmpl, 'info': info,
+             'progress': on_progress is not None},
+            on_progress
+        )
+
+    def stats(self) -> dict:
+        """Pool counters"""
+        return {
+            'workers': self.size,
+            'idle': self._idle.qsize(),
+            'jobs': self.jobs,
+            'recycled': self.recycled,
+            'crashed': self.crashed,
+        }
+
+    def close(self):
+        """Stop idle workers (busy ones exit when their stdin closes)"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.stop()
+
+
+if __name__ == '__main__':
+    worker_main()